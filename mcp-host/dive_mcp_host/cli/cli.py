@@ -10,6 +10,7 @@ from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.output_parsers import StrOutputParser
 
 from dive_mcp_host.cli.cli_types import CLIArgs
+from dive_mcp_host.host.chat import MessageChunkHolder
 from dive_mcp_host.host.conf import HostConfig
 from dive_mcp_host.host.host import DiveMcpHost
 
@@ -290,6 +291,7 @@ async def process_query(
     loading_task = asyncio.create_task(show_loading(stop_loading))
 
     first_response = True
+    chunk_holder = MessageChunkHolder()
     try:
         async for response in chat.query(query, stream_mode="messages"):
             # Stop loading on first response
@@ -303,6 +305,11 @@ async def process_query(
             if isinstance(msg, AIMessage):
                 content = output_parser.invoke(msg)
                 print(content, end="", flush=True)
+                if (completed := chunk_holder.feed(msg)) and completed.tool_calls:
+                    print("\n\n==== Tool Calls ===")
+                    for tool_call in completed.tool_calls:
+                        print(f"{tool_call['name']}: {tool_call['args']}")
+                    print("==== End Of Tool Calls ===\n")
                 continue
             print(f"\n\n==== Start Of {type(msg)} ===")
             print(msg)
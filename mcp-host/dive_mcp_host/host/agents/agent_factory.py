@@ -29,6 +29,11 @@ class ConfigurableKey(StrEnum):
     STREAM_WRITER = "stream_writer"
     MCP_RELOAD_CALLBACK = "mcp_reload_callback"  # deprecated
     LOCALE = "locale"
+    # The prompt of the chat, overrides the prompt passed to create_agent.
+    # Keys starting with "__" are not copied into the checkpoint metadata.
+    PROMPT = "__prompt"
+    # The ToolIndex selecting the tools bound to the model.
+    TOOL_INDEX = "__tool_index"
 
 
 # XXX is there any better way to do this?
@@ -66,7 +71,7 @@ class AgentFactory[T: MessagesState](Protocol):
         user_id: str,
         thread_id: str,
         max_input_tokens: int | None = None,
-        oversize_policy: Literal["window"] | None = None,
+        oversize_policy: Literal["window", "summary"] | None = None,
         abort_signal: Event | None = None,
         elicitation_manager: "ElicitationManager | None" = None,
         stream_writer: "Any | None" = None,
@@ -4,10 +4,10 @@ It uses langgraph.prebuilt.create_react_agent to create the agent.
 """
 
 import asyncio
-import contextlib
 from asyncio import Event
 from collections.abc import AsyncIterator, Awaitable, Callable, Iterator, Sequence
-from typing import Any, Literal, cast
+from logging import getLogger
+from typing import TYPE_CHECKING, Any, Literal, cast
 from uuid import uuid4
 
 from langchain_core.callbacks import (
@@ -25,7 +25,6 @@ from langchain_core.messages import (
     ToolCall,
     ToolMessage,
 )
-from langchain_core.messages.utils import count_tokens_approximately, trim_messages
 from langchain_core.outputs import ChatGenerationChunk
 from langchain_core.prompt_values import ChatPromptValue
 from langchain_core.prompts import ChatPromptTemplate
@@ -51,16 +50,33 @@ from dive_mcp_host.host.agents.agent_factory import (
     ConfigurableKey,
     initial_messages,
 )
+from dive_mcp_host.host.agents.compaction import (
+    compaction_boundary,
+    summarize,
+    summary_message,
+)
 from dive_mcp_host.host.agents.file_in_additional_kwargs import FileMsgConverter
 from dive_mcp_host.host.agents.message_order import tool_call_order
+from dive_mcp_host.host.agents.prompt_cache import (
+    CACHE_CONTROL,
+    cache_prefix_runnable,
+    supports_cache_control,
+)
+from dive_mcp_host.host.agents.token_count import message_tokens, trim_by_tokens
 from dive_mcp_host.host.agents.tools_in_prompt import (
     convert_messages,
     extract_tool_calls,
+    stream_tool_calls,
 )
 from dive_mcp_host.host.helpers import today_datetime
 from dive_mcp_host.host.prompt import PromptType, tools_prompt
 from dive_mcp_host.host.store.base import StoreManagerProtocol
 
+if TYPE_CHECKING:
+    from dive_mcp_host.host.tools.tool_index import ToolIndex
+
+logger = getLogger(__name__)
+
 type StructuredResponse = dict | BaseModel
 type StructuredResponseSchema = dict | type[BaseModel]
 
@@ -72,6 +88,8 @@ class AgentState(MessagesState):
     today_datetime: str
     remaining_steps: RemainingSteps
     structured_response: StructuredResponse
+    summary: str
+    """Summary of the messages removed by compaction."""
 
 
 MINIMUM_STEPS_TOOL_CALL_REQUIRED = 2
@@ -165,6 +183,27 @@ async def atool_call_wrapper(
     return await func(req)
 
 
+class _FailedToolCall(BaseTool):
+    """Raise the error of a tool call started while streaming."""
+
+    error: Exception
+
+    @classmethod
+    def from_error(cls, tool: BaseTool | None, error: Exception) -> "_FailedToolCall":
+        return cls(
+            name=tool.name if tool else "",
+            description=tool.description if tool else "",
+            error=error,
+        )
+
+    def _run(self, *_: Any, **__: Any) -> Any:
+        raise self.error
+
+    async def ainvoke(self, *_: Any, **__: Any) -> Any:
+        """Raise the error without running the callbacks again."""
+        raise self.error
+
+
 class InterruptableModel(BaseChatModel):
     """A model wrapper that supports abort signal."""
 
@@ -218,55 +257,68 @@ class InterruptableModel(BaseChatModel):
         # Create an async iterator from the model's stream
         stream = self.model._astream(messages, stop, run_manager, **kwargs)  # noqa: SLF001
         if not self.abort_signal:
-            for chunk in stream:
+            async for chunk in stream:
                 yield chunk
             return
 
         cid = str(uuid4())  # chunk id, before the stream starts
+        task = asyncio.current_task()
+        assert task
+        waiting = False  # awaiting the next chunk of the model
+        aborted = False  # cancelled the task to abort the stream
+        cancelling = task.cancelling()  # cancel requests before the abort
+
+        # One watcher for the whole stream. It only cancels the task while it
+        # waits for the model, so code running between the chunks is never hit.
+        def _on_abort(_: asyncio.Task) -> None:
+            nonlocal aborted
+            if waiting and not aborted:
+                aborted = True
+                task.cancel()
+
+        def _uncancel() -> bool:
+            """Withdraw the abort, True if the task is still cancelled by others."""
+            task.uncancel()
+            return task.cancelling() > cancelling
+
+        watcher = asyncio.create_task(self.abort_signal.wait())
+        watcher.add_done_callback(_on_abort)
         try:
-            while True:
-                # Create a task for getting the next chunk
-                chunk_task = asyncio.create_task(stream.__anext__())
-                # Create a task for waiting on abort signal
-                abort_task = asyncio.create_task(self.abort_signal.wait())
-
-                # Wait for either the next chunk or abort signal
-                done, pending = await asyncio.wait(
-                    {chunk_task, abort_task},
-                    return_when=asyncio.FIRST_COMPLETED,
-                )
-
-                # Cancel pending tasks
-                for task in pending:
-                    task.cancel()
-                    with contextlib.suppress(asyncio.CancelledError):
-                        await task
-
-                # Check if abort was triggered
-                if abort_task in done:
-                    # Abort signal was set, yield abort marker and stop
-                    abort_chunk = ChatGenerationChunk(
-                        message=AIMessageChunk(
-                            content="<user_aborted>",
-                            id=cid,
-                        )
-                    )
-                    yield abort_chunk
-                    # Cancel the chunk task if it's still running
-                    if chunk_task in pending or not chunk_task.done():
-                        chunk_task.cancel()
+            while not self.abort_signal.is_set():
+                waiting = True
+                try:
+                    chunk = await anext(stream)
+                except StopAsyncIteration:
+                    chunk = None
+                except (asyncio.CancelledError, Exception) as e:
+                    # the providers may turn the cancellation into their errors
+                    if not aborted:
+                        raise
+                    if _uncancel():
+                        if isinstance(e, asyncio.CancelledError):
+                            raise
+                        raise asyncio.CancelledError from e
                     break
+                finally:
+                    waiting = False
+                # the model may also return after the cancellation
+                if aborted and _uncancel():
+                    raise asyncio.CancelledError
+                if chunk is None:
+                    return
+                cid = chunk.message.id
+                yield chunk
 
-                # Otherwise, we got a chunk
-                if chunk_task in done:
-                    chunk = await chunk_task
-                    cid = chunk.message.id
-                    yield chunk
-
-        except StopAsyncIteration:
-            # Stream ended naturally
-            pass
+            # Abort signal was set, yield abort marker and stop
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content="<user_aborted>",
+                    id=cid,
+                )
+            )
         finally:
+            watcher.remove_done_callback(_on_abort)
+            watcher.cancel()
             # Always close the stream to release resources
             # Close stream if it has aclose method (async generators do)
             if hasattr(stream, "aclose"):
@@ -283,6 +335,32 @@ class InterruptableModel(BaseChatModel):
         return self.bind(tools=runnable.kwargs["tools"], **kwargs)
 
 
+class ToolsInPromptModel(InterruptableModel):
+    """A model wrapper parsing the tool calls in the streamed content.
+
+    Used when the tools are described in the prompt. The tool call markup is
+    removed from the text stream, and on_tool_call is called with each tool call
+    as soon as it's complete, while the model keeps generating.
+    """
+
+    on_tool_call: Callable[[ToolCall], None] | None = None
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """Stream response with the tool calls as tool call chunks."""
+        stream = super()._astream(messages, stop, run_manager, **kwargs)
+        try:
+            async for chunk in stream_tool_calls(stream, self.on_tool_call):
+                yield chunk
+        finally:
+            await stream.aclose()
+
+
 class ChatAgentFactory(AgentFactory[AgentState]):
     """A factory for ChatAgents."""
 
@@ -302,10 +380,16 @@ class ChatAgentFactory(AgentFactory[AgentState]):
             else ToolNode(
                 tools,
                 wrap_tool_call=tool_call_wrapper,
-                awrap_tool_call=atool_call_wrapper,
+                awrap_tool_call=self._atool_call_wrapper,
             )
         )
         self._tools_in_prompt = tools_in_prompt
+        # the tool calls started while the model is streaming,
+        # tool call id -> (thread id, started call)
+        self._prefetched: dict[
+            str, tuple[str | None, asyncio.Task[ToolMessage | Command]]
+        ] = {}
+        self._prefetch_tools = tools_in_prompt and not isinstance(tools, ToolNode)
         self._response_format: (
             StructuredResponseSchema | tuple[str, StructuredResponseSchema] | None
         ) = None
@@ -315,14 +399,18 @@ class ChatAgentFactory(AgentFactory[AgentState]):
             if store
             else RunnablePassthrough()
         )
+        self._cache_prefix = cache_prefix_runnable(self._model_class)
 
         # changed when self._build_graph is called
         self._tool_classes: list[BaseTool] = []
         self._should_return_direct: set[str] = set()
         self._graph: StateGraph | None = None
+        # the tools in provider format, converted on the first model call
+        self._bound_tools: list[Any] | None = None
 
-        # changed when self.create_agent is called
+        # used when the config has no ConfigurableKey.PROMPT
         self._prompt: Runnable = get_prompt_runnable(None)
+        self._agents: dict[tuple[int, int, bool], CompiledStateGraph] = {}
         self._tool_prompt: Runnable = get_prompt_runnable(None)
 
         # Initialize the tool prompt
@@ -338,7 +426,7 @@ class ChatAgentFactory(AgentFactory[AgentState]):
         user_id: str,
         thread_id: str,
         max_input_tokens: int | None = None,
-        oversize_policy: Literal["window"] | None = None,
+        oversize_policy: Literal["window", "summary"] | None = None,
         abort_signal: Event | None = None,
         elicitation_manager: Any | None = None,
         stream_writer: Any | None = None,
@@ -402,6 +490,18 @@ class ChatAgentFactory(AgentFactory[AgentState]):
         )
         if abort_signal and abort_signal.is_set():
             return cast(AgentState, {"messages": []})
+        tools = await self._select_tools(
+            state["messages"],
+            config.get("configurable", {}).get(ConfigurableKey.TOOL_INDEX),
+        )
+        if summary := state.get("summary"):
+            state["messages"] = [summary_message(summary), *state["messages"]]
+        prompt = config.get("configurable", {}).get(ConfigurableKey.PROMPT)
+        prompt_runnable = (
+            self._prompt if prompt is None else get_prompt_runnable(prompt)
+        )
+        # ids of the tool calls started while streaming
+        prefetched: list[str] = []
         if not self._tools_in_prompt:
             # Wrap the model with abort functionality first
             wrapped_model = InterruptableModel(
@@ -409,30 +509,50 @@ class ChatAgentFactory(AgentFactory[AgentState]):
                 abort_signal=abort_signal,
                 disable_streaming=self._model.disable_streaming,
             )
-            # Then bind tools if needed - this will use the default bind_tools
-            # which creates a RunnableBind, but since we're wrapping the base model,
-            # the _stream method will still be called with abort support
-            model = wrapped_model
-            if self._tool_classes:
-                model = wrapped_model.bind_tools(self._tool_classes)
+            # Then bind tools if needed - this creates a RunnableBind, but since
+            # we're wrapping the base model, the _stream method will still be
+            # called with abort support
+            model = self._bind_cache_control(self._bind_tools(wrapped_model, tools))
             model_runnable = (
-                self._prompt | self._file_msg_converter | drop_empty_messages | model
+                prompt_runnable
+                | self._file_msg_converter
+                | drop_empty_messages
+                | self._cache_prefix
+                | model
             )
         else:
             model_runnable = (
-                self._prompt
-                | self._tool_prompt
+                prompt_runnable
+                | (
+                    self._tool_prompt
+                    if tools is None
+                    else get_prompt_runnable(tools_prompt(tools))
+                )
                 | convert_messages
                 | self._file_msg_converter
                 | drop_empty_messages
-                | InterruptableModel(
-                    model=self._model,
-                    abort_signal=abort_signal,
-                    disable_streaming=self._model.disable_streaming,
+                | self._cache_prefix
+                | self._bind_cache_control(
+                    ToolsInPromptModel(
+                        model=self._model,
+                        abort_signal=abort_signal,
+                        disable_streaming=self._model.disable_streaming,
+                        on_tool_call=(
+                            lambda tool_call: self._prefetch_tool_call(
+                                tool_call, config, prefetched
+                            )
+                        )
+                        if self._prefetch_tools
+                        else None,
+                    )
                 )
             )
 
-        response = await model_runnable.ainvoke(state, config)
+        try:
+            response = await model_runnable.ainvoke(state, config)
+        except BaseException:
+            self._cancel_prefetched(prefetched)
+            raise
         if isinstance(response, AIMessage):
             response = extract_tool_calls(response)
         if self._check_more_steps_needed(state, response):
@@ -443,8 +563,148 @@ class ChatAgentFactory(AgentFactory[AgentState]):
         responses = [response]
         if abort_signal and abort_signal.is_set():
             responses = complete_tool_calls(responses)
+            self._cancel_prefetched(prefetched)
+        elif isinstance(response, AIMessage):
+            self._cancel_prefetched(
+                prefetched, keep={tool_call["id"] for tool_call in response.tool_calls}
+            )
         return cast(AgentState, {"messages": responses})
 
+    def _prefetch_tool_call(
+        self, tool_call: ToolCall, config: RunnableConfig, prefetched: list[str]
+    ) -> None:
+        """Start a tool call found in the streamed content.
+
+        The tools node only runs after the whole response is generated, it takes
+        the results of the started calls. Tools needing the graph state, store
+        or runtime injected are left to the tools node.
+        """
+        name, tool_call_id = tool_call["name"], tool_call["id"]
+        tool = self._tools.tools_by_name.get(name)
+        injected = self._tools._injected_args.get(name)  # noqa: SLF001
+        if (
+            tool is None
+            or tool_call_id is None
+            or name in self._should_return_direct
+            or (injected and injected.all_injected_keys)
+        ):
+            return
+        tool_config: RunnableConfig = {
+            **config,
+            "metadata": {**config.get("metadata", {}), "tool_call_id": tool_call_id},
+        }
+        logger.debug("start tool call %s while streaming", tool_call_id)
+        self._prefetched[tool_call_id] = (
+            config.get("configurable", {}).get(ConfigurableKey.THREAD_ID),
+            asyncio.create_task(
+                tool.ainvoke({**tool_call, "type": "tool_call"}, tool_config)
+            ),
+        )
+        prefetched.append(tool_call_id)
+
+    def _cancel_prefetched(
+        self, tool_call_ids: list[str], keep: set[str | None] | None = None
+    ) -> None:
+        """Cancel the started tool calls not in the final response."""
+        for tool_call_id in tool_call_ids:
+            if keep and tool_call_id in keep:
+                continue
+            if prefetched := self._prefetched.pop(tool_call_id, None):
+                prefetched[1].cancel()
+
+    def _cancel_thread_prefetched(self, config: RunnableConfig) -> None:
+        """Cancel the started tool calls of the thread left by the last run.
+
+        The tools node takes all the started calls of a response, the calls left
+        are from a run that ended before the tools node.
+        """
+        thread_id = config.get("configurable", {}).get(ConfigurableKey.THREAD_ID)
+        self._cancel_prefetched(
+            [
+                tool_call_id
+                for tool_call_id, (owner, _) in self._prefetched.items()
+                if owner == thread_id
+            ]
+        )
+
+    async def _atool_call_wrapper(
+        self,
+        req: ToolCallRequest,
+        func: Callable[[ToolCallRequest], Awaitable[ToolMessage | Command]],
+    ) -> ToolMessage | Command:
+        """Take the result of a started tool call, or run the tool.
+
+        A started call that failed is not run again, its error is handled by the
+        tools node the same way as other tool calls.
+        """
+        prefetched = self._prefetched.pop(req.tool_call["id"], None)
+        if prefetched is not None and not prefetched[1].cancelled():
+            try:
+                return await prefetched[1]
+            except Exception as e:  # noqa: BLE001
+                logger.debug("started tool call %s failed", req.tool_call["id"])
+                req = req.override(tool=_FailedToolCall.from_error(req.tool, e))
+        return await atool_call_wrapper(req, func)
+
+    async def _select_tools(
+        self, messages: Sequence[BaseMessage], tool_index: "ToolIndex | None"
+    ) -> list[BaseTool] | None:
+        """Select the tools relevant to the chat, None for all tools.
+
+        The tools are searched with the last user message. Tools called earlier
+        in the chat are always included.
+        """
+        if tool_index is None or len(self._tool_classes) <= tool_index.top_k:
+            return None
+        query = next(
+            (m.text for m in reversed(messages) if isinstance(m, HumanMessage)), ""
+        )
+        if not query:
+            return None
+        try:
+            names = set(await tool_index.search(query, self._tool_classes))
+        except Exception:
+            logger.exception("tool search failed, bind all tools")
+            return None
+        names.update(
+            tool_call["name"]
+            for m in messages
+            if isinstance(m, AIMessage)
+            for tool_call in m.tool_calls
+        )
+        # keep the order of the tools, so the prompt prefix stays the same
+        return [t for t in self._tool_classes if t.name in names]
+
+    def _bind_tools(
+        self, model: BaseChatModel, tools: list[BaseTool] | None = None
+    ) -> Runnable:
+        """Bind the tools to the model.
+
+        The tool schemas are converted by the model's bind_tools only once, and
+        reused by every step of the chats sharing this factory. Pass tools to
+        bind only some of the tools.
+        """
+        if not self._tool_classes:
+            return model
+        if self._bound_tools is None:
+            runnable = self._model.bind_tools(self._tool_classes)
+            self._bound_tools = runnable.kwargs["tools"]
+        if tools is None:
+            return model.bind(tools=self._bound_tools)
+        if len(self._bound_tools) != len(self._tool_classes):
+            # the provider groups the tools, convert the selected tools again
+            return model.bind(tools=self._model.bind_tools(tools).kwargs["tools"])
+        bound = dict(
+            zip((t.name for t in self._tool_classes), self._bound_tools, strict=True)
+        )
+        return model.bind(tools=[bound[t.name] for t in tools])
+
+    def _bind_cache_control(self, model: Runnable) -> Runnable:
+        """Ask the provider to cache the prompt, if it needs to be asked."""
+        if not supports_cache_control(self._model_class):
+            return model
+        return model.bind(cache_control=CACHE_CONTROL)
+
     def _generate_structured_response(
         self, state: AgentState, config: RunnableConfig
     ) -> AgentState:
@@ -460,10 +720,15 @@ class ChatAgentFactory(AgentFactory[AgentState]):
         response = model_with_structured_output.invoke(messages, config)
         return cast(AgentState, {"structured_response": response})
 
-    def _before_agent(self, state: AgentState, config: RunnableConfig) -> AgentState:
+    async def _before_agent(
+        self, state: AgentState, config: RunnableConfig
+    ) -> AgentState:
+        self._cancel_thread_prefetched(config)
         configurable = config.get("configurable", {})
         max_input_tokens: int | None = configurable.get("max_input_tokens")
-        oversize_policy: Literal["window"] | None = configurable.get("oversize_policy")
+        oversize_policy: Literal["window", "summary"] | None = configurable.get(
+            "oversize_policy"
+        )
 
         new_messages: list[BaseMessage] = []
         new_messages.extend(tool_call_order(state["messages"]))
@@ -472,24 +737,49 @@ class ChatAgentFactory(AgentFactory[AgentState]):
             return cast(AgentState, {"messages": new_messages})
 
         if oversize_policy == "window":
-            messages: list[BaseMessage] = trim_messages(
-                state["messages"],
-                max_tokens=max_input_tokens,
-                token_counter=count_tokens_approximately,
-            )
-            remove_messages = [
-                RemoveMessage(id=m.id)  # type: ignore
-                for m in state["messages"]
-                if m not in messages
-            ]
-            new_messages.extend(remove_messages)
+            new_messages.extend(trim_by_tokens(state["messages"], max_input_tokens))
             return cast(AgentState, {"messages": new_messages})
 
+        if oversize_policy == "summary":
+            abort_signal: Event | None = configurable.get(ConfigurableKey.ABORT_SIGNAL)
+            # compact after the tool call order is fixed, in a later step
+            if new_messages or (abort_signal and abort_signal.is_set()):
+                return cast(AgentState, {"messages": new_messages})
+            return await self._compact(state, max_input_tokens)
+
         return cast(AgentState, {"messages": []})
 
-    def _after_agent(self, state: AgentState) -> str:
+    async def _compact(self, state: AgentState, max_input_tokens: int) -> AgentState:
+        """Fold the older messages into the summary of the chat."""
+        summary = state.get("summary")
+        if summary:
+            max_input_tokens -= message_tokens(summary_message(summary))
+        messages = state["messages"]
+        boundary = compaction_boundary(messages, max(max_input_tokens, 0))
+        if boundary == 0:
+            return cast(AgentState, {"messages": []})
+        try:
+            summary = await summarize(self._model, summary, messages[:boundary])
+        except Exception:
+            logger.exception("summarize failed, fallback to window")
+            return cast(
+                AgentState,
+                {"messages": trim_by_tokens(messages, max_input_tokens)},
+            )
+        return cast(
+            AgentState,
+            {
+                "messages": [
+                    RemoveMessage(id=m.id) for m in messages[:boundary] if m.id
+                ],
+                "summary": summary,
+            },
+        )
+
+    def _after_agent(self, state: AgentState, config: RunnableConfig) -> str:
         last_message = state["messages"][-1]
         if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
+            self._cancel_thread_prefetched(config)
             return (
                 END if self._response_format is None else "generate_structured_response"
             )
@@ -551,11 +841,21 @@ class ChatAgentFactory(AgentFactory[AgentState]):
         store: BaseStore | None = None,
         debug: bool = False,
     ) -> CompiledStateGraph:
-        """Create a react agent."""
-        self._prompt = get_prompt_runnable(prompt)
+        """Create a react agent.
+
+        The graph is compiled once per checkpointer and store, the prompt is
+        set in the config of the agent with ``ConfigurableKey.PROMPT``, so the
+        factory can be shared by chats with different prompts.
+        """
         if self._graph is None:
             raise ValueError("Graph is not built")
-        return self._graph.compile(checkpointer=checkpointer, store=store, debug=debug)
+        key = (id(checkpointer), id(store), debug)
+        if (agent := self._agents.get(key)) is None:
+            agent = self._graph.compile(
+                checkpointer=checkpointer, store=store, debug=debug
+            )
+            self._agents[key] = agent
+        return agent.with_config(configurable={ConfigurableKey.PROMPT: prompt})
 
     def create_initial_state(
         self,
@@ -0,0 +1,86 @@
+from logging import getLogger
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+    get_buffer_string,
+)
+from langgraph.constants import TAG_NOSTREAM
+
+from dive_mcp_host.host.agents.token_count import trim_boundary
+
+logger = getLogger(__name__)
+
+# Fraction of max_input_tokens kept as messages after a compaction, the rest of
+# the history is folded into the summary. Leaves room for the next turns, so the
+# history isn't compacted on every step.
+KEEP_RATIO = 0.5
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between \
+a user and an AI assistant that uses tools.
+Update the existing summary with the new messages. Keep the user's goals, \
+decisions, facts, tool results and open tasks that later turns may depend on. \
+Drop greetings and repetition. Reply with the updated summary only."""
+
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+
+
+def compaction_boundary(messages: list[BaseMessage], max_tokens: int) -> int:
+    """Find the first message kept after compacting the history.
+
+    Returns 0 if the messages fit in max_tokens. Otherwise the latest messages
+    that fit in max_tokens * KEEP_RATIO are kept. The boundary never splits a
+    tool call from its tool results, and never passes the last human message,
+    so the turn in progress is kept whole.
+    """
+    if trim_boundary(messages, max_tokens) == 0:
+        return 0
+    boundary = min(
+        trim_boundary(messages, int(max_tokens * KEEP_RATIO)), len(messages) - 1
+    )
+    last_human = next(
+        (
+            i
+            for i in range(len(messages) - 1, -1, -1)
+            if isinstance(messages[i], HumanMessage)
+        ),
+        None,
+    )
+    if last_human is not None:
+        boundary = min(boundary, last_human)
+    # tool results follow the AI message with the tool calls
+    while boundary > 0 and isinstance(messages[boundary], ToolMessage):
+        boundary -= 1
+    return boundary
+
+
+async def summarize(
+    model: BaseChatModel, summary: str | None, messages: list[BaseMessage]
+) -> str:
+    """Fold the messages into the summary.
+
+    Only the new messages are sent with the previous summary, so the cost of a
+    compaction doesn't grow with the length of the chat.
+    """
+    content = get_buffer_string(messages)
+    if summary:
+        content = f"Existing summary:\n{summary}\n\nNew messages:\n{content}"
+    response = await model.ainvoke(
+        [SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content=content)],
+        # the summary isn't part of the chat stream
+        config={"tags": [TAG_NOSTREAM]},
+    )
+    logger.debug(
+        "summarized %s messages, summary length: %s",
+        len(messages),
+        len(response.text),
+    )
+    return response.text
+
+
+def summary_message(summary: str) -> HumanMessage:
+    """The message carrying the summary in front of the history."""
+    return HumanMessage(content=f"{SUMMARY_HEADER}\n{summary}")
@@ -1,3 +1,5 @@
+from asyncio import Event
+from collections.abc import Awaitable, Callable
 from dataclasses import asdict, dataclass
 from itertools import batched
 from logging import getLogger
@@ -6,8 +8,9 @@ from typing import Any, Literal
 
 from langchain_core.messages import BaseMessage, HumanMessage
 from langchain_core.prompt_values import ChatPromptValue
-from langchain_core.runnables import RunnableLambda
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 
+from dive_mcp_host.host.agents.agent_factory import ConfigurableKey
 from dive_mcp_host.host.helpers.filter import filter_empty_dict
 from dive_mcp_host.host.store.base import StoreManagerProtocol
 
@@ -127,36 +130,80 @@ class FileMsgConverter:
         self._model_provider = model_provider
         self._store = store
 
+    async def _cached_block(
+        self,
+        local_path: str,
+        transform: str,
+        convert: Callable[[], Awaitable[dict[str, Any]]],
+    ) -> dict[str, Any]:
+        """Convert the file to a content block, or reuse the converted block."""
+        cache = self._store.attachment_cache
+        if cache is None or (digest := await cache.file_digest(local_path)) is None:
+            return await convert()
+        key = cache.key(digest, self._model_provider, transform)
+        if (block := await cache.get(key)) is None:
+            block = await convert()
+            if block:
+                await cache.set(key, block)
+        return block
+
+    async def _image_block(
+        self, local_path: str, abort_signal: Event | None
+    ) -> dict[str, Any]:
+        async def _convert() -> dict[str, Any]:
+            inline_base64 = await self._store.get_image(local_path, abort_signal)
+            return (
+                ImageBase64Msg.create(inline_base64=inline_base64)
+                if inline_base64
+                else {}
+            )
+
+        return await self._cached_block(local_path, "image", _convert)
+
     async def _gen_document_msg(
         self,
         local_path: str,
         file_name: str,
         url: str | None = None,
+        abort_signal: Event | None = None,
     ) -> list[dict[str, Any]]:
         """Generate document message according to the provider."""
         # Normal text file
         if self._store.is_text(local_path):
-            content = await self._store.get_document_text(local_path)
+
+            async def _text_block() -> dict[str, Any]:
+                content = await self._store.get_document_text(local_path)
+                return (
+                    DocumentTextContentMsg.create(content=content, file_name=file_name)
+                    if content
+                    else {}
+                )
+
             return [
-                DocumentTextContentMsg.create(content=content, file_name=file_name)
-                if content
-                else {},
+                await self._cached_block(local_path, f"text:{file_name}", _text_block),
                 DocumentInfoMsg.create(path=local_path, url=url, file_name=file_name),
             ]
 
-        base64_content, content_type = await self._store.get_document(local_path)
-
         # PDF
         # https://python.langchain.com/docs/how_to/multimodal_inputs/#documents-from-base64-data
-        if content_type == "application/pdf" and self._model_provider in {
+        if self._store.is_pdf(local_path) and self._model_provider in {
             "ChatOpenAI",
             "ChatAnthropic",
             "ChatGoogleGenerativeAI",
         }:
+
+            async def _pdf_block() -> dict[str, Any]:
+                base64_content, _ = await self._store.get_document(
+                    local_path, abort_signal
+                )
+                return (
+                    DocumentPDFBase64Msg.create(base64_data=base64_content)
+                    if base64_content
+                    else {}
+                )
+
             return [
-                DocumentPDFBase64Msg.create(base64_data=base64_content)
-                if base64_content
-                else {},
+                await self._cached_block(local_path, "pdf", _pdf_block),
                 DocumentInfoMsg.create(path=local_path, url=url, file_name=file_name),
             ]
 
@@ -168,6 +215,7 @@ class FileMsgConverter:
         local_path: str,
         file_name: str,
         url: str,
+        abort_signal: Event | None = None,
     ) -> list[dict[str, Any]]:
         """Generate image message according to the provider."""
         # Providers that supports passing image url.
@@ -183,18 +231,16 @@ class FileMsgConverter:
             ]
 
         # Others
-        inline_base64 = await self._store.get_image(local_path)
         return [
-            ImageBase64Msg.create(inline_base64=inline_base64) if inline_base64 else {},
+            await self._image_block(local_path, abort_signal),
             ImageInfoMsg.create(path=local_path, url=url, file_name=file_name),
         ]
 
     async def _gen_image_msg(
-        self, local_path: str, file_name: str
+        self, local_path: str, file_name: str, abort_signal: Event | None = None
     ) -> list[dict[str, Any]]:
-        inline_base64 = await self._store.get_image(local_path)
         return [
-            ImageBase64Msg.create(inline_base64=inline_base64) if inline_base64 else {},
+            await self._image_block(local_path, abort_signal),
             ImageInfoMsg.create(path=local_path, file_name=file_name),
         ]
 
@@ -210,7 +256,9 @@ class FileMsgConverter:
         """Extract the original name from cache file path."""
         return Path(local_path).name.split("-", 1)[-1]
 
-    async def _image_msgs(self, images: list[str]) -> list[dict[str, Any]]:
+    async def _image_msgs(
+        self, images: list[str], abort_signal: Event | None = None
+    ) -> list[dict[str, Any]]:
         result: list[dict[str, Any]] = []
 
         if self._is_using_oap(images):
@@ -218,7 +266,10 @@ class FileMsgConverter:
             for local_path, url in batched(images, 2):
                 file_name = self._get_file_name(local_path)
                 msgs = await self._gen_image_msg_oap(
-                    local_path=local_path, url=url, file_name=file_name
+                    local_path=local_path,
+                    url=url,
+                    file_name=file_name,
+                    abort_signal=abort_signal,
                 )
                 result.extend(msgs)
         else:
@@ -226,13 +277,17 @@ class FileMsgConverter:
             for local_path in images:
                 file_name = self._get_file_name(local_path)
                 msgs = await self._gen_image_msg(
-                    local_path=local_path, file_name=file_name
+                    local_path=local_path,
+                    file_name=file_name,
+                    abort_signal=abort_signal,
                 )
                 result.extend(msgs)
 
         return result
 
-    async def _document_msgs(self, documents: list[str]) -> list[dict[str, Any]]:
+    async def _document_msgs(
+        self, documents: list[str], abort_signal: Event | None = None
+    ) -> list[dict[str, Any]]:
         result: list[dict[str, Any]] = []
 
         if self._is_using_oap(documents):
@@ -240,7 +295,10 @@ class FileMsgConverter:
             for local_path, url in batched(documents, 2):
                 file_name = self._get_file_name(local_path)
                 msgs = await self._gen_document_msg(
-                    local_path=local_path, url=url, file_name=file_name
+                    local_path=local_path,
+                    url=url,
+                    file_name=file_name,
+                    abort_signal=abort_signal,
                 )
                 result.extend(msgs)
         else:
@@ -248,13 +306,17 @@ class FileMsgConverter:
             for local_path in documents:
                 file_name = self._get_file_name(local_path)
                 msgs = await self._gen_document_msg(
-                    local_path=local_path, file_name=file_name
+                    local_path=local_path,
+                    file_name=file_name,
+                    abort_signal=abort_signal,
                 )
                 result.extend(msgs)
 
         return result
 
-    async def _structure_msgs(self, human_message: HumanMessage) -> HumanMessage:
+    async def _structure_msgs(
+        self, human_message: HumanMessage, abort_signal: Event | None = None
+    ) -> HumanMessage:
         result = human_message
 
         if result.additional_kwargs:
@@ -263,13 +325,13 @@ class FileMsgConverter:
             )
 
             if images := result.additional_kwargs.get(IMAGES_KEY):
-                image_msgs = await self._image_msgs(images)
+                image_msgs = await self._image_msgs(images, abort_signal)
                 filtered = filter_empty_dict(image_msgs)
                 logger.debug("got image_msgs: %s", len(filtered))
                 result.content.extend(image_msgs)
 
             if documents := result.additional_kwargs.get(DOCUMENTS_KEY):
-                document_msgs = await self._document_msgs(documents)
+                document_msgs = await self._document_msgs(documents, abort_signal)
                 filtered = filter_empty_dict(document_msgs)
                 logger.debug("got document_msgs: %s", len(filtered))
                 result.content.extend(document_msgs)
@@ -284,15 +346,20 @@ class FileMsgConverter:
         return result
 
     async def process(
-        self, inpt: ChatPromptValue | list[BaseMessage]
+        self,
+        inpt: ChatPromptValue | list[BaseMessage],
+        config: RunnableConfig | None = None,
     ) -> list[BaseMessage]:
         """Structures image, document to their appropreate message format."""
         messages = inpt.to_messages() if isinstance(inpt, ChatPromptValue) else inpt
+        abort_signal: Event | None = (
+            (config or {}).get("configurable", {}).get(ConfigurableKey.ABORT_SIGNAL)
+        )
 
         ret = []
         for message in messages:
             if isinstance(message, HumanMessage):
-                msg = await self._structure_msgs(message)
+                msg = await self._structure_msgs(message, abort_signal)
                 ret.append(msg)
             else:
                 ret.append(message)
@@ -0,0 +1,58 @@
+"""Prompt caching for the providers that support it.
+
+The system prompt, the tool definitions and the older history are sent again on
+every step of the tool loop. They come first and stay byte-identical, so the
+providers can reuse the cached prefix. OpenAI, Google and DeepSeek cache the
+prefix automatically, Anthropic and Bedrock need cache markers.
+"""
+
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.runnables import Runnable, RunnablePassthrough
+from langgraph.utils.runnable import RunnableCallable  # type: ignore
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Models accepting the cache_control call option, it marks the end of the
+# request as a cache breakpoint.
+CACHE_CONTROL_MODELS = {"ChatAnthropic", "ChatBedrockConverse"}
+
+# Models accepting cache_control in the content blocks.
+CACHE_BLOCK_MODELS = {"ChatAnthropic"}
+
+
+def supports_cache_control(model_provider: str) -> bool:
+    """Whether the model accepts the cache_control call option."""
+    return model_provider in CACHE_CONTROL_MODELS
+
+
+def _mark_message(message: BaseMessage) -> BaseMessage:
+    content = message.content
+    if isinstance(content, str):
+        blocks: list = [{"type": "text", "text": content}]
+    else:
+        blocks = list(content)
+    if not blocks or not isinstance(blocks[-1], dict):
+        return message
+    blocks[-1] = {**blocks[-1], "cache_control": CACHE_CONTROL}
+    return message.model_copy(update={"content": blocks})
+
+
+def mark_system_prefix(messages: list[BaseMessage]) -> list[BaseMessage]:
+    """Mark the end of the leading system messages as a cache breakpoint.
+
+    The system prompt is the same across the turns of a chat, while the end of
+    the history moves on every step.
+    """
+    end = 0
+    while end < len(messages) and isinstance(messages[end], SystemMessage):
+        end += 1
+    if end == 0:
+        return messages
+    return [*messages[: end - 1], _mark_message(messages[end - 1]), *messages[end:]]
+
+
+def cache_prefix_runnable(model_provider: str) -> Runnable:
+    """The runnable adding cache markers to the messages for the provider."""
+    if model_provider in CACHE_BLOCK_MODELS:
+        return RunnableCallable(mark_system_prefix, name="mark_system_prefix")
+    return RunnablePassthrough()
@@ -0,0 +1,77 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+from langchain_core.messages import AIMessage, BaseMessage, RemoveMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+MAX_CACHED_MESSAGES = 65536
+
+# message id -> (content hash, token count)
+_cache: OrderedDict[str, tuple[bytes, int]] = OrderedDict()
+
+
+def _fingerprint(message: BaseMessage) -> bytes:
+    """Hash the parts of the message that are counted."""
+    content = (
+        message.content
+        if isinstance(message.content, str)
+        else json.dumps(message.content, sort_keys=True, default=str)
+    )
+    tool_calls = (
+        json.dumps(message.tool_calls, sort_keys=True, default=str)
+        if isinstance(message, AIMessage) and message.tool_calls
+        else ""
+    )
+    tool_call_id = message.tool_call_id if isinstance(message, ToolMessage) else ""
+    data = "\0".join(
+        (message.type, message.name or "", tool_call_id, content, tool_calls)
+    )
+    return hashlib.blake2b(data.encode(), digest_size=16).digest()
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Approximate token count of a message.
+
+    The count is cached by message id and content hash, so each message is only
+    counted once, and a message replaced with the same id is counted again.
+    """
+    if not message.id:
+        return count_tokens_approximately([message])
+    fingerprint = _fingerprint(message)
+    cached = _cache.get(message.id)
+    if cached is not None and cached[0] == fingerprint:
+        _cache.move_to_end(message.id)
+        return cached[1]
+    count = count_tokens_approximately([message])
+    _cache[message.id] = (fingerprint, count)
+    _cache.move_to_end(message.id)
+    while len(_cache) > MAX_CACHED_MESSAGES:
+        _cache.popitem(last=False)
+    return count
+
+
+def messages_tokens(messages: list[BaseMessage]) -> int:
+    """Approximate token count of the messages."""
+    return sum(message_tokens(m) for m in messages)
+
+
+def trim_boundary(messages: list[BaseMessage], max_tokens: int) -> int:
+    """Find the first message of the latest messages that fit in max_tokens.
+
+    Same as ``trim_messages`` with the "last" strategy. The messages are walked
+    from the end and the walk stops at the boundary, so only the kept messages
+    are visited, and only the new or replaced ones are counted.
+    """
+    total = 0
+    for index in range(len(messages) - 1, -1, -1):
+        total += message_tokens(messages[index])
+        if total > max_tokens:
+            return index + 1
+    return 0
+
+
+def trim_by_tokens(messages: list[BaseMessage], max_tokens: int) -> list[RemoveMessage]:
+    """Remove the oldest messages until the rest fit in max_tokens."""
+    boundary = trim_boundary(messages, max_tokens)
+    return [RemoveMessage(id=m.id) for m in messages[:boundary] if m.id]
@@ -11,13 +11,61 @@ and trasform them into ToolCall objects inside AIMessage.tool_calls.
 import json
 import re
 import uuid
+from collections.abc import AsyncIterator, Callable
 from logging import getLogger
 
-from langchain_core.messages import AIMessage, BaseMessage, ToolCall, ToolMessage
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    ToolCall,
+    ToolMessage,
+)
+from langchain_core.messages.tool import tool_call_chunk
+from langchain_core.outputs import ChatGenerationChunk
 from langgraph.utils.runnable import RunnableCallable  # type: ignore
 
 logger = getLogger(__name__)
 
+TOOL_CALL_START = "<tool_call>"
+TOOL_CALL_END = "</tool_call>"
+
+
+def parse_tool_call(block: str) -> ToolCall | None:
+    """Parse a <tool_call> block, returns None if it isn't a valid tool call."""
+    # Try XML format
+    name_match = re.search(r"<name>(.*?)</name>", block, re.DOTALL)
+    args_match = re.search(r"<arguments>(.*?)</arguments>", block, re.DOTALL)
+    if name_match and args_match:
+        try:
+            tool_call = ToolCall(
+                name=name_match.group(1).strip(),
+                args=json.loads(args_match.group(1).strip()),
+                id=str(uuid.uuid4()),
+            )
+        except json.JSONDecodeError:
+            logger.warning(
+                "Failed to parse tool call arguments: %s", args_match.group(1)
+            )
+            return None
+        logger.debug("found tool call: %s", tool_call)
+        return tool_call
+    # Try JSON format
+    json_match = re.search(r"\{[^<]*\}", block, re.DOTALL)
+    if json_match:
+        try:
+            content = json.loads(json_match.group().strip())
+        except json.JSONDecodeError:
+            return None
+        tool_call = ToolCall(
+            name=content.get("name", ""),
+            args=content.get("arguments", ""),
+            id=str(uuid.uuid4()),
+        )
+        logger.debug("found tool call: %s", tool_call)
+        return tool_call
+    return None
+
 
 def extract_tool_calls(response: AIMessage) -> AIMessage:
     """Extract the tool calls from the response content."""
@@ -29,44 +77,9 @@ def extract_tool_calls(response: AIMessage) -> AIMessage:
 
         # Transform the tool call content into a ToolCall
         for match in matches:
-            # Try XML format
-            name_match = re.search(r"<name>(.*?)</name>", match, re.DOTALL)
-            args_match = re.search(r"<arguments>(.*?)</arguments>", match, re.DOTALL)
-            if name_match and args_match:
-                try:
-                    name = name_match.group(1).strip()
-                    args = json.loads(args_match.group(1).strip())
-                    tool_call_id = str(uuid.uuid4())
-                    tool_call = ToolCall(
-                        name=name,
-                        args=args,
-                        id=tool_call_id,
-                    )
-                    logger.debug("found tool call: %s", tool_call)
-                    response.content = response.content.replace(match, "")
-                    response.tool_calls.append(tool_call)
-                except json.JSONDecodeError:
-                    logger.warning(
-                        "Failed to parse tool call arguments: %s", args_match.group(1)
-                    )
-                continue
-            # Try JSON format
-            json_match = re.search(r"\{[^<]*\}", match, re.DOTALL)
-            if json_match:
-                try:
-                    tool_call = json.loads(json_match.group().strip())
-                    tool_call_id = str(uuid.uuid4())
-                    tool_call = ToolCall(
-                        name=tool_call.get("name", ""),
-                        args=tool_call.get("arguments", ""),
-                        id=tool_call_id,
-                    )
-                    logger.debug("found tool call: %s", tool_call)
-                    response.content = response.content.replace(match, "")
-                    response.tool_calls.append(tool_call)
-                    continue
-                except json.JSONDecodeError:
-                    pass
+            if tool_call := parse_tool_call(match):
+                response.content = response.content.replace(match, "")
+                response.tool_calls.append(tool_call)
 
     else:
         logger.debug(
@@ -77,6 +90,125 @@ def extract_tool_calls(response: AIMessage) -> AIMessage:
     return response
 
 
+def _partial_start(text: str) -> int:
+    """Length of the end of text that could be the start of a tool call tag."""
+    for size in range(min(len(TOOL_CALL_START) - 1, len(text)), 0, -1):
+        if text.endswith(TOOL_CALL_START[:size]):
+            return size
+    return 0
+
+
+class ToolCallStreamParser:
+    """Find the tool calls in the content while it's streamed.
+
+    The text outside of the <tool_call> blocks is returned as soon as it can't
+    be the start of a block, the blocks are held back until they are complete.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the parser."""
+        self._buffer = ""
+        self._in_block = False
+        # where to continue looking for the end tag in the buffer
+        self._scanned = 0
+
+    def feed(self, text: str) -> tuple[str, list[ToolCall]]:
+        """Feed a chunk of content.
+
+        Returns:
+            The visible text and the tool calls completed by the chunk.
+        """
+        self._buffer += text
+        visible: list[str] = []
+        tool_calls: list[ToolCall] = []
+        while True:
+            if not self._in_block:
+                start = self._buffer.find(TOOL_CALL_START)
+                if start == -1:
+                    keep = len(self._buffer) - _partial_start(self._buffer)
+                    visible.append(self._buffer[:keep])
+                    self._buffer = self._buffer[keep:]
+                    break
+                visible.append(self._buffer[:start])
+                self._buffer = self._buffer[start:]
+                self._in_block = True
+                self._scanned = len(TOOL_CALL_START)
+
+            end = self._buffer.find(TOOL_CALL_END, self._scanned)
+            if end == -1:
+                self._scanned = max(
+                    self._scanned, len(self._buffer) - len(TOOL_CALL_END) + 1
+                )
+                break
+            end += len(TOOL_CALL_END)
+            block, self._buffer = self._buffer[:end], self._buffer[end:]
+            self._in_block = False
+            if tool_call := parse_tool_call(block):
+                tool_calls.append(tool_call)
+            else:
+                # same as extract_tool_calls, invalid blocks stay in the content
+                visible.append(block)
+        return "".join(visible), tool_calls
+
+    def flush(self) -> str:
+        """Return the held back text at the end of the stream."""
+        rest, self._buffer = self._buffer, ""
+        self._in_block = False
+        return rest
+
+
+async def stream_tool_calls(
+    stream: AsyncIterator[ChatGenerationChunk],
+    on_tool_call: Callable[[ToolCall], None] | None = None,
+) -> AsyncIterator[ChatGenerationChunk]:
+    """Move the tool calls in the streamed content to tool call chunks.
+
+    The markup is removed from the streamed text, and on_tool_call is called
+    with each tool call as soon as its block is complete.
+    """
+    parser = ToolCallStreamParser()
+    index = 0
+    message_id = None
+    async for chunk in stream:
+        message = chunk.message
+        if not isinstance(message, AIMessageChunk) or not isinstance(
+            message.content, str
+        ):
+            yield chunk
+            continue
+        message_id = message.id
+        text, tool_calls = parser.feed(message.content)
+        if message.chunk_position == "last":
+            text += parser.flush()
+        chunks = list(message.tool_call_chunks)
+        for tool_call in tool_calls:
+            if on_tool_call:
+                on_tool_call(tool_call)
+            chunks.append(
+                tool_call_chunk(
+                    name=tool_call["name"],
+                    args=json.dumps(tool_call["args"]),
+                    id=tool_call["id"],
+                    index=index,
+                )
+            )
+            index += 1
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content=text,
+                id=message.id,
+                additional_kwargs=message.additional_kwargs,
+                response_metadata=message.response_metadata,
+                usage_metadata=message.usage_metadata,
+                tool_call_chunks=chunks,
+                chunk_position=message.chunk_position,
+            ),
+            generation_info=chunk.generation_info,
+        )
+    if rest := parser.flush():
+        yield ChatGenerationChunk(message=AIMessageChunk(content=rest, id=message_id))
+
+
 @RunnableCallable
 def convert_messages(messages: list[BaseMessage]) -> list[BaseMessage]:
     """Convert a list of messages for sending to the model."""
@@ -1,16 +1,22 @@
 import asyncio
 import logging
+import operator
 import uuid
 from collections.abc import AsyncGenerator, AsyncIterator, Callable
+from functools import reduce
 from typing import TYPE_CHECKING, Any, Self, cast
 
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import (
+    AIMessageChunk,
     BaseMessage,
     BaseMessageChunk,
     HumanMessage,
     RemoveMessage,
+    ToolCallChunk,
+    merge_content,
 )
+from langchain_core.messages.tool import tool_call_chunk as create_tool_call_chunk
 from langchain_core.runnables import RunnableConfig
 from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph.message import MessagesState
@@ -19,6 +25,7 @@ from langgraph.store.base import BaseStore
 from langgraph.types import StreamMode
 
 from dive_mcp_host.host.agents import AgentFactory, V
+from dive_mcp_host.host.agents.agent_factory import ConfigurableKey
 from dive_mcp_host.host.errors import (
     GraphNotCompiledError,
     MessageTypeError,
@@ -30,6 +37,7 @@ from dive_mcp_host.host.prompt import default_system_prompt
 
 if TYPE_CHECKING:
     from dive_mcp_host.host.tools.elicitation_manager import ElicitationManager
+    from dive_mcp_host.host.tools.tool_index import ToolIndex
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +59,7 @@ class Chat[STATE_TYPE: MessagesState](ContextProtocol):
         elicitation_manager: "ElicitationManager | None" = None,
         locale: str = "en",
         mcp_reload_callback: Callable[[], Any] | None = None,
+        tool_index: "ToolIndex | None" = None,
     ) -> None:
         """Initialize the chat.
 
@@ -66,6 +75,7 @@ class Chat[STATE_TYPE: MessagesState](ContextProtocol):
             elicitation_manager: The elicitation manager for tool approval requests.
             locale: Locale for user-facing messages (e.g., 'en', 'zh-TW').
             mcp_reload_callback: Callback to reload MCP servers (deprecated).
+            tool_index: Selects the tools bound to the model, None to bind all.
 
         The agent_factory is called only once to compile the agent.
         """
@@ -76,12 +86,14 @@ class Chat[STATE_TYPE: MessagesState](ContextProtocol):
         self._model = model
         self._system_prompt = system_prompt
         self._agent: CompiledStateGraph | None = None
+        self._prompt: str | Callable[[STATE_TYPE], list[BaseMessage]] = ""
         self._agent_factory: AgentFactory[STATE_TYPE] = agent_factory
         self._abort_signal: asyncio.Event | None = None
         self._disable_default_system_prompt = disable_default_system_prompt
         self._elicitation_manager = elicitation_manager
         self._locale = locale
         self._mcp_reload_callback = mcp_reload_callback
+        self._tool_index = tool_index
 
     @property
     def active_agent(self) -> CompiledStateGraph:
@@ -117,6 +129,7 @@ class Chat[STATE_TYPE: MessagesState](ContextProtocol):
             )
 
         # we can do something to the prompt here.
+        self._prompt = prompt
         self._agent = self._agent_factory.create_agent(
             prompt=prompt,
             checkpointer=self._checkpointer,
@@ -223,6 +236,12 @@ class Chat[STATE_TYPE: MessagesState](ContextProtocol):
                 locale=self._locale,
                 mcp_reload_callback=self._mcp_reload_callback,
             )
+            # the agent factory may be shared by chats with different prompts
+            if config is not None:
+                configurable = config.setdefault("configurable", {})
+                configurable[ConfigurableKey.PROMPT] = self._prompt
+                if self._tool_index is not None:
+                    configurable[ConfigurableKey.TOOL_INDEX] = self._tool_index
             try:
                 async for response in self.active_agent.astream(
                     input=init_state,
@@ -267,31 +286,142 @@ def _convert_query_to_messages(
     return []
 
 
+# string kwargs that langchain doesn't concatenate
+_UNJOINED_KWARGS = {"index", "id", "output_version", "model_provider"}
+
+
+def _join_fragments(
+    chunks: list[AIMessageChunk],
+) -> tuple[str | list, list[ToolCallChunk], dict[str, Any]]:
+    """Join the string fragments of the chunks of one message.
+
+    Returns the content, the tool call chunks and the string additional kwargs.
+    List content is merged by langchain.
+    """
+    contents = [chunk.content for chunk in chunks]
+    content = (
+        "".join(cast(list[str], contents))
+        if all(isinstance(i, str) for i in contents)
+        else merge_content(*contents)
+    )
+
+    # index -> (id, name fragments, args fragments)
+    tool_calls: dict[int, tuple[str | None, list[str], list[str]]] = {}
+    unindexed: list[ToolCallChunk] = []
+    for chunk in chunks:
+        for tool_call in chunk.tool_call_chunks:
+            index = tool_call.get("index")
+            if index is None:
+                unindexed.append(tool_call)
+                continue
+            tool_call_id, names, args = tool_calls.setdefault(
+                index, (tool_call.get("id"), [], [])
+            )
+            if tool_call_id is None and tool_call.get("id"):
+                tool_calls[index] = (tool_call.get("id"), names, args)
+            names.append(tool_call.get("name") or "")
+            args.append(tool_call.get("args") or "")
+    tool_call_chunks = [
+        create_tool_call_chunk(
+            name="".join(names) or None,
+            args="".join(args) or None,
+            id=tool_call_id,
+            index=index,
+        )
+        for index, (tool_call_id, names, args) in tool_calls.items()
+    ]
+
+    kwargs: dict[str, list[str]] = {}
+    for chunk in chunks:
+        for key, value in chunk.additional_kwargs.items():
+            if isinstance(value, str) and key not in _UNJOINED_KWARGS:
+                kwargs.setdefault(key, []).append(value)
+    return (
+        content,
+        [*tool_call_chunks, *unindexed],
+        {key: "".join(value) for key, value in kwargs.items()},
+    )
+
+
+def merge_message_chunks[T: BaseMessageChunk](chunks: list[T]) -> T:
+    """Merge the chunks of a message.
+
+    ``chunk + chunk`` copies the content and the tool call arguments merged so
+    far, so merging a stream chunk by chunk is quadratic. The string fragments
+    of AI message chunks are joined once instead.
+    """
+    if len(chunks) == 1:
+        return chunks[0]
+    if not all(isinstance(chunk, AIMessageChunk) for chunk in chunks):
+        return cast(T, reduce(operator.add, chunks))
+
+    ai_chunks = cast(list[AIMessageChunk], chunks)
+    content, tool_call_chunks, kwargs = _join_fragments(ai_chunks)
+    # The joined fragments are put in the first chunk and removed from the
+    # others, langchain merges the rest (metadata, usage, ID).
+    first = ai_chunks[0].model_copy(
+        update={
+            "content": content,
+            "tool_call_chunks": tool_call_chunks,
+            "additional_kwargs": {**ai_chunks[0].additional_kwargs, **kwargs},
+        }
+    )
+    rest = [
+        chunk.model_copy(
+            update={
+                "content": "" if isinstance(content, str) else [],
+                "tool_call_chunks": [],
+                "additional_kwargs": {
+                    key: value
+                    for key, value in chunk.additional_kwargs.items()
+                    if key not in kwargs
+                },
+            }
+        )
+        for chunk in ai_chunks[1:]
+    ]
+    return cast(T, first + rest)
+
+
 class MessageChunkHolder:
-    """Message chunk holder."""
+    """Accumulate the streamed chunks of messages.
+
+    The chunks are kept per message ID and merged once when the message is
+    done, so a long answer costs linear time.
+    """
 
     def __init__(self) -> None:
         """Initialize message chunk holder."""
-        self._merged: dict[str, BaseMessage] = {}
+        self._chunks: dict[str, list[BaseMessageChunk]] = {}
+        self._done: set[str] = set()
 
-    def feed[T: BaseMessage | BaseMessageChunk](self, chunk: T) -> T | None:
-        """Feed a chunk, return a combined message if done."""
-        if isinstance(chunk, BaseMessageChunk) and chunk.id:
-            m = cast(T, s + chunk) if (s := self._merged.get(chunk.id)) else chunk
-            self._merged[chunk.id] = m
-            if m.response_metadata.keys() & {
+    def _append(self, chunk: BaseMessageChunk) -> list[BaseMessageChunk]:
+        assert chunk.id is not None
+        chunks = self._chunks.setdefault(chunk.id, [])
+        chunks.append(chunk)
+        if (
+            chunk.response_metadata.keys()
+            & {
                 "finish_reason",
                 "stop_reason",
                 "done",
-            }:
-                return m
+            }
+            or getattr(chunk, "chunk_position", None) == "last"
+        ):
+            self._done.add(chunk.id)
+        return chunks
+
+    def feed[T: BaseMessage | BaseMessageChunk](self, chunk: T) -> T | None:
+        """Feed a chunk, return a combined message if done."""
+        if isinstance(chunk, BaseMessageChunk) and chunk.id:
+            chunks = self._append(chunk)
+            if chunk.id in self._done:
+                return cast(T, merge_message_chunks(chunks))
             return None
         return chunk
 
     def partial_merged[T: BaseMessage](self, chunk: T) -> T:
         """Return partial merged message."""
         if isinstance(chunk, BaseMessageChunk) and chunk.id:
-            m = cast(T, s + chunk) if (s := self._merged.get(chunk.id)) else chunk
-            self._merged[chunk.id] = m
-            return m
+            return cast(T, merge_message_chunks(self._append(chunk)))
         return chunk
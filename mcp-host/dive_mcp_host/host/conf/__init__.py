@@ -1,6 +1,6 @@
 import re
 from pathlib import Path
-from typing import Annotated, Any, Literal
+from typing import Annotated, Any, Literal, Self
 
 from pydantic import (
     AnyUrl,
@@ -10,6 +10,7 @@ from pydantic import (
     SecretStr,
     UrlConstraints,
     field_serializer,
+    model_validator,
 )
 
 from dive_mcp_host.host.conf.llm import LLMConfigTypes
@@ -40,6 +41,47 @@ def _rewrite_socks(v: Any) -> Any:
     return v
 
 
+class ReplicaConfig(BaseModel):
+    """Configuration for a pool of identical stdio server processes.
+
+    A replica is started when every running replica is busy, up to max. The
+    replicas beyond min are stopped after idle_timeout seconds without calls.
+    """
+
+    min: int = Field(default=1, ge=1)
+    max: int = Field(default=1, ge=1)
+    idle_timeout: float = Field(default=60, gt=0)
+
+    @model_validator(mode="after")
+    def check_range(self) -> Self:
+        """Check min is not greater than max."""
+        if self.min > self.max:
+            raise ValueError("replicas.min must not be greater than replicas.max")
+        return self
+
+
+class SessionPoolConfig(BaseModel):
+    """Configuration for the sessions of an http server shared by the chats.
+
+    Only for the servers that keep no state per session. A session is opened
+    when every pooled session is busy, up to max_size. The sessions beyond
+    min_idle are closed after idle_timeout seconds without calls.
+    """
+
+    min_idle: int = Field(default=1, ge=0)
+    max_size: int = Field(default=4, ge=1)
+    idle_timeout: float = Field(default=60, gt=0)
+
+    @model_validator(mode="after")
+    def check_range(self) -> Self:
+        """Check min_idle is not greater than max_size."""
+        if self.min_idle > self.max_size:
+            raise ValueError(
+                "session_pool.min_idle must not be greater than session_pool.max_size"
+            )
+        return self
+
+
 class ServerConfig(BaseModel):
     """Configuration for an MCP server."""
 
@@ -50,7 +92,7 @@ class ServerConfig(BaseModel):
     enabled: bool = True
     exclude_tools: list[str] = Field(default_factory=list)
     url: str | None = None
-    keep_alive: float | None = None
+    keep_alive: float | None = Field(default=None, gt=0)
     transport: Literal["stdio", "sse", "streamable", "websocket"]
     headers: dict[str, SecretStr] = Field(default_factory=dict)
     proxy: Annotated[
@@ -60,6 +102,13 @@ class ServerConfig(BaseModel):
     initial_timeout: float = 10
     tool_call_timeout: float = 10 * 60
     verify: bool | None = None
+    max_concurrent_calls: int | None = Field(default=None, ge=1)
+    call_queue_timeout: float | None = None
+    result_cache_ttl: float | None = Field(default=None, gt=0)
+    result_cache_max_bytes: int = Field(default=8 * 1024 * 1024, ge=0)
+    replicas: ReplicaConfig | None = None
+    session_pool: SessionPoolConfig | None = None
+    max_frame_size: int = Field(default=64 * 1024 * 1024, gt=0)
 
     @field_serializer("headers", when_used="json")
     def dump_headers(self, v: dict[str, SecretStr] | None) -> dict[str, str] | None:
@@ -100,6 +149,8 @@ class EmbedConfig(BaseModel):
     model: str | None = None
     embed_dims: int | None = None
     api_key: str | None = None
+    tool_top_k: int | None = Field(default=None, ge=1)
+    """Bind only the top k tools relevant to the chat, None to bind all tools."""
 
 
 class HostConfig(BaseModel):
@@ -110,6 +110,29 @@ class McpSessionNotRunningError(MCPHostError):
         super().__init__(f"MCP session not running for {mcp_server} chat_id: {chat_id}")
 
 
+class ToolCallQueueTimeoutError(MCPHostError):
+    """No call slot of the MCP server was free within the queue timeout."""
+
+    def __init__(self, mcp_server: str, timeout: float) -> None:
+        """Initialize the error."""
+        self.mcp_server = mcp_server
+        self.timeout = timeout
+        super().__init__(
+            f"MCP server {mcp_server} is busy, no call slot free within {timeout}s"
+        )
+
+
+class StdioFrameTooLargeError(MCPHostError, ValueError):
+    """A line from a stdio MCP server exceeded the max frame size."""
+
+    def __init__(self, max_frame_size: int) -> None:
+        """Initialize the error."""
+        self.max_frame_size = max_frame_size
+        super().__init__(
+            f"Message from the stdio server exceeded {max_frame_size} bytes, dropped it"
+        )
+
+
 class LogBufferNotFoundError(MCPHostError):
     """Exception raised when a log buffer is not found."""
 
@@ -117,3 +140,24 @@ class LogBufferNotFoundError(MCPHostError):
         """Initialize the error."""
         self.mcp_name = name
         super().__init__(f"Log buffer {name} not found")
+
+
+class MediaQueueTimeoutError(MCPHostError):
+    """No media transform slot was free within the queue timeout."""
+
+    def __init__(self, name: str, timeout: float) -> None:
+        """Initialize the error."""
+        self.name = name
+        self.timeout = timeout
+        super().__init__(
+            f"Media transform {name} is busy, no slot free within {timeout}s"
+        )
+
+
+class MediaAbortedError(MCPHostError):
+    """The media transform was aborted."""
+
+    def __init__(self, name: str) -> None:
+        """Initialize the error."""
+        self.name = name
+        super().__init__(f"Media transform {name} was aborted")
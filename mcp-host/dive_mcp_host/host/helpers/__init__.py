@@ -4,3 +4,8 @@ from datetime import UTC, datetime
 def today_datetime() -> str:
     """The current date and time."""
     return datetime.now(tz=UTC).isoformat()
+
+
+def today_date() -> str:
+    """The current date."""
+    return datetime.now(tz=UTC).date().isoformat()
@@ -3,7 +3,7 @@ import logging
 from collections.abc import AsyncGenerator, Awaitable, Callable, Sequence
 from contextlib import AsyncExitStack
 from copy import deepcopy
-from typing import TYPE_CHECKING, Any, Self
+from typing import TYPE_CHECKING, Any, Self, cast
 
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import BaseMessage
@@ -24,7 +24,8 @@ from dive_mcp_host.host.tools.log import LogManager
 from dive_mcp_host.host.tools.mcp_server import McpServer
 from dive_mcp_host.host.tools.oauth import BaseTokenStore, OAuthManager
 from dive_mcp_host.host.tools.plugin import ToolManagerPlugin
-from dive_mcp_host.models import load_model
+from dive_mcp_host.host.tools.tool_index import ToolIndex
+from dive_mcp_host.models import load_embeddings, load_model
 
 if TYPE_CHECKING:
     from langgraph.checkpoint.base import BaseCheckpointSaver
@@ -32,6 +33,8 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+MAX_CACHED_AGENT_FACTORIES = 8
+
 
 class DiveMcpHost(ContextProtocol):
     """The Model Context Protocol (MCP) Host.
@@ -99,6 +102,10 @@ class DiveMcpHost(ContextProtocol):
             tool_plugin=self._tool_plugin,
         )
         self._store = store_manager
+        # agent factories of the host tools, reset when the model or tools change
+        self._agent_factories: dict[tuple, AgentFactory] = {}
+        self._agent_factories_generation = -1
+        self._tool_index: ToolIndex | None = None
         self._exit_stack: AsyncExitStack | None = None
         self._lock: asyncio.Lock = asyncio.Lock()
 
@@ -106,6 +113,8 @@ class DiveMcpHost(ContextProtocol):
         async with AsyncExitStack() as stack:
             self._exit_stack = stack
             await self._init_models()
+            self._init_tool_index()
+            stack.callback(self._close_tool_index)
             if self._config.checkpointer:
                 checkpointer = get_checkpointer(str(self._config.checkpointer.uri))
                 self._checkpointer = await stack.enter_async_context(checkpointer)
@@ -128,6 +137,29 @@ class DiveMcpHost(ContextProtocol):
         # Initialize local tools (fetch, bash, read_file, write_file)
         self._tool_plugin.setup_local_tools()
 
+    def _init_tool_index(self) -> None:
+        """Create the tool index if tool selection is enabled."""
+        embed = self._config.embed
+        if (
+            embed is None
+            or embed.tool_top_k is None
+            or not embed.provider
+            or not embed.model
+        ):
+            return
+        kwargs = {"api_key": embed.api_key} if embed.api_key else {}
+        try:
+            embeddings = load_embeddings(embed.provider, embed.model, **kwargs)
+        except Exception:
+            logger.exception("Failed to load embeddings, tool selection disabled")
+            return
+        self._tool_index = ToolIndex(embeddings, top_k=embed.tool_top_k)
+
+    def _close_tool_index(self) -> None:
+        if self._tool_index is not None:
+            self._tool_index.close()
+            self._tool_index = None
+
     def chat[T: MessagesState](
         self,
         *,
@@ -169,26 +201,23 @@ class DiveMcpHost(ContextProtocol):
         """
         if self._model is None:
             raise RuntimeError("Model not initialized")
+        if tools_in_prompt is None:
+            tools_in_prompt = self._config.llm.tools_in_prompt
         if tools is None:
-            tools = list(
-                self._tool_manager.langchain_tools(
-                    include_local_tools=include_local_tools,
-                )
+            agent_factory = self._host_agent_factory(
+                get_agent_factory_method, tools_in_prompt, include_local_tools
             )
         else:
             tools = list(tools)
             # Add local tools if requested and available
             if include_local_tools and self._tool_plugin.local_tools is not None:
                 tools.extend(self._tool_plugin.local_tools)
-
-        if tools_in_prompt is None:
-            tools_in_prompt = self._config.llm.tools_in_prompt
-        agent_factory = get_agent_factory_method(
-            self._model,
-            tools,
-            tools_in_prompt,
-            self._store,
-        )
+            agent_factory = get_agent_factory_method(
+                self._model,
+                tools,
+                tools_in_prompt,
+                self._store,
+            )
         return Chat(
             model=self._model,
             agent_factory=agent_factory,
@@ -200,8 +229,61 @@ class DiveMcpHost(ContextProtocol):
             elicitation_manager=self.elicitation_manager,
             locale=self._tool_plugin.locale,
             mcp_reload_callback=self._tool_plugin.mcp_reload_callback,
+            tool_index=self._tool_index,
         )
 
+    def _host_agent_factory[T: MessagesState](
+        self,
+        get_agent_factory_method: Callable[
+            [
+                BaseChatModel,
+                Sequence[BaseTool] | ToolNode,
+                bool,
+                StoreManagerProtocol | None,
+            ],
+            AgentFactory[T],
+        ],
+        tools_in_prompt: bool,
+        include_local_tools: bool,
+    ) -> AgentFactory[T]:
+        """Get the agent factory of the host tools.
+
+        Building the factory renders the tool prompt and compiles the graph, so
+        it is reused until the model or the tool set changes.
+        """
+        assert self._model is not None
+        if self._agent_factories_generation != self._tool_manager.generation:
+            self._agent_factories.clear()
+            self._agent_factories_generation = self._tool_manager.generation
+            if self._tool_index is not None:
+                self._tool_index.retain(
+                    self._tool_manager.langchain_tools(include_local_tools=True)
+                )
+
+        tools = self._tool_manager.langchain_tools(
+            include_local_tools=include_local_tools,
+        )
+        # the generation changes with the tools of the MCP servers, the names
+        # tell the tool sets of the generation apart, e.g. with local tools
+        key = (
+            id(self._model),
+            get_agent_factory_method,
+            tools_in_prompt,
+            self._agent_factories_generation,
+            tuple(tool.name for tool in tools),
+        )
+        if (agent_factory := self._agent_factories.get(key)) is None:
+            if len(self._agent_factories) >= MAX_CACHED_AGENT_FACTORIES:
+                self._agent_factories.pop(next(iter(self._agent_factories)))
+            agent_factory = get_agent_factory_method(
+                self._model,
+                tools,
+                tools_in_prompt,
+                self._store,
+            )
+            self._agent_factories[key] = agent_factory
+        return cast(AgentFactory[T], agent_factory)
+
     async def reload(
         self,
         new_config: HostConfig,
@@ -233,8 +315,13 @@ class DiveMcpHost(ContextProtocol):
                 # Reload model if needed
                 if old_config.llm != new_config.llm:
                     self._model = None
+                    self._agent_factories.clear()
                     await self._init_models()
 
+                if old_config.embed != new_config.embed:
+                    self._close_tool_index()
+                    self._init_tool_index()
+
                 await self._tool_manager.reload(
                     new_configs=new_config.mcp_servers, force=force_mcp
                 )
@@ -6,13 +6,13 @@ from collections.abc import Callable, Sequence
 from langchain_core.messages import BaseMessage, SystemMessage
 from langchain_core.tools import BaseTool
 
-from dive_mcp_host.host.helpers import today_datetime
+from dive_mcp_host.host.helpers import today_date
 
 PromptType = SystemMessage | str | Callable[..., list[BaseMessage]]
 
 SYSTEM_PROMPT = """You are an AI assistant helping a software engineer.
 Your user is a professional software engineer who works on various programming projects.
-Today's date is {today_datetime}. I aim to provide clear, accurate, and helpful
+Today's date is {today_date}. I aim to provide clear, accurate, and helpful
 responses with a focus on software development best practices.
 
 I should be direct, technical, and practical in my communication style.
@@ -21,8 +21,12 @@ so you can reason better about the changes in context of the project."""
 
 
 def default_system_prompt() -> str:
-    """The default system prompt."""
-    return SYSTEM_PROMPT.format(today_datetime=today_datetime())
+    """The default system prompt.
+
+    Only the date is included, the prompt stays the same across the turns of
+    the day and the providers can reuse the cached prompt prefix.
+    """
+    return SYSTEM_PROMPT.format(today_date=today_date())
 
 
 def tools_definition(tools: Sequence[BaseTool]) -> str:
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+
+logger = getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+
+
+class AttachmentCache:
+    """Content-addressed cache for the converted attachment blocks.
+
+    Blocks are keyed by the hash of the file, the model provider and the
+    transform, so an attachment is converted once per provider no matter how
+    many times the chat history is sent to the model.
+
+    The blocks are kept in memory up to ``max_bytes`` and the least recently
+    used ones are evicted. When ``cache_dir`` is set the blocks are also written
+    to disk up to ``max_disk_bytes`` and survive restarts. Hashing the files and
+    the disk reads and writes run in a thread, off the event loop.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        cache_dir: Path | None = None,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+    ) -> None:
+        """Initialize the attachment cache.
+
+        Args:
+            max_bytes: Max size of the blocks kept in memory.
+            cache_dir: Directory to persist the blocks, None to keep them in memory.
+            max_disk_bytes: Max size of the blocks persisted in ``cache_dir``.
+        """
+        self._max_bytes = max_bytes
+        self._cache_dir = cache_dir
+        self._max_disk_bytes = max_disk_bytes
+        self._blocks: OrderedDict[str, tuple[dict[str, Any], int]] = OrderedDict()
+        self._size = 0
+        # key -> size of the persisted blocks, least recently used first
+        self._disk_blocks: OrderedDict[str, int] = OrderedDict()
+        self._disk_size = 0
+        # file path -> (mtime_ns, size, digest)
+        self._digests: dict[str, tuple[int, int, str]] = {}
+
+        if self._cache_dir:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            self._load_disk_blocks(self._cache_dir)
+
+    @property
+    def size(self) -> int:
+        """Size of the blocks kept in memory."""
+        return self._size
+
+    @property
+    def disk_size(self) -> int:
+        """Size of the blocks persisted on disk."""
+        return self._disk_size
+
+    def _load_disk_blocks(self, cache_dir: Path) -> None:
+        """Index the persisted blocks, the least recently used first."""
+        entries: list[tuple[int, str, int]] = []
+        for path in cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk_blocks[key] = size
+            self._disk_size += size
+
+    async def file_digest(self, file_path: str) -> str | None:
+        """Get the hash of the file content, None if the file doesn't exist.
+
+        The hash is only recomputed when the file is modified.
+        """
+        try:
+            stat = Path(file_path).stat()
+        except OSError:
+            return None
+        cached = self._digests.get(file_path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        try:
+            digest = await asyncio.to_thread(_hash_file, file_path)
+        except OSError:
+            return None
+        self._digests[file_path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def key(self, digest: str, provider: str, transform: str) -> str:
+        """Get the cache key of a converted block."""
+        return hashlib.sha256(f"{digest}:{provider}:{transform}".encode()).hexdigest()
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """Get a converted block."""
+        if item := self._blocks.get(key):
+            self._blocks.move_to_end(key)
+            return dict(item[0])
+        if self._cache_dir is None or key not in self._disk_blocks:
+            return None
+        self._disk_blocks.move_to_end(key)
+        try:
+            block = await asyncio.to_thread(
+                _read_block, self._cache_dir / f"{key}.json"
+            )
+        except Exception as e:  # noqa: BLE001
+            logger.warning("load attachment cache failed: %s", e)
+            self._drop_disk_block(key)
+            return None
+        self._put(key, block, self._disk_blocks.get(key, 0))
+        return dict(block)
+
+    async def set(self, key: str, block: dict[str, Any]) -> None:
+        """Store a converted block."""
+        data = json.dumps(block)
+        size = len(data)
+        self._put(key, block, size)
+        if self._cache_dir is None or size > self._max_disk_bytes:
+            return
+        self._drop_disk_block(key)
+        self._disk_blocks[key] = size
+        self._disk_size += size
+        evicted: list[Path] = []
+        while self._disk_size > self._max_disk_bytes:
+            evicted_key, evicted_size = self._disk_blocks.popitem(last=False)
+            self._disk_size -= evicted_size
+            evicted.append(self._cache_dir / f"{evicted_key}.json")
+        try:
+            await asyncio.to_thread(
+                _write_block, self._cache_dir / f"{key}.json", data, evicted
+            )
+        except Exception as e:  # noqa: BLE001
+            logger.warning("save attachment cache failed: %s", e)
+            self._drop_disk_block(key)
+
+    def _drop_disk_block(self, key: str) -> None:
+        if (size := self._disk_blocks.pop(key, None)) is not None:
+            self._disk_size -= size
+
+    def _put(self, key: str, block: dict[str, Any], size: int) -> None:
+        if size > self._max_bytes:
+            return
+        if old := self._blocks.pop(key, None):
+            self._size -= old[1]
+        self._blocks[key] = (block, size)
+        self._size += size
+        while self._size > self._max_bytes:
+            _, (_, evicted) = self._blocks.popitem(last=False)
+            self._size -= evicted
+
+
+def _hash_file(file_path: str) -> str:
+    with Path(file_path).open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _read_block(path: Path) -> dict[str, Any]:
+    block = json.loads(path.read_text(encoding="utf-8"))
+    # keep the access order across restarts
+    os.utime(path)
+    return block
+
+
+def _write_block(path: Path, data: str, evicted: list[Path]) -> None:
+    path.write_text(data, encoding="utf-8")
+    for i in evicted:
+        i.unlink(missing_ok=True)
@@ -1,11 +1,15 @@
+from asyncio import Event
 from enum import StrEnum
 from pathlib import Path
-from typing import Protocol
+from typing import TYPE_CHECKING, Protocol
 
 from fastapi import UploadFile
 
 from dive_mcp_host.host.helpers.context import ContextProtocol
 
+if TYPE_CHECKING:
+    from dive_mcp_host.host.store.attachment_cache import AttachmentCache
+
 SUPPORTED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 SUPPORTED_DOCUMENT_EXTENSIONS = {
     ".pdf",
@@ -104,18 +108,23 @@ class StoreManagerProtocol(ContextProtocol, Protocol):
         """Check if the file is a TEXT file."""
         ...
 
-    async def get_image(self, file_path: str) -> str | None:
+    async def get_image(
+        self, file_path: str, abort_signal: Event | None = None
+    ) -> str | None:
         """Get the base64 encoded image from the store.
 
-        Returns None if file is not found
+        Returns None if file is not found, or the abort signal is set.
         """
         ...
 
-    async def get_document(self, file_path: str) -> tuple[str | None, str | None]:
+    async def get_document(
+        self, file_path: str, abort_signal: Event | None = None
+    ) -> tuple[str | None, str | None]:
         """Get the base64 encoded document from the store.
 
         Args:
             file_path: The path to the document.
+            abort_signal: Stop encoding the document when set.
 
         Returns:
             tuple[str, str | None]: The base64 encoded document and the mime type.
@@ -125,3 +134,8 @@ class StoreManagerProtocol(ContextProtocol, Protocol):
     async def get_document_text(self, file_path: str) -> str | None:
         """Get document text content from the store."""
         ...
+
+    @property
+    def attachment_cache(self) -> "AttachmentCache | None":
+        """Get the cache of the converted attachments, None if disabled."""
+        return None
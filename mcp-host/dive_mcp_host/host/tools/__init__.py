@@ -76,6 +76,7 @@ class ToolManager(ContextProtocol):
         self._mcp_servers_task = dict[str, tuple[asyncio.Task, asyncio.Event]]()
         self._lock = asyncio.Lock()
         self._initialized_event = asyncio.Event()
+        self._generation = 0
 
         self._mcp_servers = {
             name: McpServer(
@@ -157,7 +158,8 @@ class ToolManager(ContextProtocol):
             event.set()
             logger.debug("ToolManager hutting down %s", name)
             await task
-            del self._mcp_servers[name]
+            # keep the generation growing without the server
+            self._generation += self._mcp_servers.pop(name).tools_generation
 
         logger.debug("Wait for lock")
         async with self._lock, asyncio.TaskGroup() as tg:
@@ -192,6 +194,7 @@ class ToolManager(ContextProtocol):
             to_launch = set(new_configs.keys())
 
         self._configs = new_configs
+        self._generation += 1
 
         logger.debug("To shutdown: %s, To launch: %s", to_shutdown, to_launch)
 
@@ -235,6 +238,17 @@ class ToolManager(ContextProtocol):
         """
         return {name: i.server_info for name, i in self._mcp_servers.items()}
 
+    @property
+    def generation(self) -> int:
+        """Get the tool-set generation.
+
+        It changes whenever the MCP servers are reloaded or restarted, or list
+        their tools again.
+        """
+        return self._generation + sum(
+            i.tools_generation for i in self._mcp_servers.values()
+        )
+
     @property
     def initialized_event(self) -> asyncio.Event:
         """Get the initialization event.
@@ -271,6 +285,7 @@ class ToolManager(ContextProtocol):
     async def restart_mcp_server(self, name: str) -> McpServerInfo:
         """Restart the MCP server."""
         server = self._mcp_servers[name]
+        self._generation += 1
         await self._shutdown_tools([name])
         self._mcp_servers[name] = server
         await self._launch_tools({name: server})
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from logging import getLogger
+
+from dive_mcp_host.host.errors import ToolCallQueueTimeoutError
+from dive_mcp_host.host.tools.model_types import ChatID
+
+logger = getLogger(__name__)
+
+
+class ToolCallScheduler:
+    """Limit the concurrent tool calls of an MCP server.
+
+    Calls waiting for a slot are queued per chat, and free slots are handed out
+    round robin between the chats. A chat with many parallel tool calls can't
+    monopolize a server shared with other chats.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent_calls: int | None = None,
+        queue_timeout: float | None = None,
+    ) -> None:
+        """Initialize the scheduler.
+
+        Args:
+            name: The name of the MCP server.
+            max_concurrent_calls: Max running calls, None for no limit.
+            queue_timeout: Seconds a call waits for a slot, None to wait forever.
+        """
+        self._name = name
+        self._max_concurrent_calls = max_concurrent_calls
+        self._queue_timeout = queue_timeout
+        self._running = 0
+        # chats in round robin order, each with its waiting calls
+        self._queues: dict[ChatID, deque[asyncio.Future[None]]] = {}
+
+    @property
+    def running(self) -> int:
+        """Running calls."""
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        """Calls waiting for a slot."""
+        return sum(len(i) for i in self._queues.values())
+
+    def _wake_next(self) -> None:
+        assert self._max_concurrent_calls is not None
+        while self._queues and self._running < self._max_concurrent_calls:
+            chat_id = next(iter(self._queues))
+            queue = self._queues.pop(chat_id)
+            waiter = queue.popleft()
+            if queue:
+                # move the chat to the end of the round
+                self._queues[chat_id] = queue
+            if not waiter.done():
+                self._running += 1
+                waiter.set_result(None)
+
+    def _remove(self, chat_id: ChatID, waiter: asyncio.Future[None]) -> None:
+        if (queue := self._queues.get(chat_id)) and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[chat_id]
+
+    async def _acquire(
+        self, chat_id: ChatID, abort_signal: asyncio.Event | None
+    ) -> float:
+        assert self._max_concurrent_calls is not None
+        if self._running < self._max_concurrent_calls and not self._queues:
+            self._running += 1
+            return 0.0
+
+        start = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(chat_id, deque()).append(waiter)
+        abort_task = asyncio.create_task(abort_signal.wait()) if abort_signal else None
+        try:
+            async with asyncio.timeout(self._queue_timeout):
+                await asyncio.wait(
+                    [waiter, abort_task] if abort_task else [waiter],
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+        except TimeoutError:
+            pass
+        except BaseException:
+            self._cancel_waiter(chat_id, waiter)
+            raise
+        finally:
+            if abort_task:
+                abort_task.cancel()
+
+        if waiter.done():
+            return time.perf_counter() - start
+        self._cancel_waiter(chat_id, waiter)
+        if abort_signal and abort_signal.is_set():
+            raise asyncio.CancelledError
+        raise ToolCallQueueTimeoutError(self._name, self._queue_timeout or 0)
+
+    def _cancel_waiter(self, chat_id: ChatID, waiter: asyncio.Future[None]) -> None:
+        if waiter.done() and not waiter.cancelled():
+            # the slot was handed over meanwhile
+            self._release()
+        else:
+            waiter.cancel()
+            self._remove(chat_id, waiter)
+
+    def _release(self) -> None:
+        self._running -= 1
+        self._wake_next()
+
+    @asynccontextmanager
+    async def slot(
+        self, chat_id: ChatID, abort_signal: asyncio.Event | None = None
+    ) -> AsyncGenerator[float, None]:
+        """Wait for a slot to call a tool.
+
+        Yields the seconds spent in the queue.
+
+        Raises:
+            ToolCallQueueTimeoutError: No slot was free within the queue timeout.
+            asyncio.CancelledError: The abort signal was set while waiting.
+        """
+        if self._max_concurrent_calls is None:
+            yield 0.0
+            return
+
+        wait = await self._acquire(chat_id, abort_signal)
+        if wait:
+            logger.debug(
+                "tool call slot of %s, chat_id: %s, waited: %.3fs, queued: %s",
+                self._name,
+                chat_id,
+                wait,
+                self.queued,
+            )
+        try:
+            yield wait
+        finally:
+            self._release()
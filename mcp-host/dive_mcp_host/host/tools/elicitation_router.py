@@ -0,0 +1,78 @@
+from logging import getLogger
+
+from mcp import ClientSession, types
+from mcp.client.session import ElicitationFnT
+
+from dive_mcp_host.host.tools.model_types import ChatID
+
+logger = getLogger(__name__)
+
+# _meta key of the elicitation naming the request it was made for
+RELATED_REQUEST_ID = "io.modelcontextprotocol/related-request-id"
+
+
+class ElicitationRouter:
+    """Route the elicitation requests of a shared session to the tool calls.
+
+    A stdio server has one session for all chats. Each tool call registers its
+    request id with the elicitation callback of its chat, and an elicitation
+    request goes to the call it names in _meta, by the related request id or
+    the progress token. If it doesn't name one, it goes to the chat of the
+    calls running on the session, as long as they all belong to the same chat.
+    """
+
+    def __init__(self, name: str) -> None:
+        """Initialize the router.
+
+        Args:
+            name: The name of the MCP server.
+        """
+        self._name = name
+        # running tool calls by session and request id, in the order they started
+        self._calls: dict[
+            tuple[ClientSession, types.RequestId], tuple[ChatID, ElicitationFnT]
+        ] = {}
+
+    def __len__(self) -> int:
+        """Number of the registered tool calls."""
+        return len(self._calls)
+
+    def register(
+        self,
+        session: ClientSession,
+        request_id: types.RequestId,
+        chat_id: ChatID,
+        callback: ElicitationFnT,
+    ) -> None:
+        """Register the elicitation callback of a running tool call."""
+        self._calls[(session, request_id)] = (chat_id, callback)
+
+    def unregister(self, session: ClientSession, request_id: types.RequestId) -> None:
+        """Remove a finished tool call."""
+        self._calls.pop((session, request_id), None)
+
+    def route(
+        self, session: ClientSession, params: types.ElicitRequestParams
+    ) -> ElicitationFnT | None:
+        """Find the callback of the tool call an elicitation is for."""
+        if params.meta is not None:
+            extra = params.meta.model_extra or {}
+            for request_id in (
+                extra.get(RELATED_REQUEST_ID),
+                params.meta.progressToken,
+            ):
+                if (call := self._calls.get((session, request_id))) is not None:  # type: ignore[arg-type]
+                    return call[1]
+        calls = [call for key, call in self._calls.items() if key[0] is session]
+        chats = {chat_id for chat_id, _ in calls}
+        if len(chats) == 1:
+            # the latest call of the only chat
+            return calls[-1][1]
+        if chats:
+            logger.warning(
+                "Elicitation of %s doesn't name its tool call, "
+                "and the running calls belong to %s chats",
+                self._name,
+                len(chats),
+            )
+        return None
@@ -1,8 +1,47 @@
 from copy import deepcopy
+from logging import getLogger
 from typing import Any
 
 import httpx
+from mcp import ClientSession as _ClientSession
 from mcp.shared._httpx_utils import McpHttpClientFactory, create_mcp_http_client
+from mcp.types import ErrorData, RequestId
+
+logger = getLogger(__name__)
+
+
+class ClientSession(_ClientSession):
+    """Client session dropping the late responses of the cancelled requests.
+
+    The session forgets a request once its caller is cancelled, and the SDK
+    hands the response arriving afterwards to the message handler as an
+    error. The responses of the requests no longer waited for are dropped
+    instead, the session is still usable.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the client session."""
+        super().__init__(*args, **kwargs)
+        self.add_response_router(_LateResponseRouter(self))
+
+
+class _LateResponseRouter:
+    """Claims the responses of the requests no longer waited for."""
+
+    def __init__(self, session: ClientSession) -> None:
+        self._session = session
+
+    def _is_late(self, request_id: RequestId) -> bool:
+        if request_id in self._session._response_streams:  # noqa: SLF001
+            return False
+        logger.debug("ignore late response of request %s", request_id)
+        return True
+
+    def route_response(self, request_id: RequestId, response: dict[str, Any]) -> bool:  # noqa: ARG002
+        return self._is_late(request_id)
+
+    def route_error(self, request_id: RequestId, error: ErrorData) -> bool:  # noqa: ARG002
+        return self._is_late(request_id)
 
 
 def create_mcp_http_client_factory(
@@ -1,6 +1,7 @@
 """Copy of mcp.client.stdio.stdio_client."""
 
 import asyncio
+import codecs
 import logging
 import subprocess
 import sys
@@ -25,6 +26,7 @@ from mcp.os.win32.utilities import (
 )
 from mcp.shared.message import SessionMessage
 
+from dive_mcp_host.host.errors import StdioFrameTooLargeError
 from dive_mcp_host.host.tools.log import LogProxy
 
 logger = logging.getLogger(__name__)
@@ -50,6 +52,12 @@ DEFAULT_INHERITED_ENV_VARS = (
 
 PROCESS_TERMINATION_TIMEOUT = 2.0
 
+# Max size of a message from the server
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+# Messages buffered between the process and the session
+STREAM_BUFFER_SIZE = 16
+
 
 class CanceledFnT(Protocol):
     """Set cancled flag."""
@@ -58,11 +66,57 @@ class CanceledFnT(Protocol):
         """Set cancled flag."""
 
 
+class LineFramer:
+    """Split the stdout of the server into newline delimited messages.
+
+    Only the newly read bytes are searched for the newline, so a long message
+    costs linear time. A message longer than max_frame_size is dropped up to
+    its newline and reported as StdioFrameTooLargeError.
+    """
+
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE) -> None:
+        """Initialize the framer.
+
+        Args:
+            max_frame_size: Max size of a message in bytes.
+        """
+        self._max_frame_size = max_frame_size
+        self._buffer = bytearray()
+        # bytes of the buffer already searched for the newline
+        self._scanned = 0
+        # dropping the rest of a message too large
+        self._dropping = False
+
+    def feed(self, data: bytes) -> list[bytearray | StdioFrameTooLargeError]:
+        """Add the read bytes, returns the completed messages."""
+        frames: list[bytearray | StdioFrameTooLargeError] = []
+        self._buffer += data
+        start = 0
+        while (end := self._buffer.find(b"\n", max(start, self._scanned))) != -1:
+            if self._dropping:
+                self._dropping = False
+            elif end - start > self._max_frame_size:
+                frames.append(StdioFrameTooLargeError(self._max_frame_size))
+            else:
+                frames.append(self._buffer[start:end])
+            start = end + 1
+        del self._buffer[:start]
+        self._scanned = len(self._buffer)
+        if self._scanned > self._max_frame_size:
+            if not self._dropping:
+                frames.append(StdioFrameTooLargeError(self._max_frame_size))
+                self._dropping = True
+            self._buffer.clear()
+            self._scanned = 0
+        return frames
+
+
 @asynccontextmanager
 async def stdio_client(
     server: StdioServerParameters,
     errlog: LogProxy,
     is_canceled_callback: CanceledFnT | None = None,
+    max_frame_size: int = MAX_FRAME_SIZE,
 ) -> AsyncGenerator[
     tuple[
         MemoryObjectReceiveStream[SessionMessage | Exception],
@@ -80,8 +134,17 @@ async def stdio_client(
     write_stream: MemoryObjectSendStream[SessionMessage]
     write_stream_reader: MemoryObjectReceiveStream[SessionMessage]
 
-    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
-    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(
+        STREAM_BUFFER_SIZE
+    )
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(
+        STREAM_BUFFER_SIZE
+    )
+    # pydantic parses utf-8 bytes directly, other encodings are decoded first
+    decode_bytes = (
+        codecs.lookup(server.encoding).name != "utf-8"
+        or server.encoding_error_handler != "strict"
+    )
 
     command = _get_executable_command(server.command)
 
@@ -117,19 +180,27 @@ async def stdio_client(
 
         try:
             async with read_stream_writer:
-                buffer = ""
-                async for chunk in TextReceiveStream(
-                    process.stdout,
-                    encoding=server.encoding,
-                    errors=server.encoding_error_handler,
-                ):
-                    lines = (buffer + chunk).split("\n")
-                    buffer = lines.pop()
-                    for line in lines:
+                framer = LineFramer(max_frame_size)
+                async for chunk in process.stdout:
+                    for line in framer.feed(chunk):
+                        if isinstance(line, StdioFrameTooLargeError):
+                            logger.error("Error reading message: %s", line)
+                            await read_stream_writer.send(line)
+                            continue
+                        if not line.strip():
+                            continue
                         try:
-                            message = types.JSONRPCMessage.model_validate_json(line)
+                            message = types.JSONRPCMessage.model_validate_json(
+                                line.decode(
+                                    server.encoding, server.encoding_error_handler
+                                )
+                                if decode_bytes
+                                else line
+                            )
                         except Exception as exc:  # noqa: BLE001
-                            logger.error("Error validating message: %s, %s", exc, line)
+                            logger.error(
+                                "Error validating message: %s, %.1000s", exc, line
+                            )
                             await read_stream_writer.send(exc)
                             continue
 
@@ -40,11 +40,12 @@ from dive_mcp_host.host.custom_events import (
 )
 from dive_mcp_host.host.errors import (
     InvalidMcpServerError,
-    McpSessionClosedOrFailedError,
     McpSessionGroupError,
-    McpSessionNotInitializedError,
+    ToolCallQueueTimeoutError,
 )
 from dive_mcp_host.host.helpers.context import ContextProtocol
+from dive_mcp_host.host.tools.call_scheduler import ToolCallScheduler
+from dive_mcp_host.host.tools.elicitation_router import ElicitationRouter
 from dive_mcp_host.host.tools.hack import (
     ClientSession,
     create_mcp_http_client_factory,
@@ -54,7 +55,11 @@ from dive_mcp_host.host.tools.hack.httpx_wrapper import AsyncClient
 from dive_mcp_host.host.tools.local_http_server import local_http_server
 from dive_mcp_host.host.tools.log import LogBuffer, LogProxy
 from dive_mcp_host.host.tools.model_types import ChatID, ClientState
-from dive_mcp_host.host.tools.server_session_store import ServerSessionStore
+from dive_mcp_host.host.tools.result_cache import ToolResultCache
+from dive_mcp_host.host.tools.server_session_store import (
+    MAX_IDLE_TIME,
+    ServerSessionStore,
+)
 
 if TYPE_CHECKING:
     from collections.abc import AsyncGenerator, Awaitable, Callable
@@ -77,6 +82,9 @@ if TYPE_CHECKING:
 
 logger = getLogger(__name__)
 
+# the server restarts or stopped in these states
+_STALE_RESULT_STATES = (ClientState.FAILED, ClientState.RESTARTING, ClientState.CLOSED)
+
 
 class ToolInfo(types.Tool):
     """Custom tool info with extra info."""
@@ -168,8 +176,9 @@ class McpServer(ContextProtocol):
         self._initialize_result: types.InitializeResult | None = None
         self._exception: BaseException | BaseExceptionGroup | None = None
         self._mcp_tools: list[McpTool] = []
+        # Bumped every time the tools are listed again
+        self._tools_generation: int = 0
         self._retries: int = 0
-        self._last_active: float = 0
 
         # Background task for the server.
         # Used for stdio, and local http server.
@@ -177,14 +186,31 @@ class McpServer(ContextProtocol):
 
         # stdio can only have one session at a time
         self._stdio_client_session: ClientSession | None = None
-        # Current elicitation callback for stdio sessions (set per tool call)
-        self._stdio_elicitation_callback: ElicitationFnT | None = None
+        # Routes the elicitations of the shared stdio session to the tool calls
+        self._elicitation_router = ElicitationRouter(self.name)
 
         # Each session is mapped to a chat_id
-        self._session_store: ServerSessionStore = ServerSessionStore(self.name)
+        self._session_store: ServerSessionStore = ServerSessionStore(
+            self.name, keep_alive=self.config.keep_alive
+        )
+
+        # Limits the concurrent tool calls, shared by all sessions
+        self._call_scheduler = ToolCallScheduler(
+            self.name,
+            max_concurrent_calls=self.config.max_concurrent_calls,
+            queue_timeout=self.config.call_queue_timeout,
+        )
+        # Results of the read-only tools, shared by all sessions
+        self._result_cache = ToolResultCache(
+            self.name,
+            ttl=self.config.result_cache_ttl,
+            max_bytes=self.config.result_cache_max_bytes,
+        )
 
         # The pid of the server process
         self._pid: int | None = None
+        # The pids of the running replicas of a stdio server, by session key
+        self._replica_pids: dict[str, int] = {}
 
         """Methods for different server types."""
         if self.config.command:
@@ -208,6 +234,26 @@ class McpServer(ContextProtocol):
             kwargs={"verify": self.config.verify},
         )
 
+    @property
+    def call_scheduler(self) -> ToolCallScheduler:
+        """The scheduler limiting the concurrent tool calls."""
+        return self._call_scheduler
+
+    @property
+    def elicitation_router(self) -> ElicitationRouter:
+        """The router of the elicitations to the running tool calls."""
+        return self._elicitation_router
+
+    @property
+    def result_cache(self) -> ToolResultCache:
+        """The cache of the read-only tool results."""
+        return self._result_cache
+
+    @property
+    def replica_pids(self) -> dict[str, int]:
+        """The pids of the running replicas, keyed by replica."""
+        return dict(self._replica_pids)
+
     @property
     def session_count(self) -> int:
         """Retrive the session count."""
@@ -239,9 +285,22 @@ class McpServer(ContextProtocol):
 
         if isinstance(message, Exception):
             raise message
+        if isinstance(message, types.ServerNotification) and isinstance(
+            message.root, types.ToolListChangedNotification
+        ):
+            # the tools may behave differently after the change
+            self._result_cache.clear()
+
+    async def _init_tool_info(
+        self, session: ClientSession, list_tools: bool = True
+    ) -> None:
+        """Initialize the session.
 
-    async def _init_tool_info(self, session: ClientSession) -> None:
-        """Initialize the session."""
+        Args:
+            session: The session.
+            list_tools: Whether to list the tools, the replicas of a stdio server
+                share the tools listed by the first process.
+        """
         logger.debug(
             "Client %s initalizing with timeout: %s",
             self.name,
@@ -255,9 +314,12 @@ class McpServer(ContextProtocol):
                 self.name,
                 self._initialize_result,
             )
-        tool_results = await session.list_tools()
-        self._last_active = time.time()
-        mcp_tools = [McpTool.from_tool(tool, self) for tool in tool_results.tools]
+        if list_tools:
+            tool_results = await session.list_tools()
+            mcp_tools = [McpTool.from_tool(tool, self) for tool in tool_results.tools]
+        else:
+            tool_results = self._tool_results
+            mcp_tools = self._mcp_tools
         logger.debug(
             "Client %s initialized successfully with %d tools",
             self.name,
@@ -266,6 +328,8 @@ class McpServer(ContextProtocol):
         async with self._cond:
             self._tool_results = tool_results
             self._mcp_tools = mcp_tools
+            if list_tools:
+                self._tools_generation += 1
             self._exception = None
             self._retries = 0
             await self.__change_state(ClientState.RUNNING, None, None)
@@ -308,6 +372,11 @@ class McpServer(ContextProtocol):
             result.append(tool)
         return result
 
+    @property
+    def tools_generation(self) -> int:
+        """Get how many times the tools were listed."""
+        return self._tools_generation
+
     @property
     def mcp_tools(self) -> list[McpTool]:
         """Get the tools."""
@@ -375,6 +444,9 @@ class McpServer(ContextProtocol):
             if e is not False:
                 self._exception = e
             self._client_status = new_state
+            if new_state in _STALE_RESULT_STATES:
+                # the server restarts or stopped, the results may be stale
+                self._result_cache.clear()
             log_msg = f"client status changed, {self.name} {new_state}, error: {e}"
             logger.debug(log_msg)
             await self._log_buffer.push_state_change(inpt=log_msg, state=new_state)
@@ -408,6 +480,8 @@ class McpServer(ContextProtocol):
         restart_client: Callable[[Exception], bool] = lambda _: False,
         auth_handler: Callable[[AuthorizationProgress], Awaitable[None]] | None = None,
         elicitation_callback: ElicitationFnT | None = None,
+        *,
+        max_idle_time: float = MAX_IDLE_TIME,
     ) -> AsyncGenerator[ClientSession, None]:
         """Get the session ctx mgr from the session store, and handle session errors.
 
@@ -419,6 +493,7 @@ class McpServer(ContextProtocol):
                 If the exception is restartable, return True.
             auth_handler: The function to handle the authorization progress.
             elicitation_callback: The callback for handling elicitation.
+            max_idle_time: Seconds without use before a new session is closed.
 
         This wrapper get the session from the session store, and handle the session
         errors.
@@ -432,6 +507,7 @@ class McpServer(ContextProtocol):
                 session_creator,
                 auth_handler,
                 elicitation_callback,
+                max_idle_time=max_idle_time,
             ) as session:
                 yield session
         except (ToolException, McpError) as e:
@@ -476,41 +552,75 @@ class McpServer(ContextProtocol):
             async with self._cond:
                 self._cond.notify_all()
 
+    async def _shared_elicitation_callback(
+        self,
+        context: RequestContext[ClientSession, Any],
+        params: types.ElicitRequestParams,
+    ) -> types.ElicitResult | types.ErrorData:
+        """Elicitation callback for the sessions shared by the chats.
+
+        Stdio and pooled http sessions are shared by the chats, the request is
+        routed to the callback of the tool call it was made for.
+        """
+        logger.debug(
+            "shared elicitation callback called for %s, message: %s, schema: %s",
+            self.name,
+            params.message,
+            params.requestedSchema,  # type: ignore[attr-defined]
+        )
+        if callback := self._elicitation_router.route(context.session, params):
+            return await callback(context, params)
+        # No callback set, decline the request
+        logger.warning(
+            "No elicitation callback set for shared session %s, declining request: %s",
+            self.name,
+            params.message,
+        )
+        return types.ElicitResult(action="decline", content=None)  # type: ignore[arg-type]
+
+    def _pooled_session_key(
+        self, prefix: str, min_size: int, max_size: int, idle_timeout: float
+    ) -> tuple[str, float]:
+        """Pick the pooled session for a new tool call.
+
+        The call goes to an idle session, a new session is opened while all of
+        them are busy and there are less than max_size, otherwise the call goes
+        to the least loaded one. The sessions beyond min_size are closed after
+        idle_timeout seconds without calls.
+
+        Returns:
+            The session key and its max idle time.
+        """
+        keys = [f"{prefix}-{i}" for i in range(max_size)]
+        loads = [self._session_store.load(key) for key in keys]
+        running = [
+            (load, index) for index, load in enumerate(loads) if load is not None
+        ]
+        if not running or (min(running)[0] > 0 and len(running) < max_size):
+            index = loads.index(None)
+        else:
+            index = min(running)[1]
+        max_idle_time = MAX_IDLE_TIME if index < min_size else idle_timeout
+        logger.debug(
+            "pooled session of %s: %s, loads: %s", self.name, keys[index], loads
+        )
+        return keys[index], max_idle_time
+
     @asynccontextmanager
-    async def _stdio_client_watcher(self) -> AsyncGenerator[ClientSession, None]:
+    async def _stdio_client_watcher(
+        self, list_tools: bool = True, replica: str | None = None
+    ) -> AsyncGenerator[ClientSession, None]:
         """Client watcher task.
 
         Restart the client if need.
         Only this watcher can set the client status to RUNNING / FAILED.
-        """
-
-        async def _stdio_elicitation_callback(
-            context: RequestContext[ClientSession, Any],
-            params: types.ElicitRequestParams,
-        ) -> types.ElicitResult | types.ErrorData:
-            """Default elicitation callback for stdio sessions.
-
-            This callback delegates to the currently set callback on the server.
-            Since stdio sessions are shared, the callback is set per tool call
-            via _stdio_elicitation_callback attribute.
-            """
-            logger.debug(
-                "stdio elicitation callback called for %s, message: %s, schema: %s",
-                self.name,
-                params.message,
-                params.requestedSchema,  # type: ignore[attr-defined]
-            )
-            if callback := self._stdio_elicitation_callback:
-                return await callback(context, params)
-            # No callback set, decline the request
-            logger.warning(
-                "No elicitation callback set for stdio session %s, "
-                "declining request: %s",
-                self.name,
-                params.message,
-            )
-            return types.ElicitResult(action="decline", content=None)  # type: ignore[arg-type]
+        A failed replica only sets the status to FAILED if no other replica
+        is running.
 
+        Args:
+            list_tools: Whether to list the tools after the initialization.
+            replica: The session key of the replica, None without replicas.
+        """
         env = os.environ.copy()
         env.update(self.config.env)
 
@@ -532,17 +642,28 @@ class McpServer(ContextProtocol):
                     ),
                     errlog=self._stderr_log_proxy,
                     is_canceled_callback=_is_canceled,
+                    max_frame_size=self.config.max_frame_size,
                 ) as (stream_read, stream_send, pid),
                 ClientSession(
                     stream_read,
                     stream_send,
                     message_handler=self._message_handler,
-                    elicitation_callback=_stdio_elicitation_callback,
+                    elicitation_callback=self._shared_elicitation_callback,
                 ) as session,
             ):
-                self._pid = pid
-                await self._init_tool_info(session)
-                yield session
+                if replica is not None:
+                    self._replica_pids[replica] = pid
+                elif self._pid not in (None, pid):
+                    # a new process, the results may be stale
+                    self._result_cache.clear()
+                if replica is None:
+                    self._pid = pid
+                try:
+                    await self._init_tool_info(session, list_tools)
+                    yield session
+                finally:
+                    if replica is not None:
+                        self._replica_pids.pop(replica, None)
                 return
         except* ProcessLookupError as eg:
             # this raised when a stdio process is exited
@@ -601,7 +722,11 @@ class McpServer(ContextProtocol):
         # Do not set the state to closed when it is actually just canceled by
         # 'chat abort'.
         async with self._cond:
-            if self._client_status != ClientState.CLOSED and not stop_by_cancel:
+            if (
+                self._client_status != ClientState.CLOSED
+                and not stop_by_cancel
+                and not self._other_replicas_running(replica)
+            ):
                 await self.__change_state(ClientState.FAILED, None, False)
 
     async def _stdio_setup(self) -> None:
@@ -637,53 +762,45 @@ class McpServer(ContextProtocol):
                 with suppress(asyncio.CancelledError):
                     await self._server_task
 
-    async def _stdio_wait_for_session(self) -> ClientSession:
-        """Only called by the session context manager."""
-        await self.wait([ClientState.RUNNING])
-        if self._client_status in [ClientState.FAILED, ClientState.CLOSED]:
-            logger.error(
-                "Session failed or closed for %s: %s",
-                self.name,
-                self._client_status,
-            )
-            raise McpSessionClosedOrFailedError(self.name, self._client_status.name)
-        now = time.time()
-        if self._client_status == ClientState.RUNNING and self._stdio_client_session:
-            # check if the session is still active
-            try:
-                logger.debug(
-                    "Checking session health for %s (inactive for %.1f seconds)",
-                    self.name,
-                    now - self._last_active,
-                )
-                async with asyncio.timeout(10):
-                    await self._stdio_client_session.send_ping()
-                    self._last_active = time.time()
-            except Exception as e:  # noqa: BLE001
-                logger.error(
-                    "Keep-alive error for %s: %s",
-                    self.name,
-                    e,
-                    extra={
-                        "mcp_server": self.name,
-                        "client_status": self._client_status,
-                    },
-                )
-                async with self._cond:
-                    await self.__change_state(
-                        ClientState.RESTARTING, [ClientState.RUNNING], e
-                    )
+    def _other_replicas_running(self, replica: str | None) -> bool:
+        """Check if a replica other than the given one is running."""
+        return replica is not None and any(k != replica for k in self._replica_pids)
 
-        if self._client_status == ClientState.RUNNING and self._stdio_client_session:
-            return self._stdio_client_session
+    def _stdio_replica(self) -> tuple[str, float]:
+        """Pick the stdio process for a new tool call.
 
-        logger.error(
-            "Session not initialized, %s status: %s",
-            self.name,
-            self._client_status,
-            extra={"mcp_server": self.name, "client_status": self._client_status},
+        Without replicas all the calls share the "default" process, otherwise
+        the replicas are pooled sessions, one process each.
+
+        Returns:
+            The session key of the replica and its max idle time.
+        """
+        replicas = self.config.replicas
+        if replicas is None:
+            return "default", MAX_IDLE_TIME
+        return self._pooled_session_key(
+            "replica", replicas.min, replicas.max, replicas.idle_timeout
+        )
+
+    def _http_pooled_session(
+        self, chat_id: ChatID, elicitation_callback: ElicitationFnT | None
+    ) -> tuple[str, float, ElicitationFnT | None]:
+        """Pick the session of a http server for a new tool call.
+
+        Without a session pool each chat has its own session. With a pool the
+        chats share the pooled sessions, and the elicitation requests are
+        routed to the tool calls like on a stdio session.
+
+        Returns:
+            The session key, its max idle time and its elicitation callback.
+        """
+        pool = self.config.session_pool
+        if pool is None:
+            return chat_id, MAX_IDLE_TIME, elicitation_callback
+        key, max_idle_time = self._pooled_session_key(
+            "pool", pool.min_idle, pool.max_size, pool.idle_timeout
         )
-        raise McpSessionNotInitializedError(self.name)
+        return key, max_idle_time, self._shared_elicitation_callback
 
     def _stdio_session(
         self,
@@ -692,36 +809,43 @@ class McpServer(ContextProtocol):
             [AuthorizationProgress], Awaitable[None]
         ]
         | None = None,
-        elicitation_callback: ElicitationFnT | None = None,
+        elicitation_callback: ElicitationFnT | None = None,  # noqa: ARG002
     ) -> AbstractAsyncContextManager[ClientSession]:
         """Get the session.
 
-        Only one session can exist at a time for a McpStdioServer instance.
+        Only one session can exist at a time for a McpStdioServer instance,
+        or one per process if the server has replicas.
 
-        The elicitation_callback is stored on the server instance and used by
-        the shared stdio session's callback during tool execution.
+        The session is shared by the chats, the tool calls register their
+        elicitation callbacks on the elicitation router instead.
 
         Returns:
             The context manager for the session.
         """
-        self._stdio_elicitation_callback = elicitation_callback
+        key, max_idle_time = self._stdio_replica()
+        replica = None if self.config.replicas is None else key
 
         @asynccontextmanager
         async def _create(**_kwargs: Any) -> AsyncGenerator[ClientSession, None]:
             """Create new session."""
-            # Set the elicitation callback for this tool call
             try:
-                async with self._stdio_client_watcher() as session:
-                    await session.initialize()
+                # the watcher already initialized the session, the tools of
+                # the replicas were listed by _stdio_setup
+                async with self._stdio_client_watcher(
+                    list_tools=replica is None, replica=replica
+                ) as session:
                     yield session
             except (BaseException, Exception):
                 logger.exception("stdio session create error, chat_id: %s", chat_id)
                 raise
-            finally:
-                # Clear the callback after the session context ends
-                self._stdio_elicitation_callback = None
 
-        return self._session_ctx_mgr_wrapper("default", _create, lambda _: True)
+        # a failed replica is replaced by the pool while others are running
+        return self._session_ctx_mgr_wrapper(
+            key,
+            _create,
+            lambda _: not self._other_replicas_running(replica),
+            max_idle_time=max_idle_time,
+        )
 
     def _http_get_client(
         self,
@@ -887,7 +1011,7 @@ class McpServer(ContextProtocol):
     ) -> AbstractAsyncContextManager[ClientSession]:
         """Get the session.
 
-        Only one session can exist at a time for a McpStdioServer instance.
+        Each chat has its own session, unless the server has a session pool.
 
         Returns:
             The context manager for the session.
@@ -932,11 +1056,15 @@ class McpServer(ContextProtocol):
                 logger.exception("http session error, chat_id: %s", chat_id)
                 raise
 
+        key, max_idle_time, elicitation_callback = self._http_pooled_session(
+            chat_id, elicitation_callback
+        )
         return self._session_ctx_mgr_wrapper(
-            chat_id,
+            key,
             _create,
             auth_handler=auth_handler,
             elicitation_callback=elicitation_callback,
+            max_idle_time=max_idle_time,
         )
 
     async def _local_http_process_watcher(self) -> None:
@@ -953,6 +1081,9 @@ class McpServer(ContextProtocol):
                     env=env,
                 ) as proc:
                     async with self._cond:
+                        if self._pid not in (None, proc[2]):
+                            # a new process, the results may be stale
+                            self._result_cache.clear()
                         self._init_result, tool_results, self._pid = proc
                         self._mcp_tools = [
                             McpTool.from_tool(tool, self) for tool in tool_results.tools
@@ -1038,7 +1169,7 @@ class McpServer(ContextProtocol):
     ) -> AbstractAsyncContextManager[ClientSession]:
         """Get the session.
 
-        Only one session can exist at a time for a McpStdioServer instance.
+        Each chat has its own session, unless the server has a session pool.
 
         Returns:
             The context manager for the session.
@@ -1068,11 +1199,15 @@ class McpServer(ContextProtocol):
                 logger.exception("local http session error, chat_id: %s", chat_id)
                 raise
 
+        key, max_idle_time, elicitation_callback = self._http_pooled_session(
+            chat_id, elicitation_callback
+        )
         return self._session_ctx_mgr_wrapper(
-            chat_id,
+            key,
             _create,
             lambda e: isinstance(e, httpx.ConnectError),
             elicitation_callback=elicitation_callback,
+            max_idle_time=max_idle_time,
         )
 
     @property
@@ -1131,6 +1266,12 @@ class McpTool(BaseTool):
     description: str = ""
     mcp_server: McpServer
     kwargs_arg: bool = False
+    annotations: types.ToolAnnotations | None = None
+
+    @property
+    def read_only(self) -> bool:
+        """Whether the tool is hinted as read-only, its results can be cached."""
+        return bool(self.annotations and self.annotations.readOnlyHint)
 
     def _run(
         self,
@@ -1219,6 +1360,10 @@ class McpTool(BaseTool):
         logger.debug(
             "Executing tool %s.%s with args: %s", self.toolkit_name, self.name, kwargs
         )
+        result_cache = self.mcp_server.result_cache
+        if self.read_only and (cached := result_cache.get(self.name, kwargs)):
+            logger.debug("Tool %s.%s result from cache", self.toolkit_name, self.name)
+            return to_json(cached.content).decode()
 
         async def _abort_task(tool_task: asyncio.Task) -> None:
             assert abort_signal
@@ -1233,15 +1378,28 @@ class McpTool(BaseTool):
         )
 
         current_request_id = None
+        elicitation_router = self.mcp_server.elicitation_router
 
         async def _request_id(request_id: int) -> None:
             nonlocal current_request_id
             current_request_id = request_id
+            # registered before the request is sent, the server may elicit at once
+            elicitation_router.register(
+                session, request_id, chat_id, elicitation_callback
+            )
 
+        queue_wait = 0.0
+        started = time.perf_counter()
         try:
-            async with self.mcp_server.session(
-                chat_id, auth_callback, elicitation_callback
-            ) as session:
+            async with (
+                self.mcp_server.call_scheduler.slot(
+                    chat_id, abort_signal
+                ) as queue_wait,
+                self.mcp_server.session(
+                    chat_id, auth_callback, elicitation_callback
+                ) as session,
+            ):
+                started = time.perf_counter()
                 try:
                     tool_task = asyncio.create_task(
                         session.call_tool(
@@ -1254,6 +1412,8 @@ class McpTool(BaseTool):
                     if abort_signal:
                         abort_task = asyncio.create_task(_abort_task(tool_task))
                     result = await tool_task
+                    if self.read_only:
+                        result_cache.put(self.name, kwargs, result)
                 except asyncio.CancelledError:
                     logger.warning(
                         "tool call cancelled, "
@@ -1282,11 +1442,18 @@ class McpTool(BaseTool):
                             ),
                             current_request_id,
                         )
-
-                    raise
+                    if (task := asyncio.current_task()) is None or task.cancelling():
+                        raise
+                    # only the call was aborted, the session may be shared by
+                    # other calls, keep it open
+                    result = types.CallToolResult(
+                        content=[types.TextContent(type="text", text="<user_aborted>")],
+                    )
                 finally:
                     if abort_task:
                         abort_task.cancel()
+                    if current_request_id is not None:
+                        elicitation_router.unregister(session, current_request_id)
         except asyncio.CancelledError:
             # the session context raises CancelledError.
             logger.warning(
@@ -1300,6 +1467,11 @@ class McpTool(BaseTool):
             result = types.CallToolResult(
                 content=[types.TextContent(type="text", text="<user_aborted>")],
             )
+        except ToolCallQueueTimeoutError as e:
+            result = types.CallToolResult(
+                content=[types.TextContent(type="text", text=str(e))],
+                isError=True,
+            )
         finally:
             with suppress(Exception):
                 custom_event_queue.put_nowait(None)
@@ -1314,7 +1486,13 @@ class McpTool(BaseTool):
                 self.name,
                 content,
             )
-        logger.debug("Tool %s.%s executed successfully", self.toolkit_name, self.name)
+        logger.debug(
+            "Tool %s.%s executed successfully, queue wait: %.3fs, execution: %.3fs",
+            self.toolkit_name,
+            self.name,
+            queue_wait,
+            time.perf_counter() - started,
+        )
         return content
 
     @classmethod
@@ -1330,4 +1508,5 @@ class McpTool(BaseTool):
             mcp_server=mcp_server,
             kwargs_arg="kwargs" in tool.inputSchema,
             args_schema=input_schema,
+            annotations=tool.annotations,
         )
@@ -0,0 +1,111 @@
+import json
+import time
+from collections import OrderedDict
+from logging import getLogger
+from typing import Any
+
+from mcp import types
+from pydantic_core import to_json
+
+logger = getLogger(__name__)
+
+
+def cache_key(tool_name: str, arguments: dict[str, Any]) -> str:
+    """The key of a tool call, the same for arguments in any order."""
+    arguments_json = json.dumps(
+        arguments, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return f"{tool_name}:{arguments_json}"
+
+
+class ToolResultCache:
+    """Cache the results of the read-only tools of an MCP server.
+
+    Entries expire after ttl seconds, and the least recently used entries are
+    dropped to keep the results under max_bytes.
+    """
+
+    def __init__(self, name: str, ttl: float | None, max_bytes: int) -> None:
+        """Initialize the cache.
+
+        Args:
+            name: The name of the MCP server.
+            ttl: Seconds a result is kept, None to disable the cache.
+            max_bytes: Max total size of the cached results.
+        """
+        self._name = name
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._size = 0
+        # key -> (expire time, size, result), in least recently used order
+        self._entries: OrderedDict[str, tuple[float, int, types.CallToolResult]] = (
+            OrderedDict()
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache is enabled."""
+        return self._ttl is not None and self._max_bytes > 0
+
+    @property
+    def size(self) -> int:
+        """Total size of the cached results in bytes."""
+        return self._size
+
+    def __len__(self) -> int:
+        """Number of the cached results."""
+        return len(self._entries)
+
+    def _pop(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+
+    def get(
+        self, tool_name: str, arguments: dict[str, Any]
+    ) -> types.CallToolResult | None:
+        """Get the cached result of a tool call."""
+        if not self.enabled:
+            return None
+        key = cache_key(tool_name, arguments)
+        if (entry := self._entries.get(key)) is None:
+            return None
+        expire, _, result = entry
+        if expire <= time.monotonic():
+            self._pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def put(
+        self,
+        tool_name: str,
+        arguments: dict[str, Any],
+        result: types.CallToolResult,
+    ) -> None:
+        """Cache the result of a tool call, errors are not cached."""
+        if not self.enabled or result.isError:
+            return
+        assert self._ttl is not None
+        key = cache_key(tool_name, arguments)
+        size = len(key) + len(to_json(result))
+        if size > self._max_bytes:
+            logger.debug(
+                "tool result too large to cache, %s.%s: %s bytes",
+                self._name,
+                tool_name,
+                size,
+            )
+            return
+        if key in self._entries:
+            self._pop(key)
+        while self._size + size > self._max_bytes:
+            self._pop(next(iter(self._entries)))
+        self._entries[key] = (time.monotonic() + self._ttl, size, result)
+        self._size += size
+
+    def clear(self) -> None:
+        """Drop all cached results."""
+        if self._entries:
+            logger.debug("clear tool result cache of %s", self._name)
+        self._entries.clear()
+        self._size = 0
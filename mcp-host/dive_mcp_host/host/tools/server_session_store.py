@@ -18,6 +18,9 @@ logger = getLogger(__name__)
 
 
 MAX_IDLE_TIME = 300
+# Default seconds between the keep-alive checks of a session
+KEEP_ALIVE_INTERVAL = 60
+PING_TIMEOUT = 10
 
 
 class AbortError(Exception):
@@ -38,6 +41,10 @@ class _SessionStoreItem:
     - client_tasks: The tasks that use the session.
     - exec: The exception that occurred in the session.
     - active_ts: The timestamp when the session is active.
+    - traffic_ts: The timestamp of the last traffic on the session, a tool call
+      or a ping.
+    - keep_alive: Seconds between the keep-alive checks.
+    - max_idle_time: Seconds without use before the session is closed.
     - auth_handler: The OAuth authorization progress handler.
     - elicitation_callback: The callback for handling elicitation requests.
     """
@@ -50,34 +57,56 @@ class _SessionStoreItem:
     client_tasks: list[asyncio.Task[Any]] = field(default_factory=list)
     exec: BaseException | None = None
     active_ts: float = field(default_factory=time.time)
+    traffic_ts: float = field(default_factory=time.time)
+    keep_alive: float = KEEP_ALIVE_INTERVAL
+    max_idle_time: float = MAX_IDLE_TIME
     auth_handler: Callable[[AuthorizationProgress], Awaitable[None]] | None = None
     elicitation_callback: ElicitationFnT | None = None
 
     async def waiting_loop(self) -> None:
         while True:
-            await asyncio.sleep(60)
+            await asyncio.sleep(min(self.keep_alive, self.max_idle_time))
+            now = time.time()
             if (
-                time.time() - self.active_ts > MAX_IDLE_TIME
+                now - self.active_ts > self.max_idle_time
                 and len(self.client_tasks) == 0
             ):
                 return
-            if self.session:
-                await self.session.send_ping()
+            # Running calls and recent traffic show the session is alive,
+            # only ping a quiet session.
+            if (
+                self.session
+                and len(self.client_tasks) == 0
+                and now - self.traffic_ts >= self.keep_alive
+            ):
+                async with asyncio.timeout(PING_TIMEOUT):
+                    await self.session.send_ping()
+                self.traffic_ts = time.time()
 
     def add_task(self, task: asyncio.Task[Any]) -> None:
         self.active_ts = time.time()
         self.client_tasks.append(task)
 
+    def remove_task(self, task: asyncio.Task[Any]) -> None:
+        self.traffic_ts = time.time()
+        self.client_tasks.remove(task)
+
 
 class ServerSessionStore:
     """Session Store for a running MCP server."""
 
-    __slots__ = ("_map", "_mcp_server_name")
+    __slots__ = ("_keep_alive", "_map", "_mcp_server_name")
 
-    def __init__(self, mcp_server_name: str) -> None:
-        """Initialize the session store."""
+    def __init__(self, mcp_server_name: str, keep_alive: float | None = None) -> None:
+        """Initialize the session store.
+
+        Args:
+            mcp_server_name: The name of the MCP server.
+            keep_alive: Seconds a session can be quiet before it's pinged.
+        """
         self._map: dict[ChatID, _SessionStoreItem] = {}
         self._mcp_server_name = mcp_server_name
+        self._keep_alive = keep_alive or KEEP_ALIVE_INTERVAL
 
     def __len__(self) -> int:
         return len(self._map)
@@ -85,6 +114,12 @@ class ServerSessionStore:
     def __getitem__(self, chat_id: ChatID) -> _SessionStoreItem:
         return self._map[chat_id]
 
+    def load(self, chat_id: ChatID) -> int | None:
+        """Number of the tasks using a session, None if there is no session."""
+        if (stored_session := self._map.get(chat_id)) is None:
+            return None
+        return len(stored_session.client_tasks)
+
     async def _session_watcher(
         self,
         session_ctx: Callable[..., AbstractAsyncContextManager[ClientSession]],
@@ -98,7 +133,7 @@ class ServerSessionStore:
             ) as session:
                 stored_session.session = session
                 stored_session.initialized.set()
-                stored_session.active_ts = time.time()
+                stored_session.active_ts = stored_session.traffic_ts = time.time()
                 await stored_session.waiting_loop()
         except Exception as e:
             logger.error(
@@ -175,10 +210,12 @@ class ServerSessionStore:
         session_creator: Callable[..., AbstractAsyncContextManager[ClientSession]],
         auth_handler: Callable[[AuthorizationProgress], Awaitable[None]] | None = None,
         elicitation_callback: ElicitationFnT | None = None,
+        max_idle_time: float = MAX_IDLE_TIME,
     ) -> AsyncGenerator[ClientSession, None]:
         """Create a new session or return the existing one.
 
         session_creator: The context manager that creates a new session.
+        max_idle_time: Seconds without use before a new session is closed.
 
         When no existing session is found in the store, a new session will be
         created in the session_watcher.
@@ -199,6 +236,8 @@ class ServerSessionStore:
                 chat_id=chat_id,
                 auth_handler=auth_handler,
                 elicitation_callback=elicitation_callback,
+                keep_alive=self._keep_alive,
+                max_idle_time=max_idle_time,
             )
             self._map[chat_id] = stored_session
             logger.debug(
@@ -245,7 +284,7 @@ class ServerSessionStore:
             self._error_cleanup(current_task, stored_session, e)
             raise
         finally:
-            stored_session.client_tasks.remove(current_task)
+            stored_session.remove_task(current_task)
 
     async def cleanup(self) -> None:
         """Cleanup the session store."""
@@ -0,0 +1,195 @@
+"""Embedding index of the tool descriptions.
+
+With many MCP servers the tool schemas take a large part of every request. The
+index embeds each tool description once, and finds the tools relevant to the
+conversation so only those are bound to the model.
+"""
+
+import asyncio
+import heapq
+import math
+import sqlite3
+from collections import OrderedDict
+from collections.abc import Iterable, Sequence
+from hashlib import sha256
+from logging import getLogger
+from struct import pack, unpack
+
+import sqlite_vec
+from langchain_core.embeddings import Embeddings
+from langchain_core.tools import BaseTool
+from pydantic_core import to_json
+
+logger = getLogger(__name__)
+
+QUERY_CACHE_SIZE = 32
+
+
+def _load_sqlite_vec(conn: sqlite3.Connection) -> bool:
+    """Load sqlite-vec, returns False if sqlite can't load extensions."""
+    try:
+        conn.enable_load_extension(True)
+        sqlite_vec.load(conn)
+        conn.enable_load_extension(False)
+    except (AttributeError, sqlite3.Error) as e:
+        logger.warning("sqlite-vec not available, search tools in python: %s", e)
+        return False
+    return True
+
+
+def _normalize(vector: list[float]) -> list[float]:
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def _serialize(vector: list[float]) -> bytes:
+    return pack(f"{len(vector)}f", *vector)
+
+
+def _deserialize(blob: bytes) -> list[float]:
+    return list(unpack(f"{len(blob) // 4}f", blob))
+
+
+def tool_key(tool: BaseTool) -> str:
+    """The key of the tool in the index, changes with the description."""
+    digest = sha256(to_json([tool.description, tool.args])).hexdigest()[:16]
+    return f"{tool.name}:{digest}"
+
+
+def tool_text(tool: BaseTool) -> str:
+    """The text embedded for the tool."""
+    return f"{tool.name}: {tool.description}"
+
+
+class ToolIndex:
+    """Find the tools relevant to a query by the similarity of the embeddings.
+
+    The embeddings are kept in sqlite and ranked with sqlite-vec. If the sqlite
+    build can't load extensions, the vectors are ranked in python instead.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        top_k: int,
+        db_path: str = ":memory:",
+    ) -> None:
+        """Initialize the tool index.
+
+        Args:
+            embeddings: The embedding model.
+            top_k: Number of tools returned by a search.
+            db_path: The sqlite database of the index.
+        """
+        self._embeddings = embeddings
+        self._top_k = top_k
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._use_vec = _load_sqlite_vec(self._conn)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_embeddings "
+            "(key TEXT PRIMARY KEY, name TEXT NOT NULL, embedding BLOB NOT NULL)"
+        )
+        self._vectors: dict[str, list[float]] = {}
+        if not self._use_vec:
+            for key, blob in self._conn.execute(
+                "SELECT key, embedding FROM tool_embeddings"
+            ):
+                self._vectors[key] = _deserialize(blob)
+        self._keys: set[str] = {
+            key for (key,) in self._conn.execute("SELECT key FROM tool_embeddings")
+        }
+        self._query_cache: OrderedDict[str, list[float]] = OrderedDict()
+        # tool_key of the tool objects, the tools are kept to keep the ids valid
+        self._tool_keys: dict[int, tuple[BaseTool, str]] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def top_k(self) -> int:
+        """Number of tools returned by a search."""
+        return self._top_k
+
+    def __len__(self) -> int:
+        """Number of the indexed tools."""
+        return len(self._keys)
+
+    def _key(self, tool: BaseTool) -> str:
+        if (cached := self._tool_keys.get(id(tool))) is None:
+            cached = (tool, tool_key(tool))
+            self._tool_keys[id(tool)] = cached
+        return cached[1]
+
+    async def index(self, tools: Sequence[BaseTool]) -> None:
+        """Embed the tools not in the index yet."""
+        async with self._lock:
+            missing = {
+                key: tool
+                for tool in tools
+                if (key := self._key(tool)) not in self._keys
+            }
+            if not missing:
+                return
+            vectors = await self._embeddings.aembed_documents(
+                [tool_text(tool) for tool in missing.values()]
+            )
+            rows = []
+            for (key, tool), vector in zip(missing.items(), vectors, strict=True):
+                normalized = _normalize(vector)
+                rows.append((key, tool.name, _serialize(normalized)))
+                if not self._use_vec:
+                    self._vectors[key] = normalized
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO tool_embeddings VALUES (?, ?, ?)", rows
+                )
+            self._keys.update(missing)
+            logger.debug("indexed %s tools, total: %s", len(missing), len(self._keys))
+
+    def retain(self, tools: Iterable[BaseTool]) -> None:
+        """Drop the tools not in the given tools, e.g. after a reload."""
+        self._tool_keys.clear()
+        keep = {self._key(tool) for tool in tools}
+        stale = self._keys - keep
+        if not stale:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM tool_embeddings WHERE key = ?", [(k,) for k in stale]
+            )
+        for key in stale:
+            self._vectors.pop(key, None)
+        self._keys -= stale
+
+    async def _embed_query(self, query: str) -> list[float]:
+        if (vector := self._query_cache.get(query)) is not None:
+            self._query_cache.move_to_end(query)
+            return vector
+        vector = _normalize(await self._embeddings.aembed_query(query))
+        self._query_cache[query] = vector
+        if len(self._query_cache) > QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return vector
+
+    async def search(self, query: str, tools: Sequence[BaseTool]) -> list[str]:
+        """Names of the top k tools most relevant to the query."""
+        await self.index(tools)
+        vector = await self._embed_query(query)
+        keys = [self._key(tool) for tool in tools]
+        if self._use_vec:
+            wanted = set(keys)
+            rows = self._conn.execute(
+                "SELECT key, name FROM tool_embeddings "
+                "ORDER BY vec_distance_cosine(embedding, ?)",
+                [_serialize(vector)],
+            )
+            return [name for key, name in rows if key in wanted][: self._top_k]
+        names = {key: tool.name for key, tool in zip(keys, tools, strict=True)}
+        best = heapq.nlargest(
+            self._top_k,
+            keys,
+            key=lambda k: sum(a * b for a, b in zip(self._vectors[k], vector)),  # noqa: B905
+        )
+        return [names[key] for key in best]
+
+    def close(self) -> None:
+        """Close the database."""
+        self._conn.close()
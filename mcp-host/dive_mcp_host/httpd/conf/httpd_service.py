@@ -1,7 +1,7 @@
 import logging
 import os
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import BaseModel, Field
 from sqlalchemy import make_url
@@ -49,6 +49,44 @@ class ConfigLocation(BaseModel):
     plugin_config_path: str | None = None
 
 
+class EventStreamConfig(BaseModel):
+    """Config for the SSE event streams.
+
+    Attributes:
+        coalesce: merge consecutive text / tool progress events into one frame.
+        coalesce_window: max seconds an event waits in the coalescing buffer.
+        coalesce_max_bytes: flush the coalescing buffer once it holds this many
+            bytes of text.
+        envelope: "wrapped" sends each message as a JSON string inside
+            ``{"message": ...}``, "flat" embeds the message object directly and
+            avoids escaping it twice.
+        max_queue_size: max frames buffered for a slow client, 0 for unbounded.
+        overflow_policy: what to do with a full queue. "block" waits for the
+            client, "coalesce" merges text / progress events until there is
+            room and "drop_progress" drops tool progress events.
+        replay_buffer_size: frames kept per chat for re-attaching clients,
+            0 disables resuming.
+        replay_retention: seconds a finished chat stream stays resumable.
+        resume_timeout: seconds to wait for a disconnected client to re-attach
+            before the chat is aborted.
+        event_ids: send the ``id`` field with every frame, by default only when
+            replay is enabled, so clients have a Last-Event-ID to resume from.
+            Event IDs start at 1
+            and increase by one per frame.
+    """
+
+    coalesce: bool = True
+    coalesce_window: float = 0.05
+    coalesce_max_bytes: int = 8192
+    envelope: Literal["wrapped", "flat"] = "wrapped"
+    max_queue_size: int = 256
+    overflow_policy: Literal["block", "coalesce", "drop_progress"] = "block"
+    replay_buffer_size: int = 2048
+    replay_retention: float = 60
+    resume_timeout: float = 30
+    event_ids: bool | None = None
+
+
 class ServiceConfig(BaseModel):
     """Service Config."""
 
@@ -60,6 +98,7 @@ class ServiceConfig(BaseModel):
     cors_origin: str | None = None
     mcp_server_log: LogConfig = Field(default_factory=LogConfig)
     oauth: OAuthConfig = Field(default_factory=OAuthConfig)
+    event_stream: EventStreamConfig = Field(default_factory=EventStreamConfig)
 
     logging_config: dict[str, Any] = {
         "disable_existing_loggers": False,
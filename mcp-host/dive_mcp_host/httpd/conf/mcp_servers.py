@@ -16,7 +16,7 @@ from pydantic import (
 )
 
 from dive_mcp_host.env import DIVE_CONFIG_DIR
-from dive_mcp_host.host.conf import ProxyUrl
+from dive_mcp_host.host.conf import ProxyUrl, ReplicaConfig, SessionPoolConfig
 from dive_mcp_host.httpd.conf.misc import write_then_replace
 from dive_mcp_host.plugins.registry import HookInfo, PluginManager
 
@@ -41,8 +41,20 @@ class MCPServerConfig(BaseModel):
     proxy: ProxyUrl | None = None
     headers: dict[str, SecretStr] | None = Field(default_factory=dict)
     exclude_tools: list[str] = Field(default_factory=list)
+    keep_alive: float | None = Field(default=None, gt=0, alias="keepAlive")
     initial_timeout: float = Field(default=10, ge=10, alias="initialTimeout")
     tool_call_timeout: float = Field(default=10 * 60, alias="toolCallTimeout")
+    max_concurrent_calls: int | None = Field(
+        default=None, ge=1, alias="maxConcurrentCalls"
+    )
+    call_queue_timeout: float | None = Field(default=None, alias="callQueueTimeout")
+    result_cache_ttl: float | None = Field(default=None, gt=0, alias="resultCacheTtl")
+    result_cache_max_bytes: int = Field(
+        default=8 * 1024 * 1024, ge=0, alias="resultCacheMaxBytes"
+    )
+    replicas: ReplicaConfig | None = None
+    session_pool: SessionPoolConfig | None = Field(default=None, alias="sessionPool")
+    max_frame_size: int = Field(default=64 * 1024 * 1024, gt=0, alias="maxFrameSize")
 
     model_config = ConfigDict(
         validate_by_name=True,
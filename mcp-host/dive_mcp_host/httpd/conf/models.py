@@ -74,6 +74,17 @@ class ModelManager:
         """
         return self._current_setting
 
+    @property
+    def title_setting(self) -> LLMConfigTypes | None:
+        """Get the model settings for title generation.
+
+        Returns:
+            Model settings or None if no title model is configured.
+        """
+        if self._full_config is None or self._full_config.title_config is None:
+            return None
+        return self._full_config.title_config.to_host_llm_config()
+
     @property
     def full_config(self) -> ModelFullConfigs | None:
         """Get the full model configuration.
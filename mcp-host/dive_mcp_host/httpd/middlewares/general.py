@@ -4,6 +4,7 @@ from typing import TypedDict
 from fastapi import Request
 from fastapi.responses import JSONResponse, Response
 
+from dive_mcp_host.host.errors import MediaQueueTimeoutError
 from dive_mcp_host.httpd.routers.models import ResultResponse, UserInputError
 
 
@@ -28,6 +29,12 @@ async def error_handler(_: Request, exc: Exception) -> Response:
             content=msg,
         )
 
+    if isinstance(exc, MediaQueueTimeoutError):
+        return JSONResponse(
+            status_code=503,
+            content=msg,
+        )
+
     return JSONResponse(
         status_code=500,
         content=msg,
@@ -51,9 +58,9 @@ class DiveUser(TypedDict):
     """The amount of tokens increased in this request."""
 
 
-async def default_state(request: Request, call_next: Callable) -> Response:
-    """Prefill default state."""
-    request.state.dive_user = DiveUser(
+def default_dive_user() -> DiveUser:
+    """Create the state of an anonymous user."""
+    return DiveUser(
         user_id=None,
         user_name=None,
         user_type=None,
@@ -61,4 +68,9 @@ async def default_state(request: Request, call_next: Callable) -> Response:
         token_limit=0,
         token_increased=0,
     )
+
+
+async def default_state(request: Request, call_next: Callable) -> Response:
+    """Prefill default state."""
+    request.state.dive_user = default_dive_user()
     return await call_next(request)
@@ -1,11 +1,17 @@
 from collections.abc import Callable, Coroutine
+from logging import getLogger
 from typing import Any
 
 from starlette.requests import Request
 from starlette.responses import Response
+from starlette.types import Message
+from starlette.websockets import WebSocket
 
+from dive_mcp_host.httpd.middlewares.general import DiveUser, default_dive_user
 from dive_mcp_host.plugins.registry import HookInfo, PluginManager
 
+logger = getLogger(__name__)
+
 type MiddlewareCallback = Callable[
     [Request, Callable[[Request], Coroutine[Any, Any, Response]]],
     Coroutine[Any, Any, Response],
@@ -32,6 +38,33 @@ class PluginMiddlewaresManager:
         callback, _ = self.plugins[idx]
         return await callback(request, lambda r: self.dispatch(r, call_next, idx + 1))
 
+    async def authenticate(self, websocket: WebSocket) -> DiveUser | None:
+        """Run the plugins on the handshake of a websocket.
+
+        The http middlewares don't run for websockets, so the handshake goes
+        through the plugins as a GET request. Returns the user the plugins
+        resolved, None if a plugin rejected the request.
+        """
+        request = Request(
+            {**websocket.scope, "type": "http", "method": "GET", "state": {}},
+            receive=_empty_body,
+        )
+        request.state.dive_user = default_dive_user()
+        accepted: list[Request] = []
+
+        async def call_next(r: Request) -> Response:
+            accepted.append(r)
+            return Response()
+
+        try:
+            await self.dispatch(request, call_next)
+        except Exception:
+            logger.exception("websocket rejected by the plugins")
+            return None
+        if not accepted:
+            return None
+        return accepted[-1].state.dive_user
+
     async def register_plugin(
         self,
         callback: MiddlewareCallback,
@@ -50,3 +83,7 @@ class PluginMiddlewaresManager:
                 register=self.register_plugin,
             )
         )
+
+
+async def _empty_body() -> Message:
+    return {"type": "http.request", "body": b"", "more_body": False}
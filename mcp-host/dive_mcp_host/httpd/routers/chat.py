@@ -1,17 +1,40 @@
-from typing import TYPE_CHECKING, Annotated, TypeVar
+import asyncio
+import json
+from logging import getLogger
+from typing import Annotated, TypeVar
 from uuid import uuid4
 
-from fastapi import APIRouter, Body, Depends, File, Form, Request, UploadFile
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    File,
+    Form,
+    Header,
+    Request,
+    UploadFile,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
+from starlette.datastructures import State
 
 from dive_mcp_host.httpd.database.models import Chat, ChatMessage, QueryInput
 from dive_mcp_host.httpd.dependencies import get_app, get_dive_user
+from dive_mcp_host.httpd.middlewares.general import DiveUser, default_dive_user
 from dive_mcp_host.httpd.routers.models import (
+    EventStreamGauge,
     ResultResponse,
+    SocketAbortRequest,
+    SocketChatRequest,
+    SocketElicitationRequest,
+    SocketRequest,
     SortBy,
     UserInputError,
 )
+from dive_mcp_host.httpd.routers.tools import ElicitationRespondResult
 from dive_mcp_host.httpd.routers.utils import (
     ChatProcessor,
     EventStreamContextManager,
@@ -20,9 +43,7 @@ from dive_mcp_host.httpd.routers.utils import (
 )
 from dive_mcp_host.httpd.server import DiveHostAPI
 
-if TYPE_CHECKING:
-    from dive_mcp_host.httpd.middlewares.general import DiveUser
-
+logger = getLogger(__name__)
 chat = APIRouter(tags=["chat"])
 
 T = TypeVar("T")
@@ -75,6 +96,23 @@ async def list_chat(
     return DataResult(success=True, message=None, data=result)
 
 
+@chat.get("/streams")
+async def list_streams(
+    app: DiveHostAPI = Depends(get_app),
+    dive_user: "DiveUser" = Depends(get_dive_user),
+) -> DataResult[dict[str, EventStreamGauge]]:
+    """Queue metrics of the event streams of the user's running chats.
+
+    Returns:
+        DataResult[dict[str, EventStreamGauge]]: Gauges keyed by chat ID.
+    """
+    return DataResult(
+        success=True,
+        message=None,
+        data=app.event_streams.gauges(dive_user["user_id"]),
+    )
+
+
 @chat.post("")
 async def create_chat(
     request: Request,
@@ -102,7 +140,7 @@ async def create_chat(
 
     images, documents = await app.store.upload_files(files + filepaths)
 
-    stream = EventStreamContextManager()
+    stream = EventStreamContextManager(app.event_stream_config)
     response = stream.get_response()
     query_input = QueryInput(text=message, images=images, documents=documents)
 
@@ -187,7 +225,7 @@ async def edit_chat(
 
     images, documents = await app.store.upload_files(files + filepaths)
 
-    stream = EventStreamContextManager()
+    stream = EventStreamContextManager(app.event_stream_config)
     response = stream.get_response()
     query_input = QueryInput(text=content, images=images, documents=documents)
 
@@ -218,7 +256,7 @@ async def retry_chat(
     if chat_id is None or message_id is None:
         raise UserInputError("Chat ID and Message ID are required")
 
-    stream = EventStreamContextManager()
+    stream = EventStreamContextManager(app.event_stream_config)
     response = stream.get_response()
 
     async def process() -> None:
@@ -230,6 +268,32 @@ async def retry_chat(
     return response
 
 
+@chat.get("/{chat_id}/stream")
+async def resume_chat(
+    chat_id: str,
+    app: DiveHostAPI = Depends(get_app),
+    dive_user: "DiveUser" = Depends(get_dive_user),
+    last_event_id: Annotated[int, Header(alias="Last-Event-ID")] = 0,
+) -> StreamingResponse:
+    """Re-attach to the event stream of a running or recently finished chat.
+
+    The frames after Last-Event-ID are replayed, then the live stream is
+    followed. Without the header the stream is replayed from the beginning.
+
+    Args:
+        chat_id (str): The ID of the chat.
+        app (DiveHostAPI): The DiveHostAPI instance.
+        dive_user (DiveUser): The DiveUser instance.
+        last_event_id (int): The ID of the last event the client received.
+    """
+    stream = app.event_streams.get(chat_id, dive_user["user_id"])
+    if stream is None or not stream.resumable:
+        raise UserInputError(f"Chat stream {chat_id} not found")
+    if not stream.can_replay(last_event_id):
+        raise UserInputError(f"Event {last_event_id} is no longer available")
+    return stream.get_replay_response(last_event_id)
+
+
 @chat.get("/{chat_id}")
 async def get_chat(
     chat_id: str,
@@ -304,3 +368,149 @@ async def abort_chat(
         raise UserInputError("Chat not found")
 
     return ResultResponse(success=True, message="Chat abort signal sent successfully")
+
+
+class ChatSocket:
+    """Serve many concurrent chats over one websocket connection.
+
+    Every request of the client carries an ``id``. The events of a chat are sent
+    as ``{"id": ..., "data": {"message": {...}}}`` and the chat ends with
+    ``{"id": ..., "done": true}``. Other requests are answered with a
+    ``ResultResponse`` that has the same ``id``.
+    """
+
+    def __init__(self, app: DiveHostAPI, websocket: WebSocket) -> None:
+        """Initialize the chat socket."""
+        self._app = app
+        self._websocket = websocket
+        self._dive_user: DiveUser = default_dive_user()
+        self._config = app.event_stream_config.model_copy(
+            update={"envelope": "flat", "event_ids": False}
+        )
+        self._send_lock = asyncio.Lock()
+        self._forwarders: dict[str, asyncio.Task] = {}
+
+    async def serve(self) -> None:
+        """Handle the requests of the client until it disconnects."""
+        dive_user = await self._app.websocket_user(self._websocket)
+        if dive_user is None:
+            await self._websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        self._dive_user = dive_user
+        await self._websocket.accept()
+        try:
+            while True:
+                raw = await self._websocket.receive_text()
+                try:
+                    request = SocketRequest.model_validate_json(raw).root
+                except ValidationError as e:
+                    await self._send_result(
+                        None, ResultResponse(success=False, message=str(e))
+                    )
+                    continue
+                await self._dispatch(request)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            # Streams handle this as a client disconnect.
+            for task in self._forwarders.values():
+                task.cancel()
+            await asyncio.gather(*self._forwarders.values(), return_exceptions=True)
+
+    async def _dispatch(
+        self,
+        request: SocketChatRequest | SocketAbortRequest | SocketElicitationRequest,
+    ) -> None:
+        try:
+            if isinstance(request, SocketChatRequest):
+                await self._start_chat(request)
+            elif isinstance(request, SocketAbortRequest):
+                ok = await self._app.abort_controller.abort(request.chat_id)
+                if not ok:
+                    raise UserInputError("Chat not found")
+                await self._send_result(request.id, ResultResponse(success=True))
+            else:
+                elicitation_manager = self._app.dive_host["default"].elicitation_manager
+                found = await elicitation_manager.respond_to_request(
+                    request_id=request.request_id,
+                    action=request.action,
+                    content=request.content,
+                )
+                await self._send_result(
+                    request.id, ElicitationRespondResult(success=True, found=found)
+                )
+        except Exception as e:
+            if not isinstance(e, UserInputError):
+                logger.exception("Error handling websocket request %s", request.id)
+            await self._send_result(
+                request.id, ResultResponse(success=False, message=str(e))
+            )
+
+    async def _start_chat(self, request: SocketChatRequest) -> None:
+        if request.id in self._forwarders:
+            raise UserInputError(f"Stream {request.id} is already running")
+        if request.type != "chat" and (
+            request.chat_id is None or request.message_id is None
+        ):
+            raise UserInputError("Chat ID and Message ID are required")
+
+        # a new chat message never edits or regenerates, like create_chat
+        message_id = request.message_id if request.type != "chat" else None
+        query_input = None
+        if request.type != "retry":
+            # message id needs to be unique
+            if message_id == ERROR_MSG_ID:
+                message_id = str(uuid4())
+            images, documents = await self._app.store.upload_files(
+                list(request.filepaths)
+            )
+            query_input = QueryInput(
+                text=request.message, images=images, documents=documents
+            )
+
+        stream = EventStreamContextManager(self._config)
+
+        # each chat has its own state, the chats of the socket run concurrently
+        state = State({"dive_user": DiveUser(**self._dive_user)})
+
+        async def process() -> None:
+            async with stream:
+                processor = ChatProcessor(self._app, state, stream)
+                await processor.handle_chat(request.chat_id, query_input, message_id)
+
+        stream.add_task(process)
+        self._forwarders[request.id] = asyncio.create_task(
+            self._forward(request.id, stream)
+        )
+
+    async def _forward(self, key: str, stream: EventStreamContextManager) -> None:
+        """Send the events of a chat to the client."""
+        prefix = b'{"id":' + json.dumps(key).encode()
+        try:
+            async for data in stream.iter_data():
+                if data == b"[DONE]":
+                    await self._send(prefix + b',"done":true}')
+                else:
+                    await self._send(prefix + b',"data":' + data + b"}")
+        finally:
+            self._forwarders.pop(key, None)
+
+    async def _send_result(self, key: str | None, result: ResultResponse) -> None:
+        await self._send(
+            json.dumps({"id": key, **result.model_dump(mode="json", by_alias=True)})
+        )
+
+    async def _send(self, frame: bytes | str) -> None:
+        async with self._send_lock:
+            await self._websocket.send_text(
+                frame.decode() if isinstance(frame, bytes) else frame
+            )
+
+
+@chat.websocket("/ws")
+async def chat_socket(websocket: WebSocket) -> None:
+    """Multiplex chats, abort and elicitation responses over one connection.
+
+    Requests are JSON objects, see ``SocketRequest`` and ``ChatSocket``.
+    """
+    await ChatSocket(websocket.app, websocket).serve()
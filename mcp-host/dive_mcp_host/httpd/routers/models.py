@@ -241,6 +241,67 @@ class StreamMessage(BaseModel):
     )
 
 
+class EventStreamGauge(BaseModel):
+    """Queue metrics of an event stream."""
+
+    queue_depth: int = Field(alias="queueDepth")
+    max_queue_depth: int = Field(alias="maxQueueDepth")
+    queue_size: int = Field(alias="queueSize")
+    dropped_events: int = Field(default=0, alias="droppedEvents")
+    disconnected: bool = False
+    last_event_id: int = Field(default=0, alias="lastEventId")
+    done: bool = False
+
+
+class SocketChatRequest(BaseModel):
+    """Start a chat on a websocket connection.
+
+    ``chat`` sends a new message, ``edit`` replaces the message ``messageId``
+    and ``retry`` queries the message ``messageId`` again.
+    """
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    type: Literal["chat", "edit", "retry"]
+    id: str
+    chat_id: str | None = Field(default=None, alias="chatId")
+    message_id: str | None = Field(default=None, alias="messageId")
+    message: str | None = None
+    filepaths: list[str] = Field(default_factory=list)
+
+
+class SocketAbortRequest(BaseModel):
+    """Abort a chat on a websocket connection."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    type: Literal["abort"]
+    id: str
+    chat_id: str = Field(alias="chatId")
+
+
+class SocketElicitationRequest(BaseModel):
+    """Respond to an elicitation request on a websocket connection."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    type: Literal["elicitation_respond"]
+    id: str
+    request_id: str = Field(alias="requestId")
+    action: Literal["accept", "decline", "cancel"]
+    content: dict | None = None
+
+
+class SocketRequest(
+    RootModel[SocketChatRequest | SocketAbortRequest | SocketElicitationRequest]
+):
+    """A request sent by the client on a websocket connection."""
+
+    root: SocketChatRequest | SocketAbortRequest | SocketElicitationRequest = Field(
+        discriminator="type"
+    )
+
+
 class TokenUsage(BaseModel):
     """Token usage."""
 
@@ -307,6 +368,8 @@ class ModelFullConfigs(BaseModel):
     enable_tools: bool
     configs: dict[str, ModelSingleConfig] = Field(default_factory=dict)
     embed_config: EmbedConfig | None = None
+    title_config: ModelSingleConfig | None = None
+    # A cheaper model for generating chat titles, the active model is used if None.
 
     disable_dive_system_prompt: bool = False
     # If True, custom rules will be used directly without extra system prompt from Dive.
@@ -117,7 +117,7 @@ class CompletionEventStreamContextManager(EventStreamContextManager):
         elif isinstance(data, CompletionsResult):
             await super().write(data.model_dump_json())
 
-    async def _generate(self) -> AsyncGenerator[str, None]:
+    async def _generate(self) -> AsyncGenerator[bytes, None]:
         try:
             async for chunk in super()._generate():
                 yield chunk
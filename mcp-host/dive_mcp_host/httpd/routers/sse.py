@@ -0,0 +1,61 @@
+import json
+from typing import Literal
+
+from dive_mcp_host.httpd.routers.models import StreamMessage
+
+type StreamEnvelope = Literal["wrapped", "flat"]
+"""How a StreamMessage is placed in the SSE data field.
+
+- wrapped: ``{"message": "<json string>"}``, the format existing clients expect.
+- flat: ``{"message": {...}}``, the message is embedded as an object.
+"""
+
+DONE_FRAME = b"data: [DONE]\n\n"
+
+
+class StreamMessageEncoder:
+    """Encode stream messages into SSE frames.
+
+    Every message is serialized to JSON exactly once and the frames are built as
+    bytes, so the response body does not need to be re-encoded by Starlette.
+    """
+
+    def __init__(self, envelope: StreamEnvelope = "wrapped") -> None:
+        """Initialize the encoder.
+
+        Args:
+            envelope: The envelope used for StreamMessage frames.
+        """
+        self._envelope: StreamEnvelope = envelope
+
+    @property
+    def envelope(self) -> StreamEnvelope:
+        """The envelope used for StreamMessage frames."""
+        return self._envelope
+
+    def encode(self, message: StreamMessage) -> bytes:
+        """Encode a stream message into an SSE frame."""
+        if message.type == "text" and isinstance(message.content, str):
+            return self.encode_text(message.content)
+        return self._frame(
+            message.__pydantic_serializer__.to_json(message, by_alias=True)
+        )
+
+    def encode_text(self, text: str) -> bytes:
+        """Encode a text delta into an SSE frame.
+
+        The message JSON is built directly, bypassing the pydantic model.
+        The output is byte-identical to serializing ``StreamMessage(type="text")``.
+        """
+        message = '{"type":"text","content":' + json.dumps(text, ensure_ascii=False)
+        return self._frame((message + "}").encode())
+
+    def encode_data(self, data: str) -> bytes:
+        """Encode pre-serialized data into an SSE frame."""
+        return b"data: " + data.encode() + b"\n\n"
+
+    def _frame(self, message: bytes) -> bytes:
+        if self._envelope == "flat":
+            return b'data: {"message":' + message + b"}\n\n"
+        # Same output as json.dumps({"message": message})
+        return b'data: {"message": ' + json.dumps(message.decode()).encode() + b"}\n\n"
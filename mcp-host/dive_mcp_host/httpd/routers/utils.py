@@ -1,15 +1,23 @@
 import asyncio
 import json
 import logging
-import re
 import time
-from collections.abc import AsyncGenerator, AsyncIterator, Callable, Coroutine
-from contextlib import AsyncExitStack, suppress
+from collections import deque
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    Generator,
+    Iterable,
+    Sequence,
+)
+from contextlib import AsyncExitStack, contextmanager, suppress
 from dataclasses import asdict, dataclass, field
 from hashlib import md5
 from itertools import batched
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Literal, Self
+from typing import TYPE_CHECKING, Any, ClassVar, Literal, Self
 from urllib.parse import urlparse
 from uuid import uuid4
 
@@ -18,13 +26,14 @@ from langchain_core.messages import (
     AIMessage,
     BaseMessage,
     HumanMessage,
+    RemoveMessage,
     SystemMessage,
 )
 from langchain_core.messages.tool import ToolMessage
 from langchain_core.messages.utils import count_tokens_approximately
 from langchain_core.output_parsers import StrOutputParser
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
 from openai import APIError as OpenAIAPIError
-from pydantic import BaseModel
 from starlette.datastructures import State
 
 from dive_mcp_host.host.agents.file_in_additional_kwargs import (
@@ -33,6 +42,7 @@ from dive_mcp_host.host.agents.file_in_additional_kwargs import (
     OAP_MIN_COUNT,
 )
 from dive_mcp_host.host.agents.message_order import FAKE_TOOL_RESPONSE
+from dive_mcp_host.host.chat import MessageChunkHolder
 from dive_mcp_host.host.custom_events import (
     ToolAuthenticationRequired,
     ToolCallProgress,
@@ -42,6 +52,8 @@ from dive_mcp_host.host.errors import LogBufferNotFoundError
 from dive_mcp_host.host.store.base import FileType, StoreManagerProtocol
 from dive_mcp_host.host.tools.log import LogEvent, LogManager, LogMsg
 from dive_mcp_host.host.tools.model_types import ClientState
+from dive_mcp_host.httpd.abort_controller import AbortController
+from dive_mcp_host.httpd.conf.httpd_service import EventStreamConfig
 from dive_mcp_host.httpd.conf.prompt import PromptKey
 from dive_mcp_host.httpd.database.models import (
     ChatMessage,
@@ -58,6 +70,7 @@ from dive_mcp_host.httpd.routers.models import (
     ChatInfoContent,
     ElicitationRequestContent,
     ErrorContent,
+    EventStreamGauge,
     InteractiveContent,
     MessageInfoContent,
     StreamMessage,
@@ -66,6 +79,7 @@ from dive_mcp_host.httpd.routers.models import (
     ToolCallsContent,
     ToolResultContent,
 )
+from dive_mcp_host.httpd.routers.sse import DONE_FRAME, StreamMessageEncoder
 from dive_mcp_host.httpd.server import DiveHostAPI
 from dive_mcp_host.log import TRACE
 
@@ -73,33 +87,72 @@ if TYPE_CHECKING:
     from dive_mcp_host.host.host import DiveMcpHost
     from dive_mcp_host.httpd.middlewares.general import DiveUser
 
-title_prompt = """You are a title generator from the user input.
-Your only task is to generate a short title based on the user input.
-IMPORTANT:
-- Output ONLY the title
-- DO NOT try to answer or resolve the user input query.
-- DO NOT try to use any tools to generate title
-- NO thinking, reasoning, explanations, quotes, or extra text
-- NO punctuation at the end
-- If the input is URL only, output the description of the URL, for example, "the URL of xxx website"
-- Generate the title in the primary language of the input (the language used for the majority of the text)
-- Preserve proper nouns and technical terms in their original language"""  # noqa: E501
-
 
 logger = logging.getLogger(__name__)
 
 
 class EventStreamContextManager:
-    """Context manager for event streaming."""
+    """Context manager for event streaming.
+
+    When coalescing is enabled, consecutive ``text`` and ``tool_call_progress``
+    messages are merged into a single frame. The buffer is flushed when the time
+    or byte window is reached, or when any other message is written, so the
+    order across event types is preserved.
+
+    The queue is bounded by ``max_queue_size``. When it is full the writer is
+    blocked, or, depending on ``overflow_policy``, text / progress messages are
+    coalesced or progress messages are dropped.
+
+    Every frame gets a monotonic event ID. The last ``replay_buffer_size`` frames
+    are kept, so a client can re-attach with ``replay`` and continue from the
+    last event it received instead of running the query again.
+    """
 
     task: asyncio.Task | None = None
     done: bool = False
     response: StreamingResponse | None = None
-    _exit_message: str | None = None
+    _exit_message: StreamMessage | None = None
+
+    COALESCE_TYPES: ClassVar[frozenset[str]] = frozenset(
+        {"text", ToolCallProgress.NAME}
+    )
 
-    def __init__(self) -> None:
-        """Initialize the event stream context manager."""
-        self.queue = asyncio.Queue()
+    def __init__(self, config: EventStreamConfig | None = None) -> None:
+        """Initialize the event stream context manager.
+
+        Args:
+            config: Stream config, coalescing and replay are disabled when not
+                provided.
+        """
+        self._config = config or EventStreamConfig(coalesce=False, replay_buffer_size=0)
+        self.queue: asyncio.Queue[bytes | None] = asyncio.Queue(
+            maxsize=self._config.max_queue_size
+        )
+        self._encoder = StreamMessageEncoder(self._config.envelope)
+        self.disconnected = asyncio.Event()
+
+        self._pending_type: str | None = None
+        self._pending_text: list[str] = []
+        self._pending_bytes: int = 0
+        self._pending_progress: dict[str | None, ToolCallProgress] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+        self._max_queue_depth: int = 0
+        self._dropped_events: int = 0
+
+        self._history: deque[tuple[int, bytes]] | None = (
+            deque(maxlen=self._config.replay_buffer_size)
+            if self._config.replay_buffer_size > 0
+            else None
+        )
+        self._last_event_id: int = 0
+        self._send_event_ids = (
+            self._config.event_ids
+            if self._config.event_ids is not None
+            else self._history is not None
+        )
+        self._consumers: int = 1
+        self._changed = asyncio.Event()
 
     def add_task(
         self, func: Callable[[], Coroutine[Any, Any, Any]], *args: Any, **kwargs: Any
@@ -113,6 +166,7 @@ class EventStreamContextManager:
 
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:  # noqa: ANN001
         """Exit the context manager."""
+        await self._flush_pending()
         if exc_val:
             import traceback
 
@@ -126,13 +180,12 @@ class EventStreamContextManager:
                 content.type = error.type
                 content.code = error.code
 
-            self._exit_message = StreamMessage(
-                type="error",
-                content=content,
-            ).model_dump_json(by_alias=True)
+            self._exit_message = StreamMessage(type="error", content=content)
 
         self.done = True
-        await self.queue.put(None)  # Signal completion
+        self._notify()
+        if not self.disconnected.is_set():
+            await self.queue.put(None)  # Signal completion
 
     async def write(self, data: str | StreamMessage) -> None:
         """Write data to the event stream.
@@ -140,20 +193,266 @@ class EventStreamContextManager:
         Args:
             data (str): The data to write to the stream.
         """
-        if isinstance(data, BaseModel):
-            data = json.dumps({"message": data.model_dump_json(by_alias=True)})
-        await self.queue.put(data)
+        if self.disconnected.is_set() and self._history is None:
+            return
+
+        if isinstance(data, StreamMessage) and data.type in self.COALESCE_TYPES:
+            policy = self._config.overflow_policy
+            if self._config.coalesce or (policy == "coalesce" and self.queue.full()):
+                if self._pending_type not in (None, data.type):
+                    await self._flush_pending()
+                if self._coalesce(data):
+                    await self._flush_pending()
+                return
+            if policy == "drop_progress" and (
+                data.type == ToolCallProgress.NAME and self.queue.full()
+            ):
+                self._dropped_events += 1
+                return
+
+        await self._flush_pending()
+        if isinstance(data, StreamMessage):
+            await self._put(self._encoder.encode(data))
+        else:
+            await self._put(self._encoder.encode_data(data))
+
+    @contextmanager
+    def abort_on_disconnect(
+        self, abort_controller: AbortController, key: str
+    ) -> Generator[None, None, None]:
+        """Abort the task registered with key when the client disconnects."""
+
+        async def abort_func() -> None:
+            while True:
+                await self._wait_until(lambda: self._consumers == 0)
+                if self._history is None:
+                    break
+                # Give the client a chance to re-attach before aborting.
+                try:
+                    async with asyncio.timeout(self._config.resume_timeout):
+                        await self._wait_until(lambda: self._consumers > 0)
+                except TimeoutError:
+                    break
+            logger.info("Client disconnected, abort %s", key)
+            await abort_controller.abort(key)
+
+        task = asyncio.create_task(abort_func())
+        try:
+            yield
+        finally:
+            task.cancel()
+
+    @property
+    def gauge(self) -> EventStreamGauge:
+        """Current queue metrics of the stream."""
+        return EventStreamGauge(
+            queueDepth=self.queue.qsize(),
+            maxQueueDepth=self._max_queue_depth,
+            queueSize=self.queue.maxsize,
+            droppedEvents=self._dropped_events,
+            disconnected=self.disconnected.is_set(),
+            lastEventId=self._last_event_id,
+            done=self.done,
+        )
+
+    @property
+    def config(self) -> EventStreamConfig:
+        """The stream config."""
+        return self._config
+
+    @property
+    def resumable(self) -> bool:
+        """Whether clients can re-attach to the stream."""
+        return self._history is not None
+
+    def can_replay(self, last_event_id: int) -> bool:
+        """Check if all frames after last_event_id are still buffered."""
+        if self._history is None or last_event_id > self._last_event_id:
+            return False
+        if not self._history:
+            return last_event_id == self._last_event_id
+        return self._history[0][0] <= last_event_id + 1
+
+    async def replay(self, last_event_id: int = 0) -> AsyncGenerator[bytes, None]:
+        """Replay the frames after last_event_id, then follow the live stream."""
+        if self._history is None:
+            raise RuntimeError("Replay is disabled for this stream")
+
+        self._consumers += 1
+        self._notify()
+        try:
+            while True:
+                changed = self._changed
+                while self._history and last_event_id < self._last_event_id:
+                    # the event IDs in the history are consecutive
+                    first_id = self._history[0][0]
+                    if last_event_id + 1 < first_id:
+                        logger.warning(
+                            "Replay fell behind, events %s to %s are lost",
+                            last_event_id + 1,
+                            first_id - 1,
+                        )
+                        last_event_id = first_id - 1
+                    event_id, frame = self._history[last_event_id + 1 - first_id]
+                    yield self._with_id(event_id, frame)
+                    last_event_id = event_id
+                if self.done and last_event_id >= self._last_event_id:
+                    break
+                if changed is self._changed:
+                    await changed.wait()
+            if self._exit_message:
+                yield self._encoder.encode(self._exit_message)
+            yield DONE_FRAME
+        finally:
+            self._consumers -= 1
+            self._notify()
+
+    def get_replay_response(self, last_event_id: int = 0) -> StreamingResponse:
+        """Get a streaming response that replays the stream."""
+        return StreamingResponse(
+            content=self.replay(last_event_id),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "Connection": "keep-alive"},
+        )
+
+    def _with_id(self, event_id: int, frame: bytes) -> bytes:
+        return b"id: %d\n" % event_id + frame
+
+    def _record(self, frame: bytes) -> bytes:
+        """Assign the next event ID and keep the frame for replay."""
+        self._last_event_id += 1
+        if self._history is not None:
+            self._history.append((self._last_event_id, frame))
+            self._notify()
+        if self._send_event_ids:
+            return self._with_id(self._last_event_id, frame)
+        return frame
+
+    def _notify(self) -> None:
+        """Wake up everyone waiting for a change of the stream."""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _wait_until(self, predicate: Callable[[], bool]) -> None:
+        while not predicate():
+            await self._changed.wait()
+
+    async def _put(self, frame: bytes) -> None:
+        frame = self._record(frame)
+        if self.disconnected.is_set():
+            return
+        await self.queue.put(frame)
+        self._max_queue_depth = max(self._max_queue_depth, self.queue.qsize())
+
+    def _coalesce(self, data: StreamMessage) -> bool:
+        """Merge the message into the pending buffer.
+
+        Returns:
+            True if the pending buffer should be flushed.
+        """
+        if self._pending_type is None:
+            self._pending_type = data.type
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self._config.coalesce_window, self._put_pending_nowait
+            )
+
+        if isinstance(data.content, ToolCallProgress):
+            # Only the latest progress of each tool call is meaningful.
+            self._pending_progress.pop(data.content.tool_call_id, None)
+            self._pending_progress[data.content.tool_call_id] = data.content
+            return False
+
+        text = str(data.content)
+        self._pending_text.append(text)
+        self._pending_bytes += len(text)
+        return self._pending_bytes >= self._config.coalesce_max_bytes
+
+    def _take_pending(self) -> list[bytes]:
+        """Encode and clear the pending buffer."""
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        pending_type, self._pending_type = self._pending_type, None
+        frames: list[bytes] = []
+        if pending_type == "text" and self._pending_text:
+            frames.append(self._encoder.encode_text("".join(self._pending_text)))
+        elif pending_type == ToolCallProgress.NAME:
+            frames.extend(
+                self._encoder.encode(
+                    StreamMessage(type="tool_call_progress", content=progress)
+                )
+                for progress in self._pending_progress.values()
+            )
+        self._pending_text = []
+        self._pending_bytes = 0
+        self._pending_progress = {}
+        return frames
+
+    async def _flush_pending(self) -> None:
+        """Put the merged pending messages into the queue."""
+        for frame in self._take_pending():
+            await self._put(frame)
+
+    def _put_pending_nowait(self) -> None:
+        """Flush the pending buffer without waiting.
+
+        If the queue doesn't have enough room, keep coalescing and retry later.
+        """
+        pending = (
+            len(self._pending_progress)
+            if self._pending_type == ToolCallProgress.NAME
+            else 1
+        )
+        if self.disconnected.is_set():
+            for frame in self._take_pending():
+                self._record(frame)
+            return
+
+        if self.queue.maxsize and self.queue.maxsize - self.queue.qsize() < pending:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self._config.coalesce_window, self._put_pending_nowait
+            )
+            return
 
-    async def _generate(self) -> AsyncGenerator[str, None]:
+        for frame in self._take_pending():
+            self.queue.put_nowait(self._record(frame))
+        self._max_queue_depth = max(self._max_queue_depth, self.queue.qsize())
+
+    def _on_disconnect(self) -> None:
+        """Stop sending events and release writers blocked on a full queue."""
+        self.disconnected.set()
+        if self._history is None:
+            self._take_pending()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self._consumers -= 1
+        self._notify()
+
+    async def _generate(self) -> AsyncGenerator[bytes, None]:
         """Generate the event stream content."""
-        while not self.done or not self.queue.empty():
-            chunk = await self.queue.get()
-            if chunk is None:  # End signal
-                continue
-            yield "data: " + chunk + "\n\n"
-        if self._exit_message:
-            yield "data: " + json.dumps({"message": self._exit_message}) + "\n\n"
-        yield "data: [DONE]\n\n"
+        finished = False
+        try:
+            while not self.done or not self.queue.empty():
+                chunk = await self.queue.get()
+                if chunk is None:  # End signal
+                    continue
+                yield chunk
+            if self._exit_message:
+                yield self._encoder.encode(self._exit_message)
+            yield DONE_FRAME
+            finished = True
+        finally:
+            if not finished:
+                self._on_disconnect()
+
+    async def iter_data(self) -> AsyncGenerator[bytes, None]:
+        """Generate the data field of each frame, for transports other than SSE.
+
+        The stream ends with ``b"[DONE]"``.
+        """
+        async for frame in self._generate():
+            yield frame[frame.index(b"data: ") + 6 : -2]
 
     def get_response(self) -> StreamingResponse:
         """Get the streaming response.
@@ -190,6 +489,25 @@ class TextContent:
         return asdict(cls(text=text))
 
 
+def _merge_turn_messages(
+    turn: dict[str, BaseMessage], messages: Iterable[BaseMessage]
+) -> None:
+    """Apply a node's message update to the messages of the current turn.
+
+    Follows the semantics of langgraph's ``add_messages`` reducer: messages with
+    a known ID replace the old one in place, ``RemoveMessage`` deletes it. IDs
+    outside of the turn belong to the history and are ignored.
+    """
+    for message in messages:
+        if isinstance(message, RemoveMessage):
+            if message.id == REMOVE_ALL_MESSAGES:
+                turn.clear()
+            elif message.id:
+                turn.pop(message.id, None)
+        else:
+            turn[message.id or uuid4().hex] = message
+
+
 def _extract_text_from_message(message: HumanMessage) -> str:
     """Extract plain text content from a HumanMessage.
 
@@ -346,7 +664,6 @@ class ChatProcessor:
         self.stream = stream
         self.store: StoreManagerProtocol = app.store
         self.dive_host: DiveMcpHost = app.dive_host["default"]
-        self._str_output_parser = StrOutputParser()
         self._content_handler = ContentHandler(self.store)
         self.disable_dive_system_prompt = (
             app.model_config_manager.full_config.disable_dive_system_prompt
@@ -767,15 +1084,32 @@ class ChatProcessor:
                 await stack.enter_async_context(
                     self.app.abort_controller.abort_signal(chat_id, chat.abort)
                 )
+                if isinstance(self.stream, EventStreamContextManager):
+                    stack.enter_context(
+                        self.stream.abort_on_disconnect(
+                            self.app.abort_controller, chat_id
+                        )
+                    )
+                    stack.enter_context(
+                        self.app.event_streams.register(
+                            chat_id, self.stream, dive_user["user_id"]
+                        )
+                    )
             await stack.enter_async_context(chat)
+            # Without new input the turn continues from the stored state.
+            input_messages = messages
+            if not input_messages and (values := await chat.dump_values()):
+                input_messages = values.get("messages", [])
             response_generator = chat.query(
                 messages,
-                stream_mode=["messages", "values", "updates", "custom"],
+                stream_mode=["messages", "updates", "custom"],
                 is_resend=is_resend,
             )
             # Use provided start_time or current time
             query_start_time = start_time if start_time is not None else time.time()
-            return await self._handle_response(response_generator, query_start_time)
+            return await self._handle_response(
+                response_generator, query_start_time, input_messages
+            )
 
         raise RuntimeError("Unreachable")
 
@@ -783,6 +1117,8 @@ class ChatProcessor:
         content = await self._content_handler.invoke(message)
         if content:
             await self.stream.write(StreamMessage(type="text", content=content))
+
+    async def _stream_stop_reason(self, message: AIMessage) -> None:
         if message.response_metadata.get("stop_reason") == "max_tokens":
             await self.stream.write(
                 StreamMessage(
@@ -841,10 +1177,21 @@ class ChatProcessor:
         await self.stream.write(StreamMessage(type="interactive", content=content))
 
     async def _handle_response(
-        self, response: AsyncIterator[dict[str, Any] | Any], start_time: float
+        self,
+        response: AsyncIterator[dict[str, Any] | Any],
+        start_time: float,
+        input_messages: Sequence[BaseMessage] = (),
     ) -> tuple[HumanMessage | Any, AIMessage | Any, list[BaseMessage], float]:
         """Handle response.
 
+        The messages of the current query are built from the ``updates`` of
+        each node, the full state snapshot is never needed.
+
+        Args:
+            response: The response stream of the chat.
+            start_time: The time the query started.
+            input_messages: The messages sent as input of the query.
+
         Returns:
             tuple[HumanMessage | Any, AIMessage | Any, list[BaseMessage], float]:
             The human message, the AI message, all messages of the current
@@ -852,9 +1199,11 @@ class ChatProcessor:
         """
         user_message = None
         ai_message = None
-        values_messages: list[BaseMessage] = []
+        turn_messages: dict[str, BaseMessage] = {}
+        _merge_turn_messages(turn_messages, input_messages)
         current_messages: list[BaseMessage] = []
         time_to_first_token: float = 0.0
+        chunk_holder = MessageChunkHolder()
         async for res_type, res_content in response:
             if res_type == "messages":
                 message, _ = res_content
@@ -865,6 +1214,9 @@ class ChatProcessor:
                         if time_to_first_token == 0.0:
                             time_to_first_token = time.time() - start_time
                         await self._stream_text_msg(message)
+                    # The stop reason is usually in a chunk without content
+                    if completed := chunk_holder.feed(message):
+                        await self._stream_stop_reason(completed)
                 elif isinstance(message, ToolMessage):
                     logger.log(TRACE, "got tool message: %s", message.model_dump_json())
                     if message.response_metadata.get(FAKE_TOOL_RESPONSE, False):
@@ -878,10 +1230,7 @@ class ChatProcessor:
                 else:
                     # idk what is this
                     logger.warning("Unknown message type: %s", message)
-            elif res_type == "values" and len(res_content["messages"]) >= 2:  # type: ignore  # noqa: PLR2004
-                values_messages = res_content["messages"]  # type: ignore
             elif res_type == "updates":
-                # Get tool call message
                 if not isinstance(res_content, dict):
                     continue
 
@@ -890,6 +1239,8 @@ class ChatProcessor:
                         continue
 
                     msgs = value.get("messages", [])
+                    _merge_turn_messages(turn_messages, msgs)
+                    # Get tool call message
                     for msg in msgs:
                         if isinstance(msg, AIMessage) and msg.tool_calls:
                             logger.log(
@@ -960,38 +1311,28 @@ class ChatProcessor:
                     )
 
         # Find the most recent user and AI messages from newest to oldest
-        user_message = next(
-            (msg for msg in reversed(values_messages) if isinstance(msg, HumanMessage)),
+        messages = list(turn_messages.values())
+        user_index = next(
+            (
+                i
+                for i in range(len(messages) - 1, -1, -1)
+                if isinstance(messages[i], HumanMessage)
+            ),
             None,
         )
         ai_message = next(
-            (msg for msg in reversed(values_messages) if isinstance(msg, AIMessage)),
+            (msg for msg in reversed(messages) if isinstance(msg, AIMessage)),
             None,
         )
-        if user_message:
-            current_messages = values_messages[values_messages.index(user_message) :]
+        if user_index is not None:
+            user_message = messages[user_index]
+            current_messages = messages[user_index:]
 
         return user_message, ai_message, current_messages, time_to_first_token
 
-    async def _generate_title(self, query: str) -> str:
+    async def _generate_title(self, query: str | None) -> str:
         """Generate title."""
-        chat = self.dive_host.chat(
-            tools=[],  # do not use tools
-            system_prompt=title_prompt,
-            volatile=True,
-        )
-        try:
-            async with chat:
-                response = await chat.active_agent.ainvoke(
-                    {"messages": [HumanMessage(content=query)]}
-                )
-                if isinstance(response["messages"][-1], AIMessage):
-                    return strip_title(
-                        self._str_output_parser.invoke(response["messages"][-1])
-                    )
-        except Exception as e:
-            logger.exception("Error generating title: %s", e)
-        return "New Chat"
+        return await self.app.title_service.generate(query, self.dive_host.model)
 
     def _is_using_oap(self, files: list[str]) -> bool:
         return (
@@ -1189,12 +1530,6 @@ class LogStreamHandler:
                 break
 
 
-def strip_title(title: str) -> str:
-    """Strip the title, remove any tags."""
-    title = re.sub(r"\s*<.+>.*?</.+>\s*", "", title, flags=re.DOTALL)
-    return " ".join(title.split())
-
-
 def get_original_filename(local_path: str) -> str:
     """Extract the original name from cache file path."""
     return Path(local_path).name.split("-", 1)[-1]
@@ -6,7 +6,7 @@ from logging import getLogger
 from pathlib import Path
 from typing import Any, Literal
 
-from fastapi import APIRouter, FastAPI
+from fastapi import APIRouter, FastAPI, WebSocket
 from pydantic import BaseModel, Field
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import (
@@ -20,10 +20,11 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from dive_mcp_host.host.conf import HostConfig, ServerConfig
 from dive_mcp_host.host.conf.llm import LLMConfig
 from dive_mcp_host.host.host import DiveMcpHost
+from dive_mcp_host.host.store.attachment_cache import AttachmentCache
 from dive_mcp_host.host.store.base import StoreManagerProtocol
 from dive_mcp_host.httpd.abort_controller import AbortController
 from dive_mcp_host.httpd.conf.command_alias import CommandAliasManager
-from dive_mcp_host.httpd.conf.httpd_service import ServiceManager
+from dive_mcp_host.httpd.conf.httpd_service import EventStreamConfig, ServiceManager
 from dive_mcp_host.httpd.conf.mcp_servers import MCPServerManager
 from dive_mcp_host.httpd.conf.models import ModelManager
 from dive_mcp_host.httpd.conf.prompt import PromptManager
@@ -31,10 +32,13 @@ from dive_mcp_host.httpd.database.migrate import db_migration
 from dive_mcp_host.httpd.database.msg_store.base import BaseMessageStore
 from dive_mcp_host.httpd.database.msg_store.sqlite import SQLiteMessageStore
 from dive_mcp_host.httpd.database.oauth_store.base import BaseOAuthtokenStore
+from dive_mcp_host.httpd.middlewares.general import DiveUser
 from dive_mcp_host.httpd.middlewares.plugins import PluginMiddlewaresManager
 from dive_mcp_host.httpd.routers.plugins import RouterPlugin
 from dive_mcp_host.httpd.store.cache import LocalFileCache
 from dive_mcp_host.httpd.store.manager import StoreManager
+from dive_mcp_host.httpd.stream_registry import EventStreamRegistry
+from dive_mcp_host.httpd.title_service import TitleService
 from dive_mcp_host.plugins.registry import PluginManager, load_plugins_config
 
 logger = getLogger(__name__)
@@ -93,6 +97,7 @@ class DiveHostAPI(FastAPI):
         self._engine: AsyncEngine | None = None
 
         self._abort_controller = AbortController()
+        self._event_streams = EventStreamRegistry()
 
         if self._service_config_manager.current_setting is None:
             raise ValueError("Service manager is not initialized")
@@ -106,6 +111,9 @@ class DiveHostAPI(FastAPI):
         self._model_config_manager = ModelManager(
             self._service_config_manager.current_setting.config_location.model_config_path
         )
+        self._title_service = TitleService(
+            lambda: self._model_config_manager.title_setting
+        )
         self._prompt_config_manager = PromptManager(
             self._service_config_manager.current_setting.config_location.prompt_config_path
         )
@@ -174,8 +182,12 @@ class DiveHostAPI(FastAPI):
         # ================================================
         # Store
         # ================================================
+        resource_dir = self._service_config_manager.current_setting.resource_dir
         self._store = StoreManager(
-            root_dir=self._service_config_manager.current_setting.resource_dir
+            root_dir=resource_dir,
+            attachment_cache=AttachmentCache(
+                cache_dir=resource_dir / "cache" / "attachments"
+            ),
         )
         self._store.register_hook(self._plugin_manager)
         self._local_file_cache = LocalFileCache(
@@ -254,8 +266,16 @@ class DiveHostAPI(FastAPI):
                 headers=server_config.headers or {},
                 proxy=server_config.proxy or None,
                 exclude_tools=server_config.exclude_tools,
+                keep_alive=server_config.keep_alive,
                 initial_timeout=server_config.initial_timeout,
                 tool_call_timeout=server_config.tool_call_timeout,
+                max_concurrent_calls=server_config.max_concurrent_calls,
+                call_queue_timeout=server_config.call_queue_timeout,
+                result_cache_ttl=server_config.result_cache_ttl,
+                result_cache_max_bytes=server_config.result_cache_max_bytes,
+                replicas=server_config.replicas,
+                session_pool=server_config.session_pool,
+                max_frame_size=server_config.max_frame_size,
             )
 
         logger.debug("got %s mcp servers in config", len(mcp_servers))
@@ -392,7 +412,31 @@ class DiveHostAPI(FastAPI):
         """Get the prompt config manager."""
         return self._prompt_config_manager
 
+    @property
+    def event_stream_config(self) -> EventStreamConfig:
+        """Get the event stream config."""
+        if self._service_config_manager.current_setting is None:
+            return EventStreamConfig()
+        return self._service_config_manager.current_setting.event_stream
+
+    async def websocket_user(self, websocket: WebSocket) -> DiveUser | None:
+        """Resolve the user of a websocket with the plugin middlewares.
+
+        Returns None if the plugins rejected the connection.
+        """
+        return await self._plugin_middlewares_manager.authenticate(websocket)
+
     @property
     def abort_controller(self) -> AbortController:
         """Get the abort controller."""
         return self._abort_controller
+
+    @property
+    def event_streams(self) -> EventStreamRegistry:
+        """Get the event streams of running chats."""
+        return self._event_streams
+
+    @property
+    def title_service(self) -> TitleService:
+        """Get the title service."""
+        return self._title_service
@@ -1,8 +1,6 @@
 import asyncio
-import base64
 from collections.abc import AsyncGenerator, Callable, Coroutine
 from contextlib import AsyncExitStack
-from io import BytesIO
 from logging import getLogger
 from mimetypes import guess_type
 from pathlib import Path
@@ -10,32 +8,43 @@ from typing import Any, Self
 from urllib.parse import urlparse
 
 from fastapi import UploadFile
-from PIL import Image
 
 from dive_mcp_host.env import RESOURCE_DIR
+from dive_mcp_host.host.errors import MediaAbortedError, MediaQueueTimeoutError
+from dive_mcp_host.host.store.attachment_cache import AttachmentCache
 from dive_mcp_host.host.store.base import FileType, StoreManagerProtocol, StoreProtocol
 from dive_mcp_host.httpd.store.local import LocalStore
+from dive_mcp_host.httpd.store.media import (
+    MediaProcessor,
+    encode_file,
+    encode_image,
+)
 from dive_mcp_host.plugins.registry import HookInfo, PluginManager
 
 type GetStoreCallback = Callable[[], Coroutine[Any, Any, StoreProtocol]]
 
 StoreHookName = "dive_mcp_host.httpd.store"
 
-IMAGE_MAX_SIZE = 256
-
 logger = getLogger(__name__)
 
 
 class StoreManager(StoreManagerProtocol):
     """The storage manager."""
 
-    def __init__(self, root_dir: Path = RESOURCE_DIR) -> None:
+    def __init__(
+        self,
+        root_dir: Path = RESOURCE_DIR,
+        attachment_cache: AttachmentCache | None = None,
+        media_processor: MediaProcessor | None = None,
+    ) -> None:
         """Initialize Storage manager.
 
         It always enables LocalStore.
         """
         super().__init__()
         self._local_store = LocalStore(root_dir)
+        self._attachment_cache = attachment_cache
+        self._media_processor = media_processor or MediaProcessor()
         self._storage_callbacks: list[tuple[GetStoreCallback, str]] = []
         self._storages: list[StoreProtocol] = []
 
@@ -69,6 +78,7 @@ class StoreManager(StoreManagerProtocol):
 
     async def _run_in_context(self) -> AsyncGenerator[Self, None]:
         async with AsyncExitStack() as stack:
+            stack.callback(self._media_processor.shutdown)
             await stack.enter_async_context(self._local_store)
             for callback, _ in self._storage_callbacks:
                 store = await callback()
@@ -85,8 +95,13 @@ class StoreManager(StoreManagerProtocol):
 
         Returns:
             List of paths / urls
+
+        Raises:
+            MediaQueueTimeoutError: The media processor is busy.
         """
-        path = self._local_store.save_base64_image(data, extension)
+        path = await self._media_processor.run(
+            "save_base64_image", self._local_store.save_base64_image, data, extension
+        )
         additional_paths = await self._run_storage_callbacks(path)
         return [path, *additional_paths]
 
@@ -122,6 +137,16 @@ class StoreManager(StoreManagerProtocol):
             all_paths.append((FileType.from_file_path(path), paths))
         return all_paths
 
+    @property
+    def media_processor(self) -> MediaProcessor:
+        """Get the media processor."""
+        return self._media_processor
+
+    @property
+    def attachment_cache(self) -> AttachmentCache | None:
+        """Get the cache of the converted attachments, None if disabled."""
+        return self._attachment_cache
+
     async def get_file(self, file_path: str | Path) -> bytes:
         """Get the file from the store."""
         return await self._local_store.get_file(file_path)
@@ -149,46 +174,31 @@ class StoreManager(StoreManagerProtocol):
             return content_type.startswith("text/")
         return False
 
-    async def get_image(self, file_path: str | Path) -> str | None:
+    async def get_image(
+        self, file_path: str | Path, abort_signal: asyncio.Event | None = None
+    ) -> str | None:
         """Get the base64 encoded image from the store."""
         if not Path(file_path).exists():
             logger.warning("file doesn't exist, %s", file_path)
             return None
+        try:
+            return await self._media_processor.run(
+                "get_image", encode_image, file_path, abort_signal=abort_signal
+            )
+        except MediaAbortedError:
+            return None
+        except MediaQueueTimeoutError as e:
+            logger.warning("skip the image %s, %s", file_path, e)
+            return None
 
-        with (
-            Image.open(BytesIO(await self.get_file(file_path))) as image,
-            BytesIO() as buffer,
-        ):
-            if image.width * image.height > IMAGE_MAX_SIZE * IMAGE_MAX_SIZE:
-                # Compress and preserve aspect ratio
-                if image.width > image.height:
-                    new_size = (
-                        IMAGE_MAX_SIZE,
-                        int(image.height * IMAGE_MAX_SIZE / image.width),
-                    )
-                else:
-                    new_size = (
-                        int(image.width * IMAGE_MAX_SIZE / image.height),
-                        IMAGE_MAX_SIZE,
-                    )
-                resized = image.resize(
-                    new_size,
-                    Image.Resampling.LANCZOS,
-                )
-            else:
-                resized = image
-            if image.mode in ["P", "RGBA"]:
-                resized = resized.convert("RGB")
-            resized.save(buffer, format="JPEG")
-            base64_image = base64.b64encode(buffer.getvalue()).decode("utf-8")
-
-            return f"data:image/jpeg;base64,{base64_image}"
-
-    async def get_document(self, file_path: str) -> tuple[str | None, str | None]:
+    async def get_document(
+        self, file_path: str, abort_signal: asyncio.Event | None = None
+    ) -> tuple[str | None, str | None]:
         """Get the base64 encoded document from the store.
 
         Args:
             file_path: The path to the document.
+            abort_signal: Stop encoding the document when set.
 
         Returns:
             tuple[str, str | None]: The base64 encoded document and the mime type.
@@ -197,9 +207,16 @@ class StoreManager(StoreManagerProtocol):
             logger.warning("file doesn't exist, %s", file_path)
             return None, None
         mime_type = guess_type(file_path)[0]
-        return base64.b64encode(await self.get_file(file_path)).decode(
-            "utf-8"
-        ), mime_type
+        try:
+            content = await self._media_processor.run(
+                "get_document", encode_file, file_path, abort_signal=abort_signal
+            )
+        except MediaAbortedError:
+            return None, None
+        except MediaQueueTimeoutError as e:
+            logger.warning("skip the document %s, %s", file_path, e)
+            return None, None
+        return content, mime_type
 
     async def get_document_text(self, file_path: str) -> str | None:
         """Get document text content from the store."""
@@ -0,0 +1,212 @@
+import asyncio
+import base64
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+
+from PIL import Image
+
+from dive_mcp_host.host.errors import MediaAbortedError, MediaQueueTimeoutError
+
+logger = getLogger(__name__)
+
+IMAGE_MAX_SIZE = 256
+
+
+@dataclass(slots=True)
+class MediaTransformStats:
+    """Latency of a media transform, including the time in the queue."""
+
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        """Mean latency."""
+        return self.total_seconds / self.count if self.count else 0.0
+
+
+def encode_image(file_path: str | Path) -> str:
+    """Resize the image and encode it as an inline base64 JPEG."""
+    with (
+        Image.open(file_path) as image,
+        BytesIO() as buffer,
+    ):
+        if image.width * image.height > IMAGE_MAX_SIZE * IMAGE_MAX_SIZE:
+            # Compress and preserve aspect ratio
+            if image.width > image.height:
+                new_size = (
+                    IMAGE_MAX_SIZE,
+                    int(image.height * IMAGE_MAX_SIZE / image.width),
+                )
+            else:
+                new_size = (
+                    int(image.width * IMAGE_MAX_SIZE / image.height),
+                    IMAGE_MAX_SIZE,
+                )
+            resized = image.resize(
+                new_size,
+                Image.Resampling.LANCZOS,
+            )
+        else:
+            resized = image
+        if image.mode in ["P", "RGBA"]:
+            resized = resized.convert("RGB")
+        resized.save(buffer, format="JPEG")
+        base64_image = base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+        return f"data:image/jpeg;base64,{base64_image}"
+
+
+def encode_file(file_path: str | Path) -> str:
+    """Encode the file as base64."""
+    return base64.b64encode(Path(file_path).read_bytes()).decode("utf-8")
+
+
+class MediaProcessor:
+    """Run image and document transforms off the event loop.
+
+    PIL and base64 release the GIL for the heavy work, so a thread pool keeps the
+    event loop responsive without the cost of a process pool. At most
+    ``max_queue_size`` transforms can be submitted at the same time, further
+    transforms wait for a slot up to ``queue_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queue_size: int = 32,
+        queue_timeout: float | None = 30.0,
+    ) -> None:
+        """Initialize the media processor.
+
+        Args:
+            max_workers: Threads running the transforms.
+            max_queue_size: Max transforms submitted, running ones included.
+            queue_timeout: Seconds a transform waits for a slot, None to wait
+                forever.
+        """
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="media"
+        )
+        self._slots = asyncio.Semaphore(max_queue_size)
+        self._queue_timeout = queue_timeout
+        self._queue_depth = 0
+        self._stats: dict[str, MediaTransformStats] = {}
+
+    @property
+    def queue_depth(self) -> int:
+        """Transforms submitted and not finished yet."""
+        return self._queue_depth
+
+    @property
+    def stats(self) -> dict[str, MediaTransformStats]:
+        """Latency of the finished transforms, keyed by transform name."""
+        return dict(self._stats)
+
+    async def run[R](
+        self,
+        name: str,
+        func: Callable[..., R],
+        *args: Any,
+        abort_signal: asyncio.Event | None = None,
+    ) -> R:
+        """Run the transform in the pool.
+
+        Args:
+            name: Name of the transform, used for the stats.
+            func: The transform.
+            args: Arguments of the transform.
+            abort_signal: Abort signal of the chat. The transform is cancelled if
+                it is still queued, or its result is discarded.
+
+        Raises:
+            MediaQueueTimeoutError: No slot was free within the queue timeout.
+            MediaAbortedError: The abort signal is set.
+        """
+        if abort_signal and abort_signal.is_set():
+            raise MediaAbortedError(name)
+
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        await self._acquire(name, abort_signal)
+        self._queue_depth += 1
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._queue_depth -= 1
+            self._slots.release()
+            raise
+
+        def _done(_: Future) -> None:
+            self._queue_depth -= 1
+            self._slots.release()
+
+        future.add_done_callback(
+            lambda f: None if loop.is_closed() else loop.call_soon_threadsafe(_done, f)
+        )
+        result = asyncio.wrap_future(future)
+        if abort_signal is None:
+            value = await result
+        else:
+            abort_task = asyncio.create_task(abort_signal.wait())
+            try:
+                done, _ = await asyncio.wait(
+                    {result, abort_task}, return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                abort_task.cancel()
+            if result not in done:
+                result.cancel()
+                raise MediaAbortedError(name)
+            value = result.result()
+
+        elapsed = time.perf_counter() - start
+        stats = self._stats.setdefault(name, MediaTransformStats())
+        stats.count += 1
+        stats.total_seconds += elapsed
+        stats.max_seconds = max(stats.max_seconds, elapsed)
+        logger.debug("media transform %s took %.3fs", name, elapsed)
+        return value
+
+    async def _acquire(self, name: str, abort_signal: asyncio.Event | None) -> None:
+        """Wait for a free slot."""
+        acquire = asyncio.ensure_future(self._slots.acquire())
+        abort_task = asyncio.create_task(abort_signal.wait()) if abort_signal else None
+        try:
+            await asyncio.wait(
+                [acquire, abort_task] if abort_task else [acquire],
+                timeout=self._queue_timeout,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        except BaseException:
+            self._cancel_acquire(acquire)
+            raise
+        finally:
+            if abort_task:
+                abort_task.cancel()
+
+        if abort_signal and abort_signal.is_set():
+            self._cancel_acquire(acquire)
+            raise MediaAbortedError(name)
+        if not acquire.done():
+            self._cancel_acquire(acquire)
+            raise MediaQueueTimeoutError(name, self._queue_timeout or 0)
+
+    def _cancel_acquire(self, acquire: asyncio.Future[bool]) -> None:
+        if acquire.done() and not acquire.cancelled():
+            # the slot was acquired meanwhile
+            self._slots.release()
+        else:
+            # the semaphore hands the slot to the next waiter
+            acquire.cancel()
+
+    def shutdown(self) -> None:
+        """Stop the pool, queued transforms are cancelled."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
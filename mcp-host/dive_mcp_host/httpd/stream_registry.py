@@ -0,0 +1,59 @@
+import asyncio
+from collections.abc import Generator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from dive_mcp_host.httpd.routers.models import EventStreamGauge
+    from dive_mcp_host.httpd.routers.utils import EventStreamContextManager
+
+
+class EventStreamRegistry:
+    """Keep track of the event streams of running chats."""
+
+    def __init__(self) -> None:
+        """Initialize the EventStreamRegistry."""
+        self._streams: dict[str, EventStreamContextManager] = {}
+        # the user of the chat of each stream
+        self._owners: dict[str, str | None] = {}
+
+    @contextmanager
+    def register(
+        self, key: str, stream: "EventStreamContextManager", user_id: str | None
+    ) -> Generator[None, None, None]:
+        """Register the stream for a given key while the context is active.
+
+        Resumable streams stay registered for ``replay_retention`` seconds
+        after the context exits.
+        """
+        self._streams[key] = stream
+        self._owners[key] = user_id
+        try:
+            yield
+        finally:
+            if stream.resumable:
+                # Keep finished streams around for clients to re-attach.
+                asyncio.get_running_loop().call_later(
+                    stream.config.replay_retention, self._remove, key, stream
+                )
+            else:
+                self._remove(key, stream)
+
+    def _remove(self, key: str, stream: "EventStreamContextManager") -> None:
+        if self._streams.get(key) is stream:
+            del self._streams[key]
+            del self._owners[key]
+
+    def get(self, key: str, user_id: str | None) -> "EventStreamContextManager | None":
+        """Get the stream for a given key, if it belongs to the user."""
+        if key not in self._streams or self._owners[key] != user_id:
+            return None
+        return self._streams[key]
+
+    def gauges(self, user_id: str | None) -> dict[str, "EventStreamGauge"]:
+        """Get the queue metrics of the registered streams of the user."""
+        return {
+            key: stream.gauge
+            for key, stream in self._streams.items()
+            if self._owners[key] == user_id
+        }
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import re
+from collections.abc import Callable
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.output_parsers import StrOutputParser
+
+from dive_mcp_host.host.conf.llm import LLMConfigTypes
+from dive_mcp_host.models import load_model
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TITLE = "New Chat"
+
+title_prompt = """You are a title generator from the user input.
+Your only task is to generate a short title based on the user input.
+IMPORTANT:
+- Output ONLY the title
+- DO NOT try to answer or resolve the user input query.
+- DO NOT try to use any tools to generate title
+- NO thinking, reasoning, explanations, quotes, or extra text
+- NO punctuation at the end
+- If the input is URL only, output the description of the URL, for example, "the URL of xxx website"
+- Generate the title in the primary language of the input (the language used for the majority of the text)
+- Preserve proper nouns and technical terms in their original language"""  # noqa: E501
+
+
+def strip_title(title: str) -> str:
+    """Strip the title, remove any tags."""
+    title = re.sub(r"\s*<.+>.*?</.+>\s*", "", title, flags=re.DOTALL)
+    return " ".join(title.split())
+
+
+def heuristic_title(query: str, max_words: int = 6, max_length: int = 50) -> str:
+    """Build a title from the first words of the query."""
+    title = " ".join(query.split()[:max_words])[:max_length]
+    return title.rstrip(" .,:;!?") or DEFAULT_TITLE
+
+
+class TitleService:
+    """Generate chat titles without running the chat agent.
+
+    The model is called directly with the title prompt. It uses the model in
+    ``titleConfig`` of the model config, or the chat model when it is not set.
+    At most ``max_workers`` titles are generated at the same time, further
+    requests get a title from the first words of the query.
+    """
+
+    def __init__(
+        self,
+        get_config: Callable[[], LLMConfigTypes | None],
+        max_workers: int = 2,
+        timeout: float = 30,
+    ) -> None:
+        """Initialize the TitleService.
+
+        Args:
+            get_config: Get the current model config for title generation.
+            max_workers: Max titles generated at the same time.
+            timeout: Seconds to wait for the model.
+        """
+        self._get_config = get_config
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._timeout = timeout
+        self._config: LLMConfigTypes | None = None
+        self._model: BaseChatModel | None = None
+        self._str_output_parser = StrOutputParser()
+
+    def _title_model(self, default_model: BaseChatModel) -> BaseChatModel:
+        config = self._get_config()
+        if config is None:
+            return default_model
+        if self._model is None or config != self._config:
+            self._model = load_model(
+                config.model_provider,
+                config.model,
+                **config.to_load_model_kwargs(),
+            )
+            self._config = config
+        return self._model
+
+    async def generate(self, query: str | None, default_model: BaseChatModel) -> str:
+        """Generate a title for the query.
+
+        Args:
+            query: The first message of the chat.
+            default_model: The model used when no title model is configured.
+        """
+        if not query or query.isspace():
+            return DEFAULT_TITLE
+        if self._semaphore.locked():
+            logger.debug("Title workers are busy, use heuristic title")
+            return heuristic_title(query)
+
+        async with self._semaphore:
+            try:
+                model = self._title_model(default_model)
+                async with asyncio.timeout(self._timeout):
+                    response = await model.ainvoke(
+                        [
+                            SystemMessage(content=title_prompt),
+                            HumanMessage(content=query),
+                        ]
+                    )
+                if title := strip_title(self._str_output_parser.invoke(response)):
+                    return title
+            except Exception as e:
+                logger.exception("Error generating title: %s", e)
+        return heuristic_title(query)
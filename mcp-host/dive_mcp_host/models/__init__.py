@@ -5,6 +5,8 @@ from importlib import import_module
 from typing import Any
 
 from langchain.chat_models import init_chat_model
+from langchain.embeddings import init_embeddings
+from langchain_core.embeddings import Embeddings
 from langchain_core.language_models import BaseChatModel
 
 from dive_mcp_host.models.helpers import clean_model_kwargs
@@ -74,3 +76,19 @@ def load_model(
             **clean_model_kwargs(provider, kwargs),
         )
     return model
+
+
+def load_embeddings(
+    provider: str,
+    model_name: str,
+    **kwargs: Any,
+) -> Embeddings:
+    """Load an embedding model from langchain.
+
+    Args:
+        provider: provider name.
+        model_name: The name of the model to load.
+        kwargs: Additional keyword arguments to pass to the model.
+    """
+    logger.debug("Loading embeddings %s with provider %s", model_name, provider)
+    return init_embeddings(model=model_name, provider=provider, **kwargs)
@@ -61,7 +61,7 @@ def extract_stream(content: str) -> Generator[dict[str, Any], None, None]:
 
     Returns: The stream from the content
     """
-    assert content.startswith("data: ")
+    assert content.startswith(("data: ", "id: "))
     assert content.endswith("data: [DONE]\n\n")
     data_messages = re.findall(r"data: (.*?)\n\n", content)
     for data in data_messages:
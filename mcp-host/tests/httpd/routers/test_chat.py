@@ -6,7 +6,9 @@ from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, cast
 
-from fastapi import status
+import pytest
+from fastapi import Request, WebSocketDisconnect, status
+from fastapi.responses import JSONResponse
 from fastapi.testclient import TestClient
 from langchain_core.messages import AIMessage, AIMessageChunk, ToolCall
 
@@ -231,6 +233,207 @@ def test_abort_chat(test_client):
         assert abort_message["success"]  # type: ignore
 
 
+def test_list_streams(test_client):
+    """Test the /api/chat/streams endpoint."""
+    client, app = test_client
+    app.dive_host["default"]._model.sleep = 3  # type: ignore
+
+    fake_id = str(uuid.uuid4())
+
+    response = client.get("/api/chat/streams")
+    assert response.status_code == SUCCESS_CODE
+    assert fake_id not in response.json()["data"]
+
+    def create_chat():
+        response = client.post(
+            "/api/chat",
+            data={"message": "long long time", "chatId": fake_id},
+        )
+        assert response.status_code == SUCCESS_CODE
+
+    with ThreadPoolExecutor(1) as executor:
+        executor.submit(create_chat)
+        time.sleep(1)
+
+        response = client.get("/api/chat/streams")
+        assert response.status_code == SUCCESS_CODE
+        gauge = response.json()["data"][fake_id]
+        assert gauge["queueSize"] == 256
+        assert gauge["disconnected"] is False
+
+
+def test_list_streams_of_user(test_client):
+    """Test /api/chat/streams only lists the streams of the user."""
+    client, app = test_client
+
+    async def user_header(request: Request, call_next):
+        request.state.dive_user = {
+            **request.state.dive_user,
+            "user_id": request.headers.get("X-User"),
+        }
+        return await call_next(request)
+
+    app._plugin_middlewares_manager.plugins.append((user_header, "user"))
+    chat_id = str(uuid.uuid4())
+    response = client.post(
+        "/api/chat",
+        data={"message": "Hello, world!", "chatId": chat_id},
+        headers={"X-User": "alice"},
+    )
+    assert response.status_code == SUCCESS_CODE
+
+    response = client.get("/api/chat/streams", headers={"X-User": "alice"})
+    assert chat_id in response.json()["data"]
+    response = client.get("/api/chat/streams", headers={"X-User": "bob"})
+    assert chat_id not in response.json()["data"]
+
+
+def test_resume_chat(test_client):
+    """Test the /api/chat/{chat_id}/stream endpoint."""
+    client, app = test_client
+
+    response = client.get(f"/api/chat/{uuid.uuid4()}/stream")
+    assert response.status_code == BAD_REQUEST_CODE
+
+    chat_id = str(uuid.uuid4())
+    response = client.post(
+        "/api/chat", data={"message": "Hello, world!", "chatId": chat_id}
+    )
+    assert response.status_code == SUCCESS_CODE
+    frames = response.text.split("\n\n")
+    # the frames carry the event IDs to resume from
+    assert frames[0].startswith("id: 1\n")
+
+    response = client.get(f"/api/chat/{chat_id}/stream")
+    assert response.status_code == SUCCESS_CODE
+    assert response.text.split("\n\n") == frames
+
+    response = client.get(f"/api/chat/{chat_id}/stream", headers={"Last-Event-ID": "2"})
+    assert response.status_code == SUCCESS_CODE
+    assert response.text.split("\n\n")[0] == frames[2]
+
+    # the stream belongs to the user of the chat
+    async def user_header(request: Request, call_next):
+        request.state.dive_user = {
+            **request.state.dive_user,
+            "user_id": request.headers.get("X-User"),
+        }
+        return await call_next(request)
+
+    app._plugin_middlewares_manager.plugins.append((user_header, "user"))
+    response = client.get(f"/api/chat/{chat_id}/stream", headers={"X-User": "other"})
+    assert response.status_code == BAD_REQUEST_CODE
+    response = client.get(f"/api/chat/{chat_id}/stream")
+    assert response.status_code == SUCCESS_CODE
+
+    response = client.get(
+        f"/api/chat/{chat_id}/stream", headers={"Last-Event-ID": "100"}
+    )
+    assert response.status_code == BAD_REQUEST_CODE
+
+
+def test_chat_socket(test_client):
+    """Test the /api/chat/ws websocket endpoint."""
+    client, _ = test_client
+
+    with client.websocket_connect("/api/chat/ws") as websocket:
+        websocket.send_json({"type": "chat", "id": "s1", "message": "Hello"})
+        websocket.send_json({"type": "chat", "id": "s2", "message": "World"})
+        messages: dict[str, list[dict]] = {"s1": [], "s2": []}
+        done = set()
+        while len(done) < 2:
+            frame = websocket.receive_json()
+            if frame.get("done"):
+                done.add(frame["id"])
+            else:
+                messages[frame["id"]].append(frame["data"]["message"])
+
+        for stream in messages.values():
+            types = [m["type"] for m in stream]
+            assert types[0] == "chat_info"
+            assert "text" in types
+            assert "message_info" in types
+        assert messages["s1"][0]["content"]["id"] != messages["s2"][0]["content"]["id"]
+
+        # the message id of a chat message is ignored, it doesn't edit the chat
+        chat_id = messages["s1"][0]["content"]["id"]
+        user_message_id = next(
+            m["content"]["userMessageId"]
+            for m in messages["s1"]
+            if m["type"] == "message_info"
+        )
+        websocket.send_json(
+            {
+                "type": "chat",
+                "id": "s3",
+                "chatId": chat_id,
+                "message": "Again",
+                "messageId": user_message_id,
+            }
+        )
+        while websocket.receive_json().get("done") is None:
+            pass
+        chat_messages = client.get(f"/api/chat/{chat_id}").json()["data"]["messages"]
+        assert [m["role"] for m in chat_messages] == [
+            "user",
+            "assistant",
+            "user",
+            "assistant",
+        ]
+
+        websocket.send_json({"type": "abort", "id": "a1", "chatId": "unknown"})
+        assert websocket.receive_json() == {
+            "id": "a1",
+            "success": False,
+            "message": "Chat not found",
+        }
+
+        websocket.send_json({"type": "retry", "id": "r1", "chatId": "unknown"})
+        assert websocket.receive_json()["success"] is False
+
+        websocket.send_json({"type": "unknown"})
+        frame = websocket.receive_json()
+        assert frame["id"] is None
+        assert frame["success"] is False
+
+
+def test_chat_socket_plugin_auth(test_client):
+    """Test the websocket goes through the plugin middlewares."""
+    client, app = test_client
+
+    async def auth(request: Request, call_next):
+        if request.headers.get("Authorization") != "Bearer token":
+            return JSONResponse(status_code=401, content={})
+        request.state.dive_user = {
+            **request.state.dive_user,
+            "user_id": "socket-user",
+        }
+        return await call_next(request)
+
+    app._plugin_middlewares_manager.plugins.append((auth, "auth"))
+
+    with (
+        pytest.raises(WebSocketDisconnect) as e,
+        client.websocket_connect("/api/chat/ws"),
+    ):
+        pass
+    assert e.value.code == status.WS_1008_POLICY_VIOLATION
+
+    headers = {"Authorization": "Bearer token"}
+    with client.websocket_connect("/api/chat/ws", headers=headers) as websocket:
+        websocket.send_json({"type": "chat", "id": "s1", "message": "Hello"})
+        chat_id = None
+        while not (frame := websocket.receive_json()).get("done"):
+            message = frame["data"]["message"]
+            if message["type"] == "chat_info":
+                chat_id = message["content"]["id"]
+
+    # stored as the user resolved by the plugin
+    response = client.get(f"/api/chat/{chat_id}", headers=headers)
+    assert response.status_code == SUCCESS_CODE
+    assert response.json()["data"]["chat"]["id"] == chat_id
+
+
 def test_create_chat(test_client):
     """Test the /api/chat POST endpoint."""
     client, app = test_client
@@ -775,7 +978,7 @@ def test_chat_with_tool_calls(test_client, monkeypatch):
     client, app = test_client
 
     # Import necessary message types
-    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+    from langchain_core.messages import AIMessage, ToolMessage
     from langchain_core.messages.tool import tool_call, tool_call_chunk
 
     # mock the query method
@@ -872,8 +1075,7 @@ def test_chat_with_tool_calls(test_client, monkeypatch):
                 ),
             )
 
-            # mock the values response
-            user_message = HumanMessage(content="Calculate 2+2", id="user-msg-id")
+            # mock the node updates
             ai_message = AIMessage(
                 content="The result of 2+2 is 4.",
                 id="assistant-msg-id",
@@ -883,140 +1085,44 @@ def test_chat_with_tool_calls(test_client, monkeypatch):
                     "total_tokens": 25,
                 },
             )
-
-            current_messages = [
-                user_message,
-                AIMessage(
-                    content="",
-                    id="tool-call-msg-id",
-                    tool_calls=[
-                        {
-                            "name": "calculator",
-                            "args": {"expression": "2+2"},
-                            "id": "tool-call-id",
-                            "type": "tool_call",
-                        }
-                    ],
-                ),
-                ToolMessage(
-                    content=json.dumps(4),
-                    name="calculator",
-                    id="tool-result-msg-id",
-                    tool_call_id="tool-call-id",
-                ),
-                ai_message,
-            ]
-
-            yield "values", {"messages": current_messages}
-
             yield (
                 "updates",
                 {
-                    "chat": {
+                    "agent": {
                         "messages": [
                             AIMessage(
-                                content=[
-                                    {
-                                        "text": "I'll help you calculate that by using the calculator function.",  # noqa: E501
-                                        "type": "text",
-                                    },
-                                    {
-                                        "id": "toolu_01AiUPAqBGGDR8RL1uz6SUuE",
-                                        "input": {"expression": "2+2"},
-                                        "name": "calculator",
-                                        "type": "tool_use",
-                                    },
-                                ],
-                                additional_kwargs={},
-                                response_metadata={
-                                    "id": "msg_01VPZAfL674xURgFGEbUXLhD",
-                                    "model": "claude-3-5-haiku-20241022",
-                                    "stop_reason": "tool_use",
-                                    "stop_sequence": None,
-                                    "usage": {
-                                        "cache_creation_input_tokens": 0,
-                                        "cache_read_input_tokens": 0,
-                                        "input_tokens": 345,
-                                        "output_tokens": 85,
-                                    },
-                                    "model_name": "claude-3-5-haiku-20241022",
-                                },
-                                id="run-c6574da4-41f2-4d64-9a88-77e398113e2f-0",
+                                content="",
+                                id="tool-call-msg-id",
                                 tool_calls=[
                                     {
                                         "name": "calculator",
                                         "args": {"expression": "2+2"},
-                                        "id": "toolu_01AiUPAqBGGDR8RL1uz6SUuE",
+                                        "id": "tool-call-id",
                                         "type": "tool_call",
                                     }
                                 ],
-                                usage_metadata={
-                                    "input_tokens": 345,
-                                    "output_tokens": 85,
-                                    "total_tokens": 430,
-                                    "input_token_details": {
-                                        "cache_read": 0,
-                                        "cache_creation": 0,
-                                    },
-                                },
                             )
                         ]
                     }
                 },
             )
-
             yield (
                 "updates",
                 {
                     "tools": {
                         "messages": [
                             ToolMessage(
-                                content="4",
+                                content=json.dumps(4),
                                 name="calculator",
-                                id="6a15648d-6498-4f81-b1f6-5c9f71abbd15",
-                                tool_call_id="toolu_01AiUPAqBGGDR8RL1uz6SUuE",
-                            )
-                        ]
-                    }
-                },
-            )
-
-            yield (
-                "updates",
-                {
-                    "chat": {
-                        "messages": [
-                            AIMessage(
-                                content="The result is 4. 2 + 2 = 4.",
-                                additional_kwargs={},
-                                response_metadata={
-                                    "id": "ms g_01K6igyvdVwf8sAoKiHH32fZ",
-                                    "model": "claude-3-5-haiku-20241022",
-                                    "stop_reason": "end_turn",
-                                    "stop_sequence": None,
-                                    "usage": {
-                                        "cache_creation _input_tokens": 0,
-                                        "cache_read_input_tokens": 0,
-                                        "input_tokens": 442,
-                                        "output_tokens": 21,
-                                    },
-                                    "model_name": "claude-3-5-haiku-20241022",
-                                },
-                                id="ru n-415bff33-6772-4e4a-9d25-bdba8e5470fc-0",
-                                usage_metadata={
-                                    "input_tokens": 442,
-                                    "output_tokens": 21,
-                                    "total_tokens": 463,
-                                    "input_token_details ": {
-                                        "cache_read": 0,
-                                        "cache_creation": 0,
-                                    },
-                                },
+                                id="tool-result-msg-id",
+                                tool_call_id="tool-call-id",
                             )
                         ]
                     }
                 },
             )
+            yield "updates", {"before_agent": {"messages": []}}
+            yield "updates", {"agent": {"messages": [ai_message]}}
 
         return response_generator()
 
@@ -17,7 +17,7 @@ from tests import helper
 @pytest.fixture(autouse=True)
 def mock_event_stream():
     """Mock EventStreamContextManager to prevent tests from hanging."""
-    mock_instance = MagicMock()
+    mock_instance = MagicMock(spec=CompletionEventStreamContextManager)
     mock_instance.queue = asyncio.Queue()
     mock_instance.get_response.return_value = StreamingResponse(
         content=iter(["data: [DONE]\n\n"]),
@@ -32,15 +32,9 @@ def mock_event_stream():
 
     mock_instance.write = mock_write
 
-    with (
-        patch(
-            "dive_mcp_host.httpd.routers.utils.EventStreamContextManager",
-            return_value=mock_instance,
-        ),
-        patch(
-            "dive_mcp_host.httpd.routers.openai.CompletionEventStreamContextManager",
-            return_value=mock_instance,
-        ),
+    with patch(
+        "dive_mcp_host.httpd.routers.openai.CompletionEventStreamContextManager",
+        return_value=mock_instance,
     ):
         yield mock_instance
 
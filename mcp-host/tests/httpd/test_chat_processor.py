@@ -7,7 +7,12 @@ from unittest.mock import AsyncMock
 
 import pytest
 import pytest_asyncio
-from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    HumanMessage,
+    RemoveMessage,
+)
 
 from dive_mcp_host.httpd.conf.httpd_service import ServiceManager
 from dive_mcp_host.httpd.conf.mcp_servers import Config
@@ -85,7 +90,7 @@ async def test_prompt(processor: ChatProcessor, monkeypatch: pytest.MonkeyPatch)
 
 def test_strip_title():
     """Test the strip_title function."""
-    from dive_mcp_host.httpd.routers.utils import strip_title
+    from dive_mcp_host.httpd.title_service import strip_title
 
     # Test basic whitespace normalization
     assert strip_title("  hello   world  ") == "hello world"
@@ -118,6 +123,75 @@ async def test_generate_title(processor: ChatProcessor):
     assert r == "Simple Greeting 2"
 
 
+@pytest.mark.asyncio
+async def test_handle_response_updates(processor: ChatProcessor):
+    """The messages of the query are built from the node updates."""
+    history = [HumanMessage(content="hi", id="h1"), AIMessage(content="hey", id="a1")]
+    query = HumanMessage(content="Hello", id="h2")
+    final = AIMessage(content="Hi there", id="a3")
+
+    async def response() -> AsyncGenerator[tuple[str, Any], None]:
+        yield "updates", {"before_agent": {"messages": []}}
+        yield "updates", {"agent": {"messages": [AIMessage(content="", id="a2")]}}
+        # messages are re-created with new IDs, the history is not touched
+        yield (
+            "updates",
+            {
+                "before_agent": {
+                    "messages": [
+                        RemoveMessage(id="h2"),
+                        RemoveMessage(id="a2"),
+                        RemoveMessage(id="a1"),
+                        HumanMessage(content="Hello", id="h3"),
+                    ]
+                }
+            },
+        )
+        yield "updates", {"agent": {"messages": [final]}}
+
+    user_message, ai_message, current_messages, _ = await processor._handle_response(
+        response(), 0, [*history, query]
+    )
+    assert user_message.id == "h3"
+    assert ai_message is final
+    assert [m.id for m in current_messages] == ["h3", "a3"]
+
+
+@pytest.mark.asyncio
+async def test_handle_response_max_tokens(server: DiveHostAPI):
+    """The stop reason is reported when the streamed message is done."""
+    stream = AsyncMock()
+
+    class State:
+        dive_user: dict[str, str]
+
+    state = State()
+    state.dive_user = {"user_id": "default"}
+    processor = ChatProcessor(server, state, stream)  # type: ignore
+    final = AIMessage(content="Hello", id="a1")
+
+    async def response() -> AsyncGenerator[tuple[str, Any], None]:
+        yield "messages", (AIMessageChunk(content="Hel", id="a1"), {})
+        yield "messages", (AIMessageChunk(content="lo", id="a1"), {})
+        yield (
+            "messages",
+            (
+                AIMessageChunk(
+                    content="", id="a1", response_metadata={"stop_reason": "max_tokens"}
+                ),
+                {},
+            ),
+        )
+        yield "updates", {"agent": {"messages": [final]}}
+
+    await processor._handle_response(
+        response(), 0, [HumanMessage(content="Hi", id="h1")]
+    )
+    messages = [call.args[0] for call in stream.write.call_args_list]
+    assert [m.type for m in messages] == ["text", "text", "error"]
+    assert messages[2].content.type == "max_tokens"
+
+
 @pytest.mark.asyncio
 async def test_content_handler_gemini_image_with_url():
     """Check if content handler can extract what is needed."""
@@ -0,0 +1,239 @@
+import asyncio
+import json
+
+import pytest
+
+from dive_mcp_host.host.custom_events import ToolCallProgress
+from dive_mcp_host.httpd.abort_controller import AbortController
+from dive_mcp_host.httpd.conf.httpd_service import EventStreamConfig
+from dive_mcp_host.httpd.routers.models import ChatInfoContent, StreamMessage
+from dive_mcp_host.httpd.routers.sse import StreamMessageEncoder
+from dive_mcp_host.httpd.routers.utils import EventStreamContextManager
+
+
+async def _collect(stream: EventStreamContextManager) -> list[dict]:
+    """Collect all messages of a finished stream."""
+    result = []
+    async for frame in stream._generate():
+        data = frame.decode().split("data: ", 1)[1].strip()
+        if data == "[DONE]":
+            break
+        result.append(json.loads(json.loads(data)["message"]))
+    return result
+
+
+def _progress(progress: float, tool_call_id: str = "call_1") -> StreamMessage:
+    return StreamMessage(
+        type="tool_call_progress",
+        content=ToolCallProgress(
+            progress=progress, total=10, message=None, tool_call_id=tool_call_id
+        ),
+    )
+
+
+@pytest.mark.asyncio
+async def test_coalesce_text_and_progress():
+    """Consecutive text / progress events are merged, order is preserved."""
+    stream = EventStreamContextManager(EventStreamConfig(coalesce_window=10))
+    async with stream:
+        for token in ["Hel", "lo", " world"]:
+            await stream.write(StreamMessage(type="text", content=token))
+        await stream.write(_progress(1))
+        await stream.write(_progress(1, "call_2"))
+        await stream.write(_progress(2))
+        await stream.write(
+            StreamMessage(type="chat_info", content=ChatInfoContent(id="1", title="t"))
+        )
+        await stream.write(StreamMessage(type="text", content="!"))
+
+    messages = await _collect(stream)
+    assert [m["type"] for m in messages] == [
+        "text",
+        "tool_call_progress",
+        "tool_call_progress",
+        "chat_info",
+        "text",
+    ]
+    assert messages[0]["content"] == "Hello world"
+    assert messages[1]["content"]["tool_call_id"] == "call_2"
+    assert messages[2]["content"]["progress"] == 2
+    assert messages[4]["content"] == "!"
+
+
+@pytest.mark.asyncio
+async def test_coalesce_windows():
+    """The buffer is flushed by the byte and time windows."""
+    stream = EventStreamContextManager(
+        EventStreamConfig(coalesce_window=0.01, coalesce_max_bytes=4)
+    )
+    await stream.write(StreamMessage(type="text", content="abcd"))
+    assert stream.queue.qsize() == 1
+
+    await stream.write(StreamMessage(type="text", content="e"))
+    assert stream.queue.qsize() == 1
+    await asyncio.sleep(0.05)
+    assert stream.queue.qsize() == 2
+
+
+@pytest.mark.asyncio
+async def test_coalesce_disabled():
+    """Without config every event becomes a frame."""
+    stream = EventStreamContextManager()
+    async with stream:
+        for token in ["a", "b"]:
+            await stream.write(StreamMessage(type="text", content=token))
+
+    messages = await _collect(stream)
+    assert [m["content"] for m in messages] == ["a", "b"]
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        StreamMessage(type="text", content='a"\\\n\t\x01 é 中 \u2028 😀'),
+        StreamMessage(type="chat_info", content=ChatInfoContent(id="1", title="é")),
+        _progress(1),
+    ],
+)
+def test_encoder_wire_compatible(message: StreamMessage):
+    """The wrapped envelope is byte-identical to the legacy encoding."""
+    legacy = "data: " + json.dumps({"message": message.model_dump_json(by_alias=True)})
+    assert StreamMessageEncoder().encode(message) == (legacy + "\n\n").encode()
+
+    flat = StreamMessageEncoder("flat").encode(message)
+    assert flat.startswith(b"data: ")
+    assert flat.endswith(b"\n\n")
+    assert json.loads(flat[6:])["message"] == json.loads(
+        message.model_dump_json(by_alias=True)
+    )
+
+
+@pytest.mark.asyncio
+async def test_overflow_policies():
+    """Full queues coalesce or drop events depending on the policy."""
+    stream = EventStreamContextManager(
+        EventStreamConfig(
+            coalesce=False, max_queue_size=1, overflow_policy="drop_progress"
+        )
+    )
+    await stream.write(StreamMessage(type="text", content="a"))
+    await stream.write(_progress(1))
+    assert stream.gauge.dropped_events == 1
+    assert stream.gauge.queue_depth == 1
+
+    stream = EventStreamContextManager(
+        EventStreamConfig(coalesce=False, max_queue_size=1, overflow_policy="coalesce")
+    )
+    await stream.write(StreamMessage(type="text", content="a"))
+    await stream.write(StreamMessage(type="text", content="b"))
+    await stream.write(StreamMessage(type="text", content="c"))
+    assert stream.queue.get_nowait() is not None
+    await asyncio.sleep(0.1)
+    frame = stream.queue.get_nowait().split(b"data: ", 1)[1]
+    assert json.loads(json.loads(frame)["message"]) == {
+        "type": "text",
+        "content": "bc",
+    }
+    assert stream.gauge.max_queue_depth == 1
+
+
+@pytest.mark.asyncio
+async def test_disconnect_aborts_task():
+    """A client disconnect aborts the producer and releases blocked writers."""
+    aborted = asyncio.Event()
+    abort_controller = AbortController()
+    stream = EventStreamContextManager(
+        EventStreamConfig(max_queue_size=1, replay_buffer_size=0)
+    )
+
+    async def producer() -> None:
+        async with (
+            abort_controller.abort_signal("chat", aborted.set),
+            stream,
+        ):
+            with stream.abort_on_disconnect(abort_controller, "chat"):
+                await stream.write("first")
+                await stream.write("second")  # blocks until the client leaves
+                await aborted.wait()
+
+    task = asyncio.create_task(producer())
+    generator = stream._generate()
+    assert await anext(generator) == b"data: first\n\n"
+    await generator.aclose()
+
+    await asyncio.wait_for(task, 1)
+    assert aborted.is_set()
+    assert stream.gauge.disconnected
+
+
+@pytest.mark.asyncio
+async def test_replay_after_disconnect():
+    """A client can re-attach and continue from the last event it received."""
+    aborted = asyncio.Event()
+    abort_controller = AbortController()
+    stream = EventStreamContextManager(
+        EventStreamConfig(coalesce=False, replay_buffer_size=2, resume_timeout=0.5)
+    )
+    resumed = asyncio.Event()
+
+    async def producer() -> None:
+        async with (
+            abort_controller.abort_signal("chat", aborted.set),
+            stream,
+        ):
+            with stream.abort_on_disconnect(abort_controller, "chat"):
+                await stream.write("first")
+                await resumed.wait()
+                await stream.write("second")
+                await stream.write("third")
+
+    task = asyncio.create_task(producer())
+    generator = stream._generate()
+    # the frames carry their event ID when replay is enabled
+    assert await anext(generator) == b"id: 1\ndata: first\n\n"
+    await generator.aclose()
+    assert stream.disconnected.is_set()
+
+    assert stream.can_replay(1)
+    assert not stream.can_replay(2)
+    replay = stream.replay(1)
+    replay_task = asyncio.create_task(anext(replay))
+    await asyncio.sleep(0.1)
+    resumed.set()
+    assert await replay_task == b"id: 2\ndata: second\n\n"
+    assert [frame async for frame in replay] == [
+        b"id: 3\ndata: third\n\n",
+        b"data: [DONE]\n\n",
+    ]
+    await task
+    assert not aborted.is_set()
+
+    # The oldest frame was evicted from the ring buffer.
+    assert stream.can_replay(1)
+    assert not stream.can_replay(0)
+
+
+@pytest.mark.asyncio
+async def test_abort_without_resume():
+    """The chat is aborted when no client re-attaches in time."""
+    aborted = asyncio.Event()
+    abort_controller = AbortController()
+    stream = EventStreamContextManager(
+        EventStreamConfig(coalesce=False, resume_timeout=0.1, event_ids=True)
+    )
+
+    async def producer() -> None:
+        async with (
+            abort_controller.abort_signal("chat", aborted.set),
+            stream,
+        ):
+            with stream.abort_on_disconnect(abort_controller, "chat"):
+                await stream.write("first")
+                await aborted.wait()
+
+    task = asyncio.create_task(producer())
+    generator = stream._generate()
+    assert await anext(generator) == b"id: 1\ndata: first\n\n"
+    await generator.aclose()
+    await asyncio.wait_for(task, 1)
+    assert aborted.is_set()
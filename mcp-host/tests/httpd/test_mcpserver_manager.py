@@ -278,6 +278,7 @@ def test_mcp_server_config_validation():
                 "Authorization": "bearer token"
             },
             "url": "http://localhost:8080/sse",
+            "keepAlive": 15,
             "args": [
                 "-y",
                 "@someone/some-package"
@@ -313,3 +314,7 @@ def test_mcp_server_config_validation():
         "@someone/some-package",
     ]
     assert config.mcp_servers["yt-dlp"].env == {"NODE_ENV": "production"}
+    assert config.mcp_servers["yt-dlp"].keep_alive == 15
+    assert config.mcp_servers["filesystem"].keep_alive is None
+    with pytest.raises(ValueError, match="keepAlive"):
+        MCPServerConfig(command="npx", keepAlive=-1)
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from dive_mcp_host.host.conf.llm import LLMConfig
+from dive_mcp_host.httpd.title_service import TitleService, heuristic_title
+from dive_mcp_host.models.fake import FakeMessageToolModel
+
+
+def test_heuristic_title():
+    """Test the heuristic title."""
+    assert heuristic_title("  How do I\nparse JSON in Python? ") == (
+        "How do I parse JSON in"
+    )
+    assert heuristic_title("What is MCP?") == "What is MCP"
+    assert len(heuristic_title("a" * 100)) == 50
+    assert heuristic_title(" ? ") == "New Chat"
+
+
+@pytest.mark.asyncio
+async def test_title_model():
+    """The title model is used when configured, the chat model otherwise."""
+    config: LLMConfig | None = None
+    service = TitleService(lambda: config)
+    chat_model = FakeMessageToolModel(
+        responses=[AIMessage(content="<think>hmm</think> Chat Model")]
+    )
+
+    assert await service.generate("Hello", chat_model) == "Chat Model"
+    assert len(chat_model.query_history) == 2
+
+    config = LLMConfig(model_provider="dive", model="fake")
+    assert await service.generate("Hello", chat_model) == "I am a fake model."
+    assert len(chat_model.query_history) == 2
+
+
+@pytest.mark.asyncio
+async def test_saturated_pool():
+    """Titles fall back to the heuristic when all workers are busy."""
+    service = TitleService(lambda: None, max_workers=1)
+    model = FakeMessageToolModel(responses=[AIMessage(content="Slow Title")])
+    slow = asyncio.create_task(
+        service.generate("first query", model.model_copy(update={"sleep": 0.2}))
+    )
+    await asyncio.sleep(0.05)
+    assert await service.generate("second query", model) == "second query"
+    assert await slow == "Slow Title"
@@ -1,7 +1,42 @@
+import asyncio
+from typing import Any
+from unittest.mock import patch
+
 import pytest
-from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_anthropic import ChatAnthropic
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.runnables import RunnableBinding
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import InMemorySaver
+from pydantic import SecretStr
 
-from dive_mcp_host.host.agents.chat_agent import ChatAgentFactory, complete_tool_calls
+from dive_mcp_host.host.agents.chat_agent import (
+    ChatAgentFactory,
+    InterruptableModel,
+    complete_tool_calls,
+)
+from dive_mcp_host.host.agents.compaction import SUMMARY_HEADER, compaction_boundary
+from dive_mcp_host.host.agents.prompt_cache import (
+    CACHE_CONTROL,
+    cache_prefix_runnable,
+    mark_system_prefix,
+)
+from dive_mcp_host.host.agents.token_count import (
+    messages_tokens,
+    trim_boundary,
+    trim_by_tokens,
+)
+from dive_mcp_host.host.tools.tool_index import ToolIndex
 from dive_mcp_host.models.fake import FakeMessageToolModel
 
 
@@ -50,6 +85,22 @@ async def test_chat_agent(agent: ChatAgentFactory):
     assert end_state["messages"][-1].content == "I am a fake model."
 
 
+@pytest.mark.asyncio
+async def test_create_agent_prompt():
+    """The agents of a factory keep their own prompts."""
+    model = FakeMessageToolModel()
+    agent = ChatAgentFactory(model=model, tools=[])
+    graph_1 = agent.create_agent(prompt="Prompt 1")
+    graph_2 = agent.create_agent(prompt="Prompt 2")
+    for graph, prompt in [(graph_1, "Prompt 1"), (graph_2, "Prompt 2")]:
+        model.query_history = []
+        await graph.ainvoke(
+            agent.create_initial_state(query="Hello"),
+            agent.create_config(user_id="default", thread_id=prompt),
+        )
+        assert model.query_history[0].content == prompt
+
+
 def test_complete_tool_calls():
     """Test the complete_tool_calls function."""
     messages = [
@@ -72,3 +123,457 @@ def test_complete_tool_calls():
         if isinstance(message, ToolMessage)
     }
     assert tool_message_ids == {"tool-1", "tool-2"}
+
+
+@pytest.mark.asyncio
+async def test_bind_tools_once():
+    """The tools are converted once and reused by every step and chat."""
+
+    @tool
+    def echo(text: str) -> str:
+        """Echo the text."""
+        return text
+
+    model = FakeMessageToolModel(
+        responses=[
+            AIMessage(
+                content="",
+                tool_calls=[{"id": "call-1", "name": "echo", "args": {"text": "a"}}],
+            ),
+            AIMessage(content="done"),
+        ]
+    )
+    agent = ChatAgentFactory(model=model, tools=[echo])
+    graph = agent.create_agent(prompt="you are a helpful assistant")
+    with patch.object(
+        FakeMessageToolModel,
+        "bind_tools",
+        autospec=True,
+        side_effect=FakeMessageToolModel.bind_tools,
+    ) as bind_tools:
+        for thread_id in ["1", "2"]:
+            model.i = 0
+            end_state = await graph.ainvoke(
+                agent.create_initial_state(query="Hello"),
+                agent.create_config(user_id="default", thread_id=thread_id),
+            )
+            assert end_state["messages"][-1].content == "done"
+    assert bind_tools.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_interruptable_model_abort():
+    """Test aborting the stream while the model is waiting for the next chunk."""
+    closed = asyncio.Event()
+    delay = 0.0
+
+    async def slow_stream(*_args: Any, **_kwargs: Any):
+        try:
+            for i in range(3):
+                yield ChatGenerationChunk(
+                    message=AIMessageChunk(content=str(i), id="1")
+                )
+            await asyncio.sleep(delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content="late", id="1"))
+        finally:
+            closed.set()
+
+    abort_signal = asyncio.Event()
+    model = InterruptableModel(model=FakeMessageToolModel(), abort_signal=abort_signal)
+    with patch.object(FakeMessageToolModel, "_astream", slow_stream):
+        chunks = [i async for i in model._astream([])]
+        assert [i.message.content for i in chunks] == ["0", "1", "2", "late"]
+
+        delay = 10
+
+        contents = []
+        async with asyncio.timeout(2):
+            async for chunk in model._astream([]):
+                contents.append(chunk.message.content)
+                if len(contents) == 2:
+                    asyncio.get_running_loop().call_later(0.1, abort_signal.set)
+
+    assert contents == ["0", "1", "2", "<user_aborted>"]
+    assert closed.is_set()
+    task = asyncio.current_task()
+    assert task
+    assert task.cancelling() == 0
+
+
+@pytest.mark.asyncio
+async def test_interruptable_model_abort_provider_error():
+    """Test aborting a model which turns the cancellation into its own error."""
+
+    async def slow_stream(*_args: Any, **_kwargs: Any):
+        yield ChatGenerationChunk(message=AIMessageChunk(content="0", id="1"))
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            raise RuntimeError("stream closed") from None
+        yield ChatGenerationChunk(message=AIMessageChunk(content="late", id="1"))
+
+    abort_signal = asyncio.Event()
+    model = InterruptableModel(model=FakeMessageToolModel(), abort_signal=abort_signal)
+    with patch.object(FakeMessageToolModel, "_astream", slow_stream):
+        contents = []
+        async with asyncio.timeout(2):
+            async for chunk in model._astream([]):
+                contents.append(chunk.message.content)
+                asyncio.get_running_loop().call_later(0.1, abort_signal.set)
+
+    assert contents == ["0", "<user_aborted>"]
+    task = asyncio.current_task()
+    assert task
+    assert task.cancelling() == 0
+
+
+@pytest.mark.asyncio
+async def test_interruptable_model_abort_and_cancel():
+    """Test a cancel arriving with the abort is not swallowed."""
+    cleanup = asyncio.Event()
+
+    async def slow_stream(*_args: Any, **_kwargs: Any):
+        yield ChatGenerationChunk(message=AIMessageChunk(content="0", id="1"))
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cleanup.set()
+            await asyncio.sleep(10)
+            raise
+
+    abort_signal = asyncio.Event()
+    model = InterruptableModel(model=FakeMessageToolModel(), abort_signal=abort_signal)
+    contents = []
+
+    async def consume() -> None:
+        async for chunk in model._astream([]):
+            contents.append(chunk.message.content)
+            asyncio.get_running_loop().call_later(0.1, abort_signal.set)
+
+    with patch.object(FakeMessageToolModel, "_astream", slow_stream):
+        consumer = asyncio.create_task(consume())
+        async with asyncio.timeout(2):
+            await cleanup.wait()
+        consumer.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await consumer
+
+    assert contents == ["0"]
+
+
+def test_trim_by_tokens():
+    """Test trimming with cached token counts matches trim_messages."""
+    messages: list[BaseMessage] = []
+    for i in range(50):
+        messages.append(HumanMessage(content="question " * (i % 7), id=f"h{i}"))
+        messages.append(AIMessage(content="answer " * (i % 5), id=f"a{i}"))
+
+    for max_tokens in (0, 10, 100, 333, 10000):
+        kept = trim_messages(
+            messages, max_tokens=max_tokens, token_counter=count_tokens_approximately
+        )
+        removed = trim_by_tokens(messages, max_tokens)
+        assert [m.id for m in removed] == [m.id for m in messages[: -len(kept) or None]]
+        assert messages_tokens(kept) == count_tokens_approximately(kept)
+
+    # the counts are cached outside of the messages
+    assert all(m.response_metadata == {} for m in messages)
+    with patch(
+        "dive_mcp_host.host.agents.token_count.count_tokens_approximately",
+        wraps=count_tokens_approximately,
+    ) as counter:
+        trim_by_tokens(messages, 100)
+        counter.assert_not_called()
+
+        # only the new messages are counted, after older ones are trimmed
+        messages = [
+            *messages[10:],
+            HumanMessage(content="question", id="h50"),
+            AIMessage(content="answer", id="a50"),
+        ]
+        kept = trim_messages(
+            messages, max_tokens=333, token_counter=count_tokens_approximately
+        )
+        counter.reset_mock()
+        removed = trim_by_tokens(messages, 333)
+        assert counter.call_count == 2
+        assert [m.id for m in removed] == [m.id for m in messages[: -len(kept)]]
+
+        # a message replaced with the same id is counted again
+        messages[-1] = AIMessage(content="a longer answer", id="a50")
+        counter.reset_mock()
+        trim_by_tokens(messages, 333)
+        assert counter.call_count == 1
+
+    # an older message replaced with the same length of content
+    messages[-5] = AIMessage(
+        content=[{"type": "text", "text": "x" * 300}], id=messages[-5].id
+    )
+    messages[-3] = AIMessage(
+        content="?" * len(str(messages[-3].content)), id=messages[-3].id
+    )
+    kept = trim_messages(
+        messages, max_tokens=333, token_counter=count_tokens_approximately
+    )
+    removed = trim_by_tokens(messages, 333)
+    assert [m.id for m in removed] == [m.id for m in messages[: -len(kept)]]
+
+
+@pytest.mark.asyncio
+async def test_summary_compaction():
+    """Test older messages are folded into a summary kept in the checkpoint."""
+    model = FakeMessageToolModel(responses=[AIMessage(content="short reply " * 5)])
+    agent = ChatAgentFactory(model=model, tools=[])
+    graph = agent.create_agent(
+        prompt="you are a helpful assistant", checkpointer=InMemorySaver()
+    )
+    config = agent.create_config(
+        user_id="default",
+        thread_id="summary",
+        max_input_tokens=200,
+        oversize_policy="summary",
+    )
+
+    sizes = []
+    for i in range(20):
+        state = agent.create_initial_state(query=f"question {i} " * 10)
+        end_state = await graph.ainvoke(state, config)
+        sizes.append(messages_tokens(end_state["messages"]))
+
+    assert end_state["summary"] == "short reply " * 5
+    assert end_state["messages"][-2].content == "question 19 " * 10
+    assert len(end_state["messages"]) < 20
+    # bounded by max_input_tokens, plus the reply of the last step
+    assert max(sizes) < 200 + 30
+
+    # the summary is sent to the model in front of the history
+    prompt = model.query_history[-len(end_state["messages"]) :]
+    assert prompt[0].content.startswith(SUMMARY_HEADER)
+
+
+def test_compaction_boundary_keeps_tool_results():
+    """Test the compaction doesn't split a tool call from its results."""
+    messages: list[BaseMessage] = [
+        HumanMessage(content="q" * 400, id="h0"),
+        AIMessage(
+            content="",
+            id="a0",
+            tool_calls=[{"id": "call-1", "name": "foo", "args": {}}],
+        ),
+        ToolMessage(content="r" * 40, tool_call_id="call-1", id="t0"),
+        AIMessage(content="done", id="a1"),
+        HumanMessage(content="next", id="h1"),
+    ]
+    assert compaction_boundary(messages, 1000) == 0
+    # the tool result fits, but the tool call doesn't, both are kept
+    assert trim_boundary(messages, 30) == 2
+    assert compaction_boundary(messages, 60) == 1
+
+
+def test_compaction_boundary_keeps_current_turn():
+    """Test the compaction keeps the turn in progress with its tool calls."""
+    messages: list[BaseMessage] = [
+        HumanMessage(content="hi", id="h0"),
+        AIMessage(content="hello", id="a0"),
+        HumanMessage(content="read the files", id="h1"),
+        AIMessage(
+            content="",
+            id="a1",
+            tool_calls=[
+                {"id": "call-1", "name": "foo", "args": {}},
+                {"id": "call-2", "name": "foo", "args": {}},
+            ],
+        ),
+        ToolMessage(content="x" * 2000, tool_call_id="call-1", id="t1"),
+        ToolMessage(content="y" * 2000, tool_call_id="call-2", id="t2"),
+    ]
+    for max_tokens in (300, 600):
+        # only the last tool result fits
+        assert trim_boundary(messages, max_tokens // 2) >= 4
+        assert compaction_boundary(messages, max_tokens) == 2
+
+
+def test_prompt_cache_markers():
+    """Test the cache markers for the providers needing them."""
+    messages: list[BaseMessage] = [
+        SystemMessage(content="tools"),
+        SystemMessage(content=[{"type": "text", "text": "system prompt"}]),
+        HumanMessage(content="hi"),
+    ]
+    marked = cache_prefix_runnable("ChatAnthropic").invoke(messages)
+    assert marked[0] is messages[0]
+    assert marked[1].content == [
+        {"type": "text", "text": "system prompt", "cache_control": CACHE_CONTROL}
+    ]
+    assert marked[2] is messages[2]
+    # the original messages are unchanged
+    assert "cache_control" not in messages[1].content[0]  # type: ignore
+    assert mark_system_prefix(messages[2:]) == messages[2:]
+    assert cache_prefix_runnable("ChatOpenAI").invoke(messages) == messages
+
+    agent = ChatAgentFactory(
+        model=ChatAnthropic(model="claude-sonnet-4-5", api_key=SecretStr("x")),  # type: ignore
+        tools=[],
+    )
+    model = agent._bind_cache_control(agent._model)
+    assert isinstance(model, RunnableBinding)
+    assert model.kwargs == {"cache_control": CACHE_CONTROL}
+    agent = ChatAgentFactory(model=FakeMessageToolModel(), tools=[])
+    assert agent._bind_cache_control(agent._model) is agent._model
+
+
+@pytest.mark.asyncio
+async def test_select_tools():
+    """Test only the relevant and the called tools are bound to the model."""
+
+    @tool
+    def get_weather(city: str) -> str:
+        """Get the weather forecast of a city."""
+        return city
+
+    @tool
+    def send_email(to: str) -> str:
+        """Send an email to someone."""
+        return to
+
+    @tool
+    def read_file(path: str) -> str:
+        """Read a file from the disk."""
+        return path
+
+    class _Embeddings(Embeddings):
+        def embed_documents(self, texts: list[str]) -> list[list[float]]:
+            return [self.embed_query(t) for t in texts]
+
+        def embed_query(self, text: str) -> list[float]:
+            return [float(text.count(k)) + 0.01 for k in ("weather", "email", "file")]
+
+    index = ToolIndex(_Embeddings(), top_k=1)
+    agent = ChatAgentFactory(
+        model=FakeMessageToolModel(), tools=[get_weather, send_email, read_file]
+    )
+    messages: list[BaseMessage] = [
+        HumanMessage(content="send an email to Bob"),
+        AIMessage(
+            content="", tool_calls=[{"id": "1", "name": "read_file", "args": {}}]
+        ),
+        ToolMessage(content="Bob's address", tool_call_id="1"),
+    ]
+    selected = await agent._select_tools(messages, index)
+    assert selected is not None
+    assert [t.name for t in selected] == ["send_email", "read_file"]
+    assert await agent._select_tools(messages, None) is None
+
+    bound = agent._bind_tools(agent._model, selected)
+    assert isinstance(bound, RunnableBinding)
+    assert [t["function"]["name"] for t in bound.kwargs["tools"]] == [
+        "send_email",
+        "read_file",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_tools_in_prompt_streaming_tool_calls():
+    """Test tool calls in the content start before the model finishes."""
+    events: list[str] = []
+
+    @tool
+    async def echo(text: str) -> str:
+        """Echo the text."""
+        events.append("tool")
+        return text
+
+    content = (
+        "Checking <tool_call><name>echo</name>"
+        '<arguments>{"text": "hi"}</arguments></tool_call>'
+        " then some more words from the model"
+    )
+    model = FakeMessageToolModel(
+        responses=[AIMessage(content=content), AIMessage(content="done")],
+        sleep=0.02,
+        disable_streaming=False,
+    )
+    agent = ChatAgentFactory(model=model, tools=[echo], tools_in_prompt=True)
+    graph = agent.create_agent(
+        prompt=agent.create_prompt(system_prompt="you are a helpful assistant")
+    )
+    state: dict = {}
+    async for mode, data in graph.astream(
+        agent.create_initial_state(query="Hello"),
+        agent.create_config(user_id="default", thread_id="1"),
+        stream_mode=["messages", "values"],
+    ):
+        if mode == "values":
+            state = data
+        elif isinstance(data[0], AIMessageChunk):
+            events.append(data[0].text)
+
+    # the tool ran once, while the rest of the response was streamed
+    assert events.count("tool") == 1
+    first_reply = events[: events.index("done")]
+    assert "tool" in first_reply[:-1]
+    assert "".join(e for e in first_reply if e != "tool") == (
+        "Checking  then some more words from the model"
+    )
+    assert agent._prefetched == {}
+
+    _, ai_message, tool_message, _ = state["messages"]
+    assert ai_message.tool_calls[0]["args"] == {"text": "hi"}
+    assert tool_message.tool_call_id == ai_message.tool_calls[0]["id"]
+    assert tool_message.content == "hi"
+
+
+@pytest.mark.asyncio
+async def test_tools_in_prompt_streaming_tool_call_failed():
+    """Test a started tool call that failed is not run again."""
+    calls: list[str] = []
+
+    @tool
+    async def send(text: str) -> str:
+        """Send the text."""
+        calls.append(text)
+        raise ValueError("send failed")
+
+    content = (
+        "<tool_call><name>send</name>"
+        '<arguments>{"text": "hi"}</arguments></tool_call>'
+        " then some more words from the model"
+    )
+    model = FakeMessageToolModel(
+        responses=[AIMessage(content=content), AIMessage(content="done")],
+        sleep=0.02,
+        disable_streaming=False,
+    )
+    agent = ChatAgentFactory(model=model, tools=[send], tools_in_prompt=True)
+    graph = agent.create_agent(
+        prompt=agent.create_prompt(system_prompt="you are a helpful assistant")
+    )
+    # the error is raised by the tools node as for a call not started
+    with pytest.raises(ValueError, match="send failed"):
+        await graph.ainvoke(
+            agent.create_initial_state(query="Hello"),
+            agent.create_config(user_id="default", thread_id="1"),
+        )
+
+    assert calls == ["hi"]
+    assert agent._prefetched == {}
+
+
+@pytest.mark.asyncio
+async def test_tools_in_prompt_cancel_thread_prefetched():
+    """Test the started tool calls left by a run are cancelled."""
+    agent = ChatAgentFactory(
+        model=FakeMessageToolModel(), tools=[], tools_in_prompt=True
+    )
+    left = asyncio.create_task(asyncio.sleep(10))
+    other = asyncio.create_task(asyncio.sleep(10))
+    agent._prefetched = {"1": ("thread", left), "2": ("other", other)}
+
+    agent._cancel_thread_prefetched(
+        agent.create_config(user_id="default", thread_id="thread")
+    )
+    await asyncio.sleep(0)
+    assert left.cancelled()
+    assert not other.done()
+    assert list(agent._prefetched) == ["2"]
+    other.cancel()
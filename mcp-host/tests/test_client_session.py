@@ -0,0 +1,52 @@
+"""Tests for the client session of the MCP servers."""
+
+import asyncio
+from typing import Any
+
+import anyio
+import pytest
+from mcp.shared.message import SessionMessage
+from mcp.types import (
+    EmptyResult,
+    ErrorData,
+    JSONRPCError,
+    JSONRPCMessage,
+    JSONRPCRequest,
+    JSONRPCResponse,
+)
+
+from dive_mcp_host.host.tools.hack import ClientSession
+
+
+@pytest.mark.asyncio
+async def test_late_response() -> None:
+    """Test the late responses are dropped and the session is still usable."""
+    client_send, server_read = anyio.create_memory_object_stream[SessionMessage](10)
+    server_send, client_read = anyio.create_memory_object_stream[
+        SessionMessage | Exception
+    ](10)
+    messages: list[Any] = []
+
+    async def message_handler(message: Any) -> None:
+        messages.append(message)
+
+    async def respond(message: JSONRPCResponse | JSONRPCError) -> None:
+        await server_send.send(SessionMessage(JSONRPCMessage(message)))
+
+    async with ClientSession(
+        client_read, client_send, message_handler=message_handler
+    ) as session:
+        await respond(JSONRPCResponse(jsonrpc="2.0", id=100, result={}))
+        await respond(
+            JSONRPCError(
+                jsonrpc="2.0", id=101, error=ErrorData(code=-1, message="cancelled")
+            )
+        )
+
+        ping = asyncio.create_task(session.send_ping())
+        request = (await server_read.receive()).message.root
+        assert isinstance(request, JSONRPCRequest)
+        await respond(JSONRPCResponse(jsonrpc="2.0", id=request.id, result={}))
+        assert isinstance(await ping, EmptyResult)
+
+    assert messages == []
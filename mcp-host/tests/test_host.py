@@ -20,7 +20,7 @@ from langchain_core.messages import (
 from langgraph.checkpoint.memory import InMemorySaver
 from pydantic import AnyUrl, SecretStr
 
-from dive_mcp_host.host.chat import Chat
+from dive_mcp_host.host.chat import Chat, MessageChunkHolder
 from dive_mcp_host.host.conf import CheckpointerConfig, HostConfig
 from dive_mcp_host.host.conf.llm import LLMConfig
 from dive_mcp_host.host.custom_events import (
@@ -243,6 +243,36 @@ async def test_callable_system_prompt() -> None:
         assert mock_system_prompt.call_count == 1
 
 
+@pytest.mark.asyncio
+async def test_agent_factory_cache() -> None:
+    """Chats share the agent factory until the tools are reloaded."""
+    config = HostConfig(
+        llm=LLMConfig(
+            model="fake",
+            model_provider="dive",
+        ),
+        mcp_servers={},
+    )
+    async with DiveMcpHost(config) as mcp_host:
+        model = cast("FakeMessageToolModel", mcp_host.model)
+        chat_1 = mcp_host.chat(system_prompt="Prompt 1", volatile=True)
+        chat_2 = mcp_host.chat(system_prompt="Prompt 2", volatile=True)
+        assert chat_1._agent_factory is chat_2._agent_factory
+        assert mcp_host.chat(tools_in_prompt=True)._agent_factory is not (
+            chat_1._agent_factory
+        )
+
+        for chat, prompt in [(chat_1, "Prompt 1"), (chat_2, "Prompt 2")]:
+            model.query_history = []
+            async with chat:
+                async for _ in chat.query("Hello"):
+                    ...
+            assert model.query_history[0].content == prompt
+
+        await mcp_host.reload(config, force_mcp=True)
+        assert mcp_host.chat()._agent_factory is not chat_1._agent_factory
+
+
 @pytest.mark.asyncio
 async def test_abort_chat() -> None:
     """Test that the chat can be aborted during a long-running query."""
@@ -1145,3 +1175,50 @@ async def test_oauth_required_event(
         assert has_auth_required
         assert completed_tool_call
         assert await mcp_host.oauth_manager.store.list() == ["weather"]
+
+
+def test_message_chunk_holder() -> None:
+    """Chunks are merged once the message is done, like adding them up."""
+    chunks = [
+        AIMessageChunk(
+            content="",
+            id="run-1",
+            tool_call_chunks=[
+                {"name": "echo", "args": '{"message": "', "id": "call-1", "index": 0}
+            ],
+            additional_kwargs={"reasoning_content": "Let me "},
+        ),
+        *[
+            AIMessageChunk(
+                content=f"{i} ",
+                id="run-1",
+                tool_call_chunks=[
+                    {"name": None, "args": str(i), "id": None, "index": 0}
+                ],
+                additional_kwargs={"reasoning_content": "think"},
+                usage_metadata={
+                    "input_tokens": 1,
+                    "output_tokens": 1,
+                    "total_tokens": 2,
+                },
+            )
+            for i in range(10)
+        ],
+        AIMessageChunk(
+            content="",
+            id="run-1",
+            tool_call_chunks=[{"name": None, "args": '"}', "id": None, "index": 0}],
+            response_metadata={"finish_reason": "tool_calls"},
+        ),
+    ]
+    holder = MessageChunkHolder()
+    assert holder.feed(HumanMessage(content="hi")) is not None
+    assert all(holder.feed(chunk) is None for chunk in chunks[:-1])
+    assert holder.partial_merged(chunks[0]).id == "run-1"
+
+    holder = MessageChunkHolder()
+    results = [holder.feed(chunk) for chunk in chunks]
+    merged = results[-1]
+    assert merged == sum(chunks[1:], start=chunks[0])
+    assert merged.tool_calls[0]["args"] == {"message": "0123456789"}
+    assert merged.additional_kwargs["reasoning_content"] == "Let me " + "think" * 10
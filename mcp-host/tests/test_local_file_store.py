@@ -1,10 +1,22 @@
+import asyncio
 import base64
 import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
 
 import pytest
+from langchain_core.messages import HumanMessage
 
+from dive_mcp_host.host.agents.file_in_additional_kwargs import FileMsgConverter
+from dive_mcp_host.host.errors import MediaAbortedError, MediaQueueTimeoutError
+from dive_mcp_host.host.store.attachment_cache import AttachmentCache
 from dive_mcp_host.httpd.store.cache import CacheKeys, LocalFileCache
 from dive_mcp_host.httpd.store.local import LocalStore
+from dive_mcp_host.httpd.store.manager import StoreManager
+from dive_mcp_host.httpd.store.media import MediaProcessor
+
+PNG_DATA = "iVBORw0KGgoAAAANSUhEUgAAAgAAAAABCAYAAACouxZ2AAAAFklEQVR4AWMYBaNgFIyCUTAKRsHIAwAIAQABmducEQAAAABJRU5ErkJggg=="  # noqa: E501
 
 
 @pytest.fixture
@@ -33,10 +45,133 @@ def test_local_file_cache(cleanup_cache):
 def test_local_store_get_image():
     """Test the local store get image."""
     store = LocalStore()
-    png_data = "iVBORw0KGgoAAAANSUhEUgAAAgAAAAABCAYAAACouxZ2AAAAFklEQVR4AWMYBaNgFIyCUTAKRsHIAwAIAQABmducEQAAAABJRU5ErkJggg=="  # noqa: E501
     tmpfile = tempfile.TemporaryFile()  # noqa: SIM115
-    tmpfile.write(base64.b64decode(png_data))
+    tmpfile.write(base64.b64decode(PNG_DATA))
     tmpfile.flush()
     image = store.get_image(tmpfile.name)
     assert image
     tmpfile.close()
+
+
+@pytest.mark.asyncio
+async def test_attachment_cache(tmp_path: Path):
+    """Attachments are converted once per provider."""
+    image = tmp_path / "abc-cat.png"
+    image.write_bytes(base64.b64decode(PNG_DATA))
+    copy = tmp_path / "def-cat.png"
+    copy.write_bytes(base64.b64decode(PNG_DATA))
+    store = StoreManager(
+        tmp_path, attachment_cache=AttachmentCache(cache_dir=tmp_path / "cache")
+    )
+
+    def message(path: Path) -> HumanMessage:
+        return HumanMessage(content=[], additional_kwargs={"images": [str(path)]})
+
+    with patch.object(store, "get_image", wraps=store.get_image) as get_image:
+        converter = FileMsgConverter(model_provider="ChatOllama", store=store)
+        result = await converter.process([message(image), message(copy)])
+        assert get_image.call_count == 1
+        assert result[0].content[0] == result[1].content[0]
+        assert result[0].content[0]["type"] == "image"
+        assert "def-cat.png" in result[1].content[1]["text"]
+
+        await FileMsgConverter(model_provider="ChatMistralAI", store=store).process(
+            [message(image)]
+        )
+        assert get_image.call_count == 2
+
+    # The converted blocks are persisted
+    store = StoreManager(
+        tmp_path, attachment_cache=AttachmentCache(cache_dir=tmp_path / "cache")
+    )
+    with patch.object(store, "get_image", wraps=store.get_image) as get_image:
+        converter = FileMsgConverter(model_provider="ChatOllama", store=store)
+        await converter.process([message(image)])
+        assert get_image.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_attachment_cache_eviction():
+    """The least recently used blocks are evicted over the byte budget."""
+    cache = AttachmentCache(max_bytes=50)
+    await cache.set("a", {"text": "a" * 10})
+    await cache.set("b", {"text": "b" * 10})
+    assert await cache.get("a")
+    await cache.set("c", {"text": "c" * 10})
+    assert await cache.get("a")
+    assert await cache.get("b") is None
+    assert await cache.get("c")
+    assert cache.size <= 50
+
+
+@pytest.mark.asyncio
+async def test_attachment_cache_disk_eviction(tmp_path: Path):
+    """The least recently used blocks on disk are evicted over the disk budget."""
+    cache = AttachmentCache(max_bytes=0, cache_dir=tmp_path, max_disk_bytes=50)
+    await cache.set("a", {"text": "a" * 10})
+    await cache.set("b", {"text": "b" * 10})
+    assert await cache.get("a")
+    await cache.set("c", {"text": "c" * 10})
+    assert sorted(i.stem for i in tmp_path.glob("*.json")) == ["a", "c"]
+    assert cache.disk_size <= 50
+
+    # the budget applies to the blocks persisted before a restart
+    cache = AttachmentCache(max_bytes=0, cache_dir=tmp_path, max_disk_bytes=50)
+    assert cache.disk_size == 44
+    await cache.set("d", {"text": "d" * 10})
+    assert await cache.get("a") is None
+    assert await cache.get("c")
+    assert await cache.get("d")
+
+
+@pytest.mark.asyncio
+async def test_media_processor():
+    """Transforms run in the pool with a queue limit and abort support."""
+    processor = MediaProcessor(max_workers=1, max_queue_size=2, queue_timeout=0.05)
+    release = threading.Event()
+    abort_signal = asyncio.Event()
+
+    blocked = asyncio.create_task(processor.run("block", release.wait, 1))
+    aborted = asyncio.create_task(
+        processor.run("abort", lambda: "done", abort_signal=abort_signal)
+    )
+    await asyncio.sleep(0.01)
+    assert processor.queue_depth == 2
+    with pytest.raises(MediaQueueTimeoutError):
+        await processor.run("full", lambda: None)
+
+    # waits for a slot
+    waiting = asyncio.create_task(processor.run("wait", lambda: "waited"))
+    abort_signal.set()
+    with pytest.raises(MediaAbortedError):
+        await aborted
+    release.set()
+    assert await blocked
+    assert await waiting == "waited"
+    await asyncio.sleep(0.01)
+    assert processor.queue_depth == 0
+    assert processor.stats["block"].count == 1
+    assert "abort" not in processor.stats
+    processor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_media_processor_busy(tmp_path: Path):
+    """Attachments are skipped when the media processor stays busy."""
+    image = tmp_path / "cat.png"
+    image.write_bytes(base64.b64decode(PNG_DATA))
+    processor = MediaProcessor(max_workers=1, max_queue_size=1, queue_timeout=0.05)
+    store = StoreManager(tmp_path, media_processor=processor)
+    release = threading.Event()
+    blocked = asyncio.create_task(processor.run("block", release.wait, 1))
+    await asyncio.sleep(0.01)
+
+    assert await store.get_image(image) is None
+    assert await store.get_document(str(image)) == (None, None)
+    with pytest.raises(MediaQueueTimeoutError):
+        await store.save_base64_image(PNG_DATA)
+
+    release.set()
+    assert await blocked
+    assert await store.get_image(image)
+    processor.shutdown()
@@ -0,0 +1,61 @@
+"""Tests for the stdio client of the MCP servers."""
+
+import json
+import secrets
+
+import pytest
+from langchain_core.messages import ToolCall
+
+from dive_mcp_host.host.conf import LogConfig
+from dive_mcp_host.host.errors import StdioFrameTooLargeError
+from dive_mcp_host.host.tools import ServerConfig, ToolManager
+from dive_mcp_host.host.tools.hack.stdio_server import LineFramer
+
+
+def test_line_framer() -> None:
+    """Test the messages are split at the newlines across the reads."""
+    framer = LineFramer()
+    assert framer.feed(b'{"a":') == []
+    assert framer.feed(b' 1}\n{"b": 2}\n{"c"') == [b'{"a": 1}', b'{"b": 2}']
+    assert framer.feed(b": 3}") == []
+    assert framer.feed(b"\n\n") == [b'{"c": 3}', b""]
+
+
+def test_line_framer_max_frame_size() -> None:
+    """Test a message too large is dropped up to its newline."""
+    framer = LineFramer(max_frame_size=8)
+    frames = framer.feed(b"0123456789\nok\n")
+    assert isinstance(frames[0], StdioFrameTooLargeError)
+    assert frames[1:] == [b"ok"]
+
+    # the message is dropped while it is still read
+    frames = framer.feed(b"01234")
+    assert frames == []
+    frames = framer.feed(b"56789")
+    assert len(frames) == 1
+    assert isinstance(frames[0], StdioFrameTooLargeError)
+    assert framer.feed(b"0123456789") == []
+    assert framer.feed(b"\nok\n") == [b"ok"]
+
+
+@pytest.mark.asyncio
+async def test_stdio_large_message(
+    echo_tool_stdio_config: dict[str, ServerConfig],
+    log_config: LogConfig,
+) -> None:
+    """Test a message of several megabytes goes through the stdio client."""
+    message = secrets.token_urlsafe(3 * 1024 * 1024)
+    async with ToolManager(echo_tool_stdio_config, log_config) as tool_manager:
+        await tool_manager.initialized_event.wait()
+        tools = tool_manager.langchain_tools()
+        echo_tool = next((t for t in tools if t.name == "echo"), None)
+        assert echo_tool is not None
+        result = await echo_tool.ainvoke(
+            ToolCall(
+                name="echo",
+                id="large",
+                args={"message": message},
+                type="tool_call",
+            ),
+        )
+        assert json.loads(str(result.content))[0]["text"] == message
@@ -1,6 +1,9 @@
 from langchain_core.messages import AIMessage
 
-from dive_mcp_host.host.agents.tools_in_prompt import extract_tool_calls
+from dive_mcp_host.host.agents.tools_in_prompt import (
+    ToolCallStreamParser,
+    extract_tool_calls,
+)
 
 
 def test_extract_tool_calls_with_json_format():
@@ -198,3 +201,41 @@ def test_extract_tool_calls_with_multiline_json():
             "sort": [{"specs.technical_specs.power_consumption": "asc"}],
         },
     }
+
+
+def test_tool_call_stream_parser():
+    """Test the tool calls are found while the content is streamed."""
+    content = (
+        "Let me check. <tool_call>\n<name>echo</name>\n"
+        '<arguments>{"message": "a<b"}</arguments>\n</tool_call>'
+        " and <tool_call><name>bad</name><arguments>{</arguments></tool_call>"
+        " done <tool"
+    )
+    for size in (1, 3, 7, len(content)):
+        parser = ToolCallStreamParser()
+        visible = []
+        tool_calls = []
+        for i in range(0, len(content), size):
+            text, calls = parser.feed(content[i : i + size])
+            assert "<tool_call>" not in text or "bad" in text
+            visible.append(text)
+            tool_calls.extend(calls)
+        visible.append(parser.flush())
+
+        assert "".join(visible) == (
+            "Let me check.  and "
+            "<tool_call><name>bad</name><arguments>{</arguments></tool_call>"
+            " done <tool"
+        )
+        assert len(tool_calls) == 1
+        assert tool_calls[0]["name"] == "echo"
+        assert tool_calls[0]["args"] == {"message": "a<b"}
+
+
+def test_tool_call_stream_parser_holds_partial_tag():
+    """Test text that may start a tool call is held back until it's known."""
+    parser = ToolCallStreamParser()
+    assert parser.feed("hello <to") == ("hello ", [])
+    assert parser.feed("day") == ("<today", [])
+    assert parser.feed("<tool_call><name>x</name>") == ("", [])
+    assert parser.flush() == "<tool_call><name>x</name>"
@@ -1,8 +1,10 @@
 import asyncio
 import json
 import logging
+import os
 import random
 import secrets
+import signal
 from copy import deepcopy
 from typing import TYPE_CHECKING, Any, cast
 from unittest.mock import patch
@@ -10,19 +12,46 @@ from uuid import UUID
 
 import pytest
 from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.embeddings import Embeddings
 from langchain_core.messages import AIMessage, HumanMessage, ToolCall, ToolMessage
-from langchain_core.tools import tool
-from mcp.types import Tool
-
-from dive_mcp_host.host.conf import HostConfig, LogConfig, ProxyUrl
+from langchain_core.tools import BaseTool, tool
+from mcp.types import (
+    CallToolResult,
+    ElicitRequestFormParams,
+    TextContent,
+    Tool,
+    ToolAnnotations,
+)
+from pydantic import ValidationError
+
+from dive_mcp_host.host.conf import (
+    HostConfig,
+    LogConfig,
+    ProxyUrl,
+    ReplicaConfig,
+    SessionPoolConfig,
+)
 from dive_mcp_host.host.conf.llm import LLMConfig
+from dive_mcp_host.host.errors import ToolCallQueueTimeoutError
 from dive_mcp_host.host.host import DiveMcpHost
 from dive_mcp_host.host.tools import McpServer, McpServerInfo, ServerConfig, ToolManager
+from dive_mcp_host.host.tools.call_scheduler import ToolCallScheduler
 from dive_mcp_host.host.tools.elicitation_manager import ElicitationManager
+from dive_mcp_host.host.tools.elicitation_router import (
+    RELATED_REQUEST_ID,
+    ElicitationRouter,
+)
+from dive_mcp_host.host.tools.log import LogEvent, LogMsg
 from dive_mcp_host.host.tools.mcp_server import McpTool
 from dive_mcp_host.host.tools.model_types import ClientState
 from dive_mcp_host.host.tools.oauth import OAuthManager
 from dive_mcp_host.host.tools.plugin import ToolManagerPlugin
+from dive_mcp_host.host.tools.result_cache import ToolResultCache, cache_key
+from dive_mcp_host.host.tools.server_session_store import (
+    MAX_IDLE_TIME,
+    _SessionStoreItem,
+)
+from dive_mcp_host.host.tools.tool_index import ToolIndex
 
 if TYPE_CHECKING:
     from dive_mcp_host.models.fake import FakeMessageToolModel
@@ -493,6 +522,7 @@ async def test_stdio_mcp_tool_exception_handling(
     ) as server:
         server.RESTART_INTERVAL = 0.1
         tools = server.mcp_tools
+        tools_generation = server.tools_generation
         session = server._stdio_client_session
         with patch("dive_mcp_host.host.tools.hack.ClientSession.call_tool") as mocked:
             mocked.side_effect = RuntimeError("test")
@@ -522,6 +552,8 @@ async def test_stdio_mcp_tool_exception_handling(
         # session should be created
         assert server._session_store["default"]
         session = server._session_store["default"]
+        # the new process listed the tools again
+        assert server.tools_generation > tools_generation
 
         await server.wait([ClientState.RUNNING])
         await tools[0].ainvoke(
@@ -1419,3 +1451,531 @@ async def test_cancel_stdio(
             content = json.loads(str(result.content))
             assert "<user_aborted>" in content[0]["text"]
             await asyncio.sleep(5)
+
+
+@pytest.mark.asyncio
+async def test_call_scheduler() -> None:
+    """Test the concurrency limit and the round robin between chats."""
+    scheduler = ToolCallScheduler("test", max_concurrent_calls=2)
+    order: list[str] = []
+    release = asyncio.Event()
+
+    async def call(chat_id: str, name: str) -> None:
+        async with scheduler.slot(chat_id):
+            order.append(name)
+            await release.wait()
+
+    tasks = [asyncio.create_task(call("chat_a", f"a{i}")) for i in range(4)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(call("chat_b", "b0")))
+    await asyncio.sleep(0.01)
+    assert scheduler.running == 2
+    assert scheduler.queued == 3
+    assert order == ["a0", "a1"]
+
+    release.set()
+    await asyncio.gather(*tasks)
+    # chat_b doesn't wait behind all calls of chat_a
+    assert order == ["a0", "a1", "a2", "b0", "a3"]
+    assert scheduler.running == 0
+    assert scheduler.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_call_scheduler_timeout_and_abort() -> None:
+    """Test the queue timeout and the abort signal of queued calls."""
+    scheduler = ToolCallScheduler("test", max_concurrent_calls=1, queue_timeout=0.1)
+    async with scheduler.slot("chat_a") as wait:
+        assert wait == 0
+        with pytest.raises(ToolCallQueueTimeoutError):
+            async with scheduler.slot("chat_b"):
+                pass
+
+        abort_signal = asyncio.Event()
+        abort_signal.set()
+        with pytest.raises(asyncio.CancelledError):
+            async with scheduler.slot("chat_b", abort_signal):
+                pass
+        assert scheduler.queued == 0
+
+    async with scheduler.slot("chat_b") as wait:
+        assert scheduler.running == 1
+    assert scheduler.running == 0
+
+
+@pytest.mark.asyncio
+async def test_tool_max_concurrent_calls(
+    echo_tool_stdio_config: dict[str, ServerConfig],
+    log_config: LogConfig,
+) -> None:
+    """Test the tool calls beyond the limit of the server are queued."""
+    echo_tool_stdio_config["echo"].max_concurrent_calls = 1
+    echo_tool_stdio_config["echo"].call_queue_timeout = 0.5
+    async with ToolManager(echo_tool_stdio_config, log_config) as tool_manager:
+        await tool_manager.initialized_event.wait()
+        tools = tool_manager.langchain_tools()
+        echo_tool = next((t for t in tools if t.name == "echo"), None)
+        assert echo_tool is not None
+
+        async def call_echo(delay_ms: int) -> ToolMessage:
+            return await echo_tool.ainvoke(
+                ToolCall(
+                    name="echo",
+                    id=str(random.randint(1, 1000000)),  # noqa: S311
+                    args={"message": "hihi", "delay_ms": delay_ms},
+                    type="tool_call",
+                ),
+            )
+
+        slow = asyncio.create_task(call_echo(2000))
+        await asyncio.sleep(0.2)
+        busy = await call_echo(0)
+        assert "is busy" in str(busy.content)
+        result = await slow
+        assert json.loads(str(result.content))[0]["text"] == "hihi"
+        result = await call_echo(0)
+        assert json.loads(str(result.content))[0]["text"] == "hihi"
+
+
+def test_tool_result_cache() -> None:
+    """Test the expiry and the byte budget of the tool result cache."""
+
+    def text_result(text: str) -> CallToolResult:
+        return CallToolResult(content=[TextContent(type="text", text=text)])
+
+    assert cache_key("t", {"a": 1, "b": [1, 2]}) == cache_key(
+        "t", {"b": [1, 2], "a": 1}
+    )
+    assert cache_key("t", {"a": 1}) != cache_key("u", {"a": 1})
+
+    disabled = ToolResultCache("echo", ttl=None, max_bytes=1000)
+    disabled.put("t", {}, text_result("a"))
+    assert disabled.get("t", {}) is None
+
+    cache = ToolResultCache("echo", ttl=60, max_bytes=700)
+    cache.put("t", {"q": 1}, text_result("a" * 100))
+    cache.put("t", {"q": 2}, text_result("b" * 100))
+    cache.put("t", {"q": 3}, CallToolResult(content=[], isError=True))
+    assert len(cache) == 2
+    assert cache.get("t", {"q": 1}) is not None
+    # over the budget, the least recently used result is dropped
+    cache.put("t", {"q": 4}, text_result("c" * 100))
+    assert cache.get("t", {"q": 2}) is None
+    assert cache.get("t", {"q": 1}) is not None
+    assert cache.size <= 700
+    cache.put("t", {"q": 5}, text_result("d" * 1000))
+    assert cache.get("t", {"q": 5}) is None
+
+    with patch("dive_mcp_host.host.tools.result_cache.time.monotonic") as monotonic:
+        monotonic.return_value = 1e12
+        assert cache.get("t", {"q": 1}) is None
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+@pytest.mark.asyncio
+async def test_tool_result_cache_read_only(
+    echo_tool_stdio_config: dict[str, ServerConfig],
+    log_config: LogConfig,
+) -> None:
+    """Test the results of the read-only tools are cached until a restart."""
+    echo_tool_stdio_config["echo"].result_cache_ttl = 60
+    async with ToolManager(echo_tool_stdio_config, log_config) as tool_manager:
+        await tool_manager.initialized_event.wait()
+        echo_tool = next(t for t in tool_manager.langchain_tools() if t.name == "echo")
+        assert isinstance(echo_tool, McpTool)
+        server = echo_tool.mcp_server
+
+        async def call_echo(message: str) -> str:
+            result = await echo_tool.ainvoke(
+                ToolCall(
+                    name="echo",
+                    id=str(random.randint(1, 1000000)),  # noqa: S311
+                    args={"message": message, "delay_ms": 0},
+                    type="tool_call",
+                ),
+            )
+            return json.loads(str(result.content))[0]["text"]
+
+        # not hinted as read-only, bypass the cache
+        assert await call_echo("hihi") == "hihi"
+        assert len(server.result_cache) == 0
+
+        echo_tool.annotations = ToolAnnotations(readOnlyHint=True)
+        assert await call_echo("hihi") == "hihi"
+        assert len(server.result_cache) == 1
+        with patch.object(server, "session") as session:
+            assert await call_echo("hihi") == "hihi"
+            session.assert_not_called()
+
+        await tool_manager.restart_mcp_server("echo")
+        assert len(server.result_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_session_keep_alive() -> None:
+    """Test only quiet sessions are pinged by the keep-alive."""
+    pings = 0
+
+    class _Session:
+        async def send_ping(self) -> None:
+            nonlocal pings
+            pings += 1
+
+    item = _SessionStoreItem(chat_id="default", keep_alive=0.2)
+    item.session = cast(Any, _Session())
+    loop = asyncio.create_task(item.waiting_loop())
+    try:
+        # a running call is traffic, no ping
+        item.add_task(loop)
+        await asyncio.sleep(0.3)
+        assert pings == 0
+        item.remove_task(loop)
+        # the call just ended, the next check skips the ping
+        await asyncio.sleep(0.15)
+        assert pings == 0
+        await asyncio.sleep(0.3)
+        assert pings == 1
+    finally:
+        loop.cancel()
+
+    # closed after the max idle time
+    item.max_idle_time = 0.1
+    item.active_ts = 0
+    async with asyncio.timeout(1):
+        await item.waiting_loop()
+
+
+@pytest.mark.asyncio
+async def test_stdio_replicas(
+    echo_tool_stdio_config: dict[str, ServerConfig],
+    log_config: LogConfig,
+) -> None:
+    """Test the calls spread over the replicas of a stdio server."""
+    echo_tool_stdio_config["echo"].replicas = ReplicaConfig(
+        min=1, max=2, idle_timeout=0.5
+    )
+    echo_tool_stdio_config["echo"].result_cache_ttl = 60
+    async with ToolManager(echo_tool_stdio_config, log_config) as tool_manager:
+        await tool_manager.initialized_event.wait()
+        server = tool_manager._mcp_servers["echo"]
+        store = server._session_store
+        mcp_tools = server._mcp_tools
+        tools = tool_manager.langchain_tools()
+        echo_tool = next((t for t in tools if t.name == "echo"), None)
+        assert echo_tool is not None
+
+        async def call_echo(delay_ms: int) -> ToolMessage:
+            return await echo_tool.ainvoke(
+                ToolCall(
+                    name="echo",
+                    id=str(random.randint(1, 1000000)),  # noqa: S311
+                    args={"message": "hihi", "delay_ms": delay_ms},
+                    type="tool_call",
+                ),
+            )
+
+        server.result_cache.put(
+            "echo", {}, CallToolResult(content=[TextContent(type="text", text="a")])
+        )
+
+        # a busy replica starts a second one
+        slow = asyncio.create_task(call_echo(1000))
+        await asyncio.sleep(0.5)
+        assert store.load("replica-0") == 1
+        result = await call_echo(0)
+        assert json.loads(str(result.content))[0]["text"] == "hihi"
+        assert store.load("replica-1") == 0
+        # the idle replica is picked before the busy one
+        assert server._stdio_replica()[0] == "replica-1"
+        # each replica has its own process
+        pids = server.replica_pids
+        assert sorted(pids) == ["replica-0", "replica-1"]
+        assert pids["replica-0"] != pids["replica-1"]
+        result = await slow
+        assert json.loads(str(result.content))[0]["text"] == "hihi"
+        # the tools were listed once, by the setup
+        assert server._mcp_tools is mcp_tools
+        # starting a replica doesn't drop the cached results
+        assert server.result_cache.get("echo", {}) is not None
+
+        # the replica above min is closed when idle
+        async with asyncio.timeout(5):
+            while store.load("replica-1") is not None:
+                await asyncio.sleep(0.1)
+        assert store.load("replica-0") == 0
+        assert server._stdio_replica() == ("replica-0", MAX_IDLE_TIME)
+        assert list(server.replica_pids) == ["replica-0"]
+
+
+@pytest.mark.asyncio
+async def test_stdio_replica_failed(
+    echo_tool_stdio_config: dict[str, ServerConfig],
+    log_config: LogConfig,
+) -> None:
+    """Test a failed replica doesn't fail the server while another one runs."""
+    echo_tool_stdio_config["echo"].replicas = ReplicaConfig(
+        min=2, max=2, idle_timeout=60
+    )
+    async with ToolManager(echo_tool_stdio_config, log_config) as tool_manager:
+        await tool_manager.initialized_event.wait()
+        server = tool_manager._mcp_servers["echo"]
+        echo_tool = next(t for t in tool_manager.langchain_tools() if t.name == "echo")
+
+        async def call_echo(delay_ms: int) -> ToolMessage:
+            return await echo_tool.ainvoke(
+                ToolCall(
+                    name="echo",
+                    id=str(random.randint(1, 1000000)),  # noqa: S311
+                    args={"message": "hihi", "delay_ms": delay_ms},
+                    type="tool_call",
+                ),
+            )
+
+        states: list[ClientState] = []
+
+        async def listener(msg: LogMsg) -> None:
+            if msg.event == LogEvent.STATUS_CHANGE and msg.client_state:
+                states.append(msg.client_state)
+
+        slow = asyncio.create_task(call_echo(3000))
+        await asyncio.sleep(0.5)
+        await call_echo(0)
+        assert server._other_replicas_running("replica-0")
+        async with server.log_buffer.add_listener(listener):
+            states.clear()
+            os.kill(server.replica_pids["replica-0"], signal.SIGKILL)
+            await asyncio.gather(slow, return_exceptions=True)
+            async with asyncio.timeout(5):
+                while "replica-0" in server.replica_pids:
+                    await asyncio.sleep(0.1)
+            await asyncio.sleep(0.5)
+
+        assert ClientState.FAILED not in states
+        assert ClientState.RESTARTING not in states
+        # the last replica running fails the server
+        assert not server._other_replicas_running("replica-1")
+        assert server._client_status == ClientState.RUNNING
+        result = await call_echo(0)
+        assert json.loads(str(result.content))[0]["text"] == "hihi"
+
+
+@pytest.mark.asyncio
+async def test_http_session_pool(
+    echo_tool_streamable_server: tuple[int, dict[str, ServerConfig]],
+    log_config: LogConfig,
+) -> None:
+    """Test the chats share the pooled sessions of a http server."""
+    _, configs = echo_tool_streamable_server
+    configs["echo"].session_pool = SessionPoolConfig(
+        min_idle=1, max_size=2, idle_timeout=0.5
+    )
+    async with ToolManager(configs, log_config) as tool_manager:
+        await tool_manager.initialized_event.wait()
+        server = tool_manager._mcp_servers["echo"]
+        store = server._session_store
+        tools = tool_manager.langchain_tools()
+        echo_tool = next((t for t in tools if t.name == "echo"), None)
+        assert echo_tool is not None
+
+        async def call_echo(chat_id: str, delay_ms: int) -> ToolMessage:
+            return await echo_tool.ainvoke(
+                ToolCall(
+                    name="echo",
+                    id=str(random.randint(1, 1000000)),  # noqa: S311
+                    args={"message": "hihi", "delay_ms": delay_ms},
+                    type="tool_call",
+                ),
+                config={"configurable": {"thread_id": chat_id}},
+            )
+
+        result = await call_echo("chat-a", 0)
+        assert json.loads(str(result.content))[0]["text"] == "hihi"
+        session = store["pool-0"].session
+        # another chat borrows the idle session
+        result = await call_echo("chat-b", 0)
+        assert json.loads(str(result.content))[0]["text"] == "hihi"
+        assert store["pool-0"].session is session
+        assert len(store) == 1
+
+        # a busy session opens a second one, up to max_size
+        slow = [asyncio.create_task(call_echo(f"chat-{i}", 1000)) for i in range(3)]
+        await asyncio.sleep(0.5)
+        assert store.load("pool-0") == 2
+        assert store.load("pool-1") == 1
+        for task in slow:
+            result = await task
+            assert json.loads(str(result.content))[0]["text"] == "hihi"
+
+        # the session beyond min_idle is closed when idle
+        async with asyncio.timeout(5):
+            while store.load("pool-1") is not None:
+                await asyncio.sleep(0.1)
+        assert store["pool-0"].session is session
+
+
+@pytest.mark.asyncio
+async def test_http_session_pool_abort(
+    echo_tool_streamable_server: tuple[int, dict[str, ServerConfig]],
+    log_config: LogConfig,
+) -> None:
+    """Test aborting a chat doesn't break the calls of the other chats."""
+    _, configs = echo_tool_streamable_server
+    configs["echo"].session_pool = SessionPoolConfig(min_idle=1, max_size=1)
+    async with ToolManager(configs, log_config) as tool_manager:
+        await tool_manager.initialized_event.wait()
+        store = tool_manager._mcp_servers["echo"]._session_store
+        tools = tool_manager.langchain_tools()
+        echo_tool = next((t for t in tools if t.name == "echo"), None)
+        assert echo_tool is not None
+
+        async def call_echo(
+            chat_id: str, delay_ms: int, abort_signal: asyncio.Event
+        ) -> ToolMessage:
+            return await echo_tool.ainvoke(
+                ToolCall(
+                    name="echo",
+                    id=str(random.randint(1, 1000000)),  # noqa: S311
+                    args={"message": "hihi", "delay_ms": delay_ms},
+                    type="tool_call",
+                ),
+                config={
+                    "configurable": {
+                        "thread_id": chat_id,
+                        "abort_signal": abort_signal,
+                    }
+                },
+            )
+
+        abort_a = asyncio.Event()
+        chat_a = asyncio.create_task(call_echo("chat-a", 2000, abort_a))
+        chat_b = asyncio.create_task(call_echo("chat-b", 1000, asyncio.Event()))
+        await asyncio.sleep(0.5)
+        assert store.load("pool-0") == 2
+        session = store["pool-0"].session
+
+        abort_a.set()
+        result = await chat_a
+        assert "<user_aborted>" in str(result.content)
+        result = await chat_b
+        assert json.loads(str(result.content))[0]["text"] == "hihi"
+        assert store["pool-0"].session is session
+
+
+def test_replica_config() -> None:
+    """Test the range of the replicas is checked."""
+    assert ReplicaConfig(min=2, max=4).idle_timeout == 60
+    with pytest.raises(ValidationError):
+        ReplicaConfig(min=3, max=2)
+    with pytest.raises(ValidationError):
+        SessionPoolConfig(min_idle=3, max_size=2)
+
+
+def test_elicitation_router() -> None:
+    """Test elicitations of a shared session reach the right tool call."""
+
+    def params(meta: dict[str, Any] | None = None) -> ElicitRequestFormParams:
+        return ElicitRequestFormParams(
+            message="name?",
+            requestedSchema={"type": "object", "properties": {}},
+            _meta=meta,  # type: ignore[call-arg]
+        )
+
+    async def callback_a(*_: Any) -> Any: ...
+    async def callback_b(*_: Any) -> Any: ...
+
+    session, other_session = cast(Any, object()), cast(Any, object())
+    router = ElicitationRouter("echo")
+    assert router.route(session, params()) is None
+
+    router.register(session, 1, "chat-a", callback_a)
+    router.register(session, 2, "chat-a", callback_a)
+    # the only chat with running calls
+    assert router.route(session, params()) is callback_a
+
+    router.register(session, 3, "chat-b", callback_b)
+    router.register(other_session, 1, "chat-b", callback_b)
+    assert router.route(session, params({RELATED_REQUEST_ID: 3})) is callback_b
+    assert router.route(session, params({RELATED_REQUEST_ID: 1})) is callback_a
+    assert router.route(session, params({"progressToken": 3})) is callback_b
+    assert router.route(other_session, params()) is callback_b
+    # two chats and no request named, don't guess
+    assert router.route(session, params()) is None
+
+    router.unregister(session, 3)
+    assert router.route(session, params()) is callback_a
+    for request_id in (1, 2):
+        router.unregister(session, request_id)
+    router.unregister(other_session, 1)
+    assert len(router) == 0
+
+
+class KeywordEmbeddings(Embeddings):
+    """Embeddings counting the keywords in the text."""
+
+    keywords = ("weather", "email", "file", "search", "calendar")
+
+    def __init__(self) -> None:
+        self.documents = 0
+
+    def _embed(self, text: str) -> list[float]:
+        return [float(text.lower().count(k)) + 0.01 for k in self.keywords]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed the documents."""
+        self.documents += len(texts)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed the query."""
+        return self._embed(text)
+
+
+def _keyword_tools() -> list[BaseTool]:
+    @tool
+    def get_weather(city: str) -> str:
+        """Get the weather forecast of a city."""
+        return city
+
+    @tool
+    def send_email(to: str) -> str:
+        """Send an email to someone."""
+        return to
+
+    @tool
+    def read_file(path: str) -> str:
+        """Read a file from the disk."""
+        return path
+
+    @tool
+    def web_search(query: str) -> str:
+        """Search the web."""
+        return query
+
+    return [get_weather, send_email, read_file, web_search]
+
+
+@pytest.mark.asyncio
+async def test_tool_index() -> None:
+    """Test the tool index returns the relevant tools and embeds them once."""
+    embeddings = KeywordEmbeddings()
+    index = ToolIndex(embeddings, top_k=2)
+    tools = _keyword_tools()
+
+    names = await index.search("what's the weather tomorrow?", tools)
+    assert names[0] == "get_weather"
+    assert len(names) == 2
+    assert (await index.search("write an email to Bob", tools))[0] == "send_email"
+    assert embeddings.documents == len(tools)
+    assert len(index) == len(tools)
+
+    # only the given tools are returned
+    assert await index.search("weather", tools[1:]) != ["get_weather"]
+    assert "get_weather" not in await index.search("weather", tools[1:])
+
+    index.retain(tools[:2])
+    assert len(index) == 2
+    await index.search("weather", tools)
+    assert embeddings.documents == len(tools) + 2
+    index.close()